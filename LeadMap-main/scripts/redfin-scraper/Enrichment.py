@@ -12,35 +12,147 @@ Date: 2025-10-29
 # --- Standard Library Imports ---
 import asyncio
 import logging
+import multiprocessing
+import os
+import queue
 import re
+import sys
+import time
 import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AsyncExitStack
 from datetime import datetime
+from functools import partial
+from logging.handlers import QueueHandler
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 # --- Third-Party Imports ---
 import pandas as pd
 from playwright.async_api import async_playwright, Page
 from bs4 import BeautifulSoup
+from tqdm import tqdm
 from tqdm.asyncio import tqdm_asyncio
 
 # --- Local Application Imports ---
 from supabase_client import save_lead_to_supabase
+from record_writer import BufferedRecordWriter
+from browser_pool import BrowserContextPool
+from request_blocking import ResourceBlocker, DEFAULT_BLOCKED_HOSTS
+from page_readiness import WaitTimer, static_page_ready
+
+try:
+    # The HTTP fast path (HTTP_FIRST) needs httpx; without it every lead goes through the browser
+    from async_fetcher import AsyncFetcher
+except ImportError:
+    AsyncFetcher = None
+
+try:
+    # The raw-page archive needs zstandard; enrichment works without it
+    from page_archive import PageArchive, read_entry
+except ImportError:
+    PageArchive = None
+
+try:
+    # Only needed when the leads come from the scraper's partitioned Parquet output
+    from parquet_store import read_listings
+except ImportError:
+    read_listings = None
+
+try:
+    # Only used to size the sharded mode by free memory; without it the size is read from os.sysconf
+    import psutil
+except ImportError:
+    psutil = None
 
 # --- AWS PROXY CONFIGURATION ---
 AWS_PROXY_ENDPOINT = "https://ghpab8ll90.execute-api.us-east-2.amazonaws.com/default/aws_lamda_proxy"
 
 # --- Global Configuration ---
-CSV_PATH = "C:/Users/jackt/Documents/redfin_leads/fsbo_leads.csv"
+CSV_PATH = "C:/Users/jackt/Documents/redfin_leads/fsbo_leads.csv"  # or the scraper's Parquet directory
 ENRICHED_CSV_PATH = "C:/Users/jackt/Documents/redfin_leads/fsbo_leads_enriched.csv"
+# Parquet input: columns to load. Every input column is copied to the enriched CSV and the Supabase row (unmapped
+# ones into `other`), so all of them are needed unless those outputs should shrink too; None loads them all
+PARQUET_COLUMNS = None
 LOG_PATH = "C:/Users/jackt/Documents/redfin_leads/scraper.log"
 DEBUG_DIR = "C:/Users/jackt/Documents/redfin_leads/debug_truepeoplesearch"
 CONCURRENCY_LIMIT = 8
+# Leads borrow one of CONCURRENCY_LIMIT warm browser contexts; a context is recreated after this many page loads
+CONTEXT_MAX_NAVIGATIONS = 50
+CONTEXT_WARM_URL = None  # e.g. "https://www.truepeoplesearch.com/" to fill each new context's cache up front
+# The parser only needs the HTML: enrichment contexts abort these resource types and any request to a known
+# ad/tracker host (challenges.cloudflare.com is always let through). A bytes-saved report is logged per run.
+# Playwright disables the HTTP cache of a context with request routes, so blocking gives up the warm cache and
+# CONTEXT_WARM_URL is skipped while it is on.
+BLOCK_RESOURCES = True
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet', 'texttrack', 'manifest'}
+EXTRA_BLOCKED_HOSTS = ()  # Host suffixes to block on top of request_blocking.DEFAULT_BLOCKED_HOSTS
+# A loaded page is parsed as soon as the property card or a "no results" marker appears or the network goes
+# quiet, whichever is first, instead of after fixed sleeps. These are the deadlines for those waits.
+READY_TIMEOUT_MS = 15000
+# Navigations return once the DOM is parsed; the readiness wait above decides when there is enough to parse,
+# instead of also waiting for every subresource to finish loading
+NAVIGATION_WAIT_UNTIL = "domcontentloaded"
+CHALLENGE_TIMEOUT_MS = 10000  # Extra wait for the content to replace a Cloudflare challenge page
+# Realistic headers to avoid detection; every pooled context is created with these
+BROWSER_CONTEXT_OPTIONS = {
+    'user_agent': "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    'viewport': {'width': 1920, 'height': 1080},
+    'locale': 'en-US',
+    'timezone_id': 'America/New_York',
+    'extra_http_headers': {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Cache-Control': 'max-age=0'
+    },
+}
 USE_AWS_ROTATION = True  # Set to False to disable AWS proxy and use direct connections only
+# Fetch each result page as plain HTML first (pooled httpx client, same headers, through the AWS proxy if enabled)
+# and only open a browser page when the response lacks the property card / "no results" markers
+HTTP_FIRST = True
+HTTP_TIMEOUT = 20.0
+HTTP_DEADLINE = 45.0
+HTTP_HEADERS = {
+    'User-Agent': BROWSER_CONTEXT_OPTIONS['user_agent'],
+    # httpx negotiates its own Accept-Encoding and connection reuse
+    **{k: v for k, v in BROWSER_CONTEXT_OPTIONS['extra_http_headers'].items()
+       if k not in ('Accept-Encoding', 'Connection')},
+}
 SAVE_DEBUG_SAMPLES = True
 MAX_DEBUG_SAMPLES = 5
+# Every column TruePeopleSearchParser (or address parsing) can add to a lead, in output order
+ENRICHMENT_FIELDS = [
+    'address', 'full_name', 'age', 'other_observed_names', 'relatives',
+    'resident_phone_number', 'resident_phone_number_type', 'other_resident_phone_number',
+    'estimated_value', 'estimated_equity', 'last_sale_date', 'last_sale_amount', 'year_built_enriched',
+    'ownership_type', 'occupancy_type', 'property_class', 'land_use',
+]
+ENRICHED_FLUSH_ROWS = 50  # Enriched leads are appended as they finish, flushed every N rows
+# Sharded mode: leads are split across this many worker processes, each with its own browser, context pool and
+# CONCURRENCY_LIMIT; the main process is the only writer. None = as many as the cores and free memory allow,
+# 1 = everything in this process. `Enrichment.py --workers N` overrides it.
+ENRICH_WORKERS = None
+WORKER_MEMORY_MB = 1024  # Rough footprint of one worker (Chromium with CONCURRENCY_LIMIT pages, plus Python)
+MEMORY_HEADROOM_MB = 2048  # Left free for the OS and the main process when sizing the shards
+# Opt-in archive of every TruePeopleSearch result page with the lead it was fetched for;
+# `Enrichment.py --reextract` re-runs TruePeopleSearchParser over it offline
+ARCHIVE_PAGES = False
+PAGE_ARCHIVE_DIR = "C:/Users/jackt/Documents/redfin_leads/tps_page_archive"
+REEXTRACTED_CSV_PATH = "C:/Users/jackt/Documents/redfin_leads/fsbo_leads_reenriched.csv"
+REEXTRACT_CHUNKSIZE = 16  # Archived pages handed to a re-extraction worker at a time
 
 # --- Logging Setup ---
+def quiet_noisy_loggers():
+    for lib in ["httpx", "httpcore", "playwright"]:
+        logging.getLogger(lib).setLevel(logging.WARNING)
+
+
 def setup_logging():
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
@@ -62,15 +174,15 @@ def setup_logging():
     console_handler.setFormatter(console_formatter)
     logger.addHandler(console_handler)
 
-    # Quiet noisy libs
-    for lib in ["httpx", "httpcore", "playwright"]:
-        logging.getLogger(lib).setLevel(logging.WARNING)
+    quiet_noisy_loggers()
 
     # Ensure debug directory exists
     if SAVE_DEBUG_SAMPLES:
         Path(DEBUG_DIR).mkdir(parents=True, exist_ok=True)
 
-setup_logging()
+# Re-extraction and shard worker processes re-import this module; only the main process owns (and truncates) the log
+if multiprocessing.parent_process() is None:
+    setup_logging()
 
 debug_sample_count = 0
 
@@ -249,8 +361,8 @@ async def fetch_via_aws_proxy(page: Page, url: str) -> bool:
         proxy_url = f"{AWS_PROXY_ENDPOINT}?url={encoded_url}"
         logging.debug(f"AWS routing TruePeopleSearch URL: {url}")
         
-        # Use 'load' instead of 'domcontentloaded' for better reliability
-        response = await page.goto(proxy_url, timeout=90000, wait_until="load")
+        # The caller's readiness wait covers anything still loading after the DOM is parsed
+        response = await page.goto(proxy_url, timeout=90000, wait_until=NAVIGATION_WAIT_UNTIL)
         
         if response:
             status = response.status
@@ -260,8 +372,7 @@ async def fetch_via_aws_proxy(page: Page, url: str) -> bool:
                 if 'truepeoplesearch.com' not in final_url.lower():
                     logging.warning(f"AWS Proxy redirected away from TruePeopleSearch! Final: {final_url}")
                     return False
-                # Wait for content to load
-                await page.wait_for_timeout(3000)
+                # The caller waits for the content to be ready
                 return True
             else:
                 if status == 403:
@@ -621,19 +732,147 @@ class TruePeopleSearchParser:
         return combined_data
 
 
+def aws_proxy_rewrite(url: str):
+    """AsyncFetcher rewrite that sends a TruePeopleSearch URL through the AWS Lambda proxy."""
+    return f"{AWS_PROXY_ENDPOINT}?url={urllib.parse.quote(url, safe='')}", {}
+
+
+async def fetch_static_page(fetcher: AsyncFetcher, url: str) -> Optional[str]:
+    """
+    Fetches a TruePeopleSearch URL without a browser.
+
+    Returns the HTML only if it is a 200 carrying the result markers; None means "use a browser".
+    """
+    result = await fetcher.fetch(url)
+    if result.error is not None or result.status != 200:
+        logging.debug(f"Static fetch returned {result.status or result.error!r} for {url}")
+        return None
+    html_content = result.content.decode('utf-8', errors='replace')
+    return html_content if static_page_ready(html_content) else None
+
+
 # --- Main Task ---
 
-async def enrich_lead_task(lead_data: Dict, browser, semaphore, stats: Dict):
+async def load_in_browser(page: Page, search_url: str, property_url: str, timer: WaitTimer) -> Optional[str]:
+    """
+    Loads a TruePeopleSearch URL in a browser page (AWS proxy first if enabled) and returns the rendered HTML.
+
+    Returns None if the page could not be fetched.
+    """
+    # Ensure we're only navigating to TruePeopleSearch URLs
+    if 'truepeoplesearch.com' not in search_url.lower():
+        logging.error(f"CRITICAL: Refusing to navigate to non-TruePeopleSearch URL: {search_url}")
+        return None
+
+    # Try AWS proxy first if enabled, with fallback to direct connection
+    # Use retry logic with exponential backoff
+    fetch_success = False
+    max_retries = 2
+    retry_delay = 1000  # Start with 1 second
+
+    for attempt in range(max_retries):
+        try:
+            if USE_AWS_ROTATION and attempt == 0:
+                # First attempt: try AWS proxy
+                with timer.phase("navigation"):
+                    success = await fetch_via_aws_proxy(page, search_url)
+                if success:
+                    fetch_success = True
+                    logging.debug(f"Successfully fetched via AWS proxy for {property_url}")
+                    break
+                else:
+                    # AWS proxy failed, try direct connection
+                    logging.debug(f"AWS proxy failed (attempt {attempt + 1}), trying direct connection for {property_url}")
+                    await timer.backoff(page, retry_delay)
+
+            # Direct connection (either as fallback or primary method); readiness is awaited below
+            with timer.phase("navigation"):
+                response = await page.goto(search_url, timeout=90000, wait_until=NAVIGATION_WAIT_UNTIL)
+
+            if response:
+                # Check response status
+                if response.status >= 400:
+                    logging.warning(f"HTTP {response.status} error for {property_url}")
+                    if attempt < max_retries - 1:
+                        await timer.backoff(page, retry_delay * (attempt + 1))
+                        continue
+
+                final_url = response.url
+                if 'truepeoplesearch.com' not in final_url.lower():
+                    logging.warning(f"Redirected away from TruePeopleSearch! Final URL: {final_url}")
+                    if 'cloudflare' in final_url.lower() or 'challenge' in final_url.lower():
+                        logging.warning(f"Cloudflare challenge detected for {property_url}")
+                        if attempt < max_retries - 1:
+                            await timer.backoff(page, retry_delay * (attempt + 1) * 2)
+                            continue
+
+                fetch_success = True
+                break
+            else:
+                logging.warning(f"No response received for {property_url} (attempt {attempt + 1})")
+                if attempt < max_retries - 1:
+                    await timer.backoff(page, retry_delay * (attempt + 1))
+                    continue
+
+        except Exception as e:
+            error_msg = str(e).lower()
+            if 'timeout' in error_msg or 'navigation' in error_msg:
+                logging.warning(f"Navigation timeout for {property_url} (attempt {attempt + 1}): {e}")
+                if attempt < max_retries - 1:
+                    await timer.backoff(page, retry_delay * (attempt + 1))
+                    continue
+            else:
+                logging.error(f"Navigation error for {property_url} (attempt {attempt + 1}): {e}")
+                if attempt < max_retries - 1:
+                    await timer.backoff(page, retry_delay * (attempt + 1))
+                    continue
+
+    if not fetch_success:
+        logging.error(f"Failed to fetch TruePeopleSearch URL for {property_url} after {max_retries} attempts")
+        return None
+
+    # Parse as soon as the property card / "no results" marker is there or the network is quiet
+    readiness = await timer.ready(page, READY_TIMEOUT_MS)
+    logging.debug(f"Page ready for {property_url} ({readiness})")
+
+    html_content = await page.content()
+
+    # Verify page loaded correctly by checking for key indicators
+    page_text_lower = html_content.lower()
+    if readiness != 'content' and len(page_text_lower) < 500:
+        logging.warning(f"Page content seems empty for {property_url}")
+    if 'estimated value' not in page_text_lower and 'property' not in page_text_lower:
+        # Check for blocking indicators
+        if any(kw in page_text_lower for kw in ['cloudflare', 'challenge', 'checking your browser', 'access denied', 'blocked']):
+            logging.warning(f"Page appears to be blocked or showing Cloudflare challenge for {property_url}")
+            # Give the challenge until the deadline to hand over to the real content
+            await timer.ready(page, CHALLENGE_TIMEOUT_MS, network_idle=False)
+            html_content = await page.content()
+            page_text_lower = html_content.lower()
+            if 'estimated value' not in page_text_lower:
+                logging.warning(f"Still blocked after extended wait for {property_url}")
+        elif 'no results' not in page_text_lower:
+            logging.warning(f"Page may not have loaded correctly for {property_url} - missing expected content")
+    return html_content
+
+
+async def enrich_lead_task(lead_data: Dict, pool: BrowserContextPool, semaphore, stats: Dict, archive=None,
+                           timer: Optional[WaitTimer] = None, fetcher: Optional[AsyncFetcher] = None):
     """
     Enriches a single lead by scraping TruePeopleSearch.com.
 
+    With a `fetcher` the result page is first fetched as static HTML; a page borrowed from `pool` is only used
+    when that response lacks the expected markers. Time spent navigating, waiting and working is added to `timer`.
+
     IMPORTANT: This function ONLY scrapes TruePeopleSearch.com using the address from the CSV.
     It does NOT scrape Redfin URLs or property_url from the CSV.
     """
     global debug_sample_count
+    timer = timer or WaitTimer()
 
     async with semaphore:
-        page, context = None, None
+        slot = None
+        lead_started = None
         property_url = lead_data.get('property_url', 'Unknown')  # Only used for logging/reference
 
         try:
@@ -750,136 +989,27 @@ async def enrich_lead_task(lead_data: Dict, browser, semaphore, stats: Dict):
                 stats['skipped'] += 1
                 return lead_data
 
-            # Create browser context with realistic headers to avoid detection
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US',
-                timezone_id='America/New_York',
-                extra_http_headers={
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                    'Sec-Fetch-Dest': 'document',
-                    'Sec-Fetch-Mode': 'navigate',
-                    'Sec-Fetch-Site': 'none',
-                    'Cache-Control': 'max-age=0'
-                }
-            )
-            page = await context.new_page()
-
-            # Ensure we're only navigating to TruePeopleSearch URLs
-            if 'truepeoplesearch.com' not in search_url.lower():
-                logging.error(f"CRITICAL: Refusing to navigate to non-TruePeopleSearch URL: {search_url}")
-                stats['failed'] += 1
-                return lead_data
-
-            # Try AWS proxy first if enabled, with fallback to direct connection
-            # Use retry logic with exponential backoff
-            fetch_success = False
-            max_retries = 2
-            retry_delay = 1000  # Start with 1 second
-            
-            for attempt in range(max_retries):
-                try:
-                    if USE_AWS_ROTATION and attempt == 0:
-                        # First attempt: try AWS proxy
-                        success = await fetch_via_aws_proxy(page, search_url)
-                        if success:
-                            fetch_success = True
-                            logging.debug(f"Successfully fetched via AWS proxy for {property_url}")
-                            break
-                        else:
-                            # AWS proxy failed, try direct connection
-                            logging.debug(f"AWS proxy failed (attempt {attempt + 1}), trying direct connection for {property_url}")
-                            await page.wait_for_timeout(retry_delay)
-                    
-                    # Direct connection (either as fallback or primary method)
-                    # Use 'load' instead of 'networkidle' - more reliable for Cloudflare-protected sites
-                    response = await page.goto(search_url, timeout=90000, wait_until="load")
-                    
-                    if response:
-                        # Check response status
-                        if response.status >= 400:
-                            logging.warning(f"HTTP {response.status} error for {property_url}")
-                            if attempt < max_retries - 1:
-                                await page.wait_for_timeout(retry_delay * (attempt + 1))
-                                continue
-                        
-                        final_url = response.url
-                        if 'truepeoplesearch.com' not in final_url.lower():
-                            logging.warning(f"Redirected away from TruePeopleSearch! Final URL: {final_url}")
-                            if 'cloudflare' in final_url.lower() or 'challenge' in final_url.lower():
-                                logging.warning(f"Cloudflare challenge detected for {property_url}")
-                                if attempt < max_retries - 1:
-                                    await page.wait_for_timeout(retry_delay * (attempt + 1) * 2)
-                                    continue
-                        
-                        fetch_success = True
-                        break
-                    else:
-                        logging.warning(f"No response received for {property_url} (attempt {attempt + 1})")
-                        if attempt < max_retries - 1:
-                            await page.wait_for_timeout(retry_delay * (attempt + 1))
-                            continue
-                    
-                except Exception as e:
-                    error_msg = str(e).lower()
-                    if 'timeout' in error_msg or 'navigation' in error_msg:
-                        logging.warning(f"Navigation timeout for {property_url} (attempt {attempt + 1}): {e}")
-                        if attempt < max_retries - 1:
-                            await page.wait_for_timeout(retry_delay * (attempt + 1))
-                            continue
-                    else:
-                        logging.error(f"Navigation error for {property_url} (attempt {attempt + 1}): {e}")
-                        if attempt < max_retries - 1:
-                            await page.wait_for_timeout(retry_delay * (attempt + 1))
-                            continue
-            
-            if not fetch_success:
-                logging.error(f"Failed to fetch TruePeopleSearch URL for {property_url} after {max_retries} attempts")
-                stats['failed'] += 1
-                return lead_data
-
-            # Wait for page content to fully load (important for Cloudflare-protected sites)
-            # Use multiple wait strategies for maximum reliability
-            try:
-                # Strategy 1: Wait for property card section (preferred)
-                await page.wait_for_selector('div.card.card-body.shadow-form, div.shadow-form, div.card-body', timeout=15000)
-                logging.debug(f"Property card section found for {property_url}")
-            except Exception as e:
-                logging.debug(f"Property card selector not found immediately: {e}")
-                try:
-                    # Strategy 2: Wait for any content that suggests page loaded
-                    await page.wait_for_selector('body', timeout=5000)
-                    # Check if page has loaded content
-                    page_text = await page.inner_text('body')
-                    if not page_text or len(page_text) < 100:
-                        logging.warning(f"Page content seems empty for {property_url}")
-                except Exception:
-                    pass
-            
-            # Additional wait for JavaScript-rendered content and Cloudflare challenges
-            await page.wait_for_timeout(3000)
+            lead_started = time.monotonic()
+            html_content = None
+            if fetcher:
+                with timer.phase("navigation"):
+                    html_content = await fetch_static_page(fetcher, search_url)
+                if html_content is not None:
+                    stats['via_http'] += 1
+                else:
+                    logging.debug(f"Static fetch lacks the expected markers, escalating to a browser: {property_url}")
+
+            if html_content is None:
+                # Borrow a warm context; it is reset (or recycled) when the lead is done
+                slot = await pool.acquire()
+                html_content = await load_in_browser(slot.page, search_url, property_url, timer)
+                stats['via_browser'] += 1
+                if html_content is None:
+                    stats['failed'] += 1
+                    return lead_data
 
-            html_content = await page.content()
-            
-            # Verify page loaded correctly by checking for key indicators
-            page_text_lower = html_content.lower()
-            if 'estimated value' not in page_text_lower and 'property' not in page_text_lower:
-                # Check for blocking indicators
-                if any(kw in page_text_lower for kw in ['cloudflare', 'challenge', 'checking your browser', 'access denied', 'blocked']):
-                    logging.warning(f"Page appears to be blocked or showing Cloudflare challenge for {property_url}")
-                    # Try one more time with longer wait
-                    await page.wait_for_timeout(5000)
-                    html_content = await page.content()
-                    page_text_lower = html_content.lower()
-                    if 'estimated value' not in page_text_lower:
-                        logging.warning(f"Still blocked after extended wait for {property_url}")
-                elif 'no results' not in page_text_lower:
-                    logging.warning(f"Page may not have loaded correctly for {property_url} - missing expected content")
+            if archive:
+                archive.put(search_url, html_content.encode('utf-8'), meta={'lead': dict(lead_data)})
             extracted_data = TruePeopleSearchParser.extract_all(html_content, lead_data)
 
             # Log what was extracted for debugging
@@ -919,19 +1049,186 @@ async def enrich_lead_task(lead_data: Dict, browser, semaphore, stats: Dict):
         except Exception as e:
             logging.error(f"✗ Error: {e}")
             stats['failed'] += 1
+            if slot:
+                slot.broken = True
             return lead_data
 
         finally:
-            if page:
-                await page.close()
-            if context:
-                await context.close()
+            if lead_started is not None:
+                timer.lead_done(lead_started)
+            if slot:
+                await pool.release(slot)
 
 
 # --- Pipeline ---
 
-async def run_enrichment_pipeline(csv_path_override=None):
-    """Main pipeline."""
+def new_enrichment_stats() -> Dict:
+    return {'enriched': 0, 'failed': 0, 'skipped': 0, 'saved_to_db': 0, 'via_http': 0, 'via_browser': 0}
+
+
+async def enrich_leads(leads, on_result, archive=None, progress: bool = True) -> Dict:
+    """
+    Enriches `leads` with one browser, context pool and semaphore in this process and returns the stats.
+
+    - on_result(lead) is called as each lead finishes, enriched or not
+    - archive receives every fetched result page (a PageArchive, or a QueuedArchive in a shard worker)
+    """
+    stats = new_enrichment_stats()
+    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
+    blocker = ResourceBlocker(BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_HOSTS + tuple(EXTRA_BLOCKED_HOSTS)) if BLOCK_RESOURCES else None
+    timer = WaitTimer()
+
+    fetcher = None
+    if HTTP_FIRST and AsyncFetcher is None:
+        logging.warning("HTTP_FIRST needs httpx (pip install httpx); loading every lead in the browser")
+    elif HTTP_FIRST:
+        fetcher = AsyncFetcher(max_in_flight=CONCURRENCY_LIMIT, per_host=CONCURRENCY_LIMIT, timeout=HTTP_TIMEOUT,
+                               deadline=HTTP_DEADLINE, headers=HTTP_HEADERS,
+                               rewrite=aws_proxy_rewrite if USE_AWS_ROTATION else None)
+
+    async def enrich_one(lead):
+        on_result(await enrich_lead_task(lead, pool, semaphore, stats, archive, timer, fetcher))
+
+    warm_url = CONTEXT_WARM_URL
+    if blocker and warm_url:
+        logging.info("Skipping context warm-up: request blocking disables the browser HTTP cache it would fill")
+        warm_url = None
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        # With the HTTP fast path most leads never need a page, so contexts are only opened for fallbacks
+        pool = await BrowserContextPool(browser, CONCURRENCY_LIMIT, BROWSER_CONTEXT_OPTIONS,
+                                        max_navigations=CONTEXT_MAX_NAVIGATIONS, warm_url=warm_url,
+                                        setup=blocker.attach if blocker else None).start(prefill=not fetcher)
+
+        tasks = [enrich_one(lead) for lead in leads]
+        try:
+            async with AsyncExitStack() as stack:
+                if fetcher:
+                    await stack.enter_async_context(fetcher)
+                if progress:
+                    await tqdm_asyncio.gather(*tasks, desc="Enriching")
+                else:
+                    await asyncio.gather(*tasks)
+        finally:
+            await pool.close()
+
+        await browser.close()
+
+    timer.log_report()
+    if fetcher:
+        logging.info(f"Fetched {stats['via_http']} pages as static HTML, {stats['via_browser']} in a browser")
+    if blocker:
+        blocker.log_report()
+    return stats
+
+
+# --- Sharded Mode ---
+
+def available_memory_mb() -> Optional[float]:
+    if psutil is not None:
+        return psutil.virtual_memory().available / 1024 ** 2
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_enrich_workers() -> int:
+    """One shard per usable core, capped by how many WORKER_MEMORY_MB workers fit in the free memory."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    memory = available_memory_mb()
+    if memory is None:
+        return cores
+    return max(1, min(cores, int((memory - MEMORY_HEADROOM_MB) // WORKER_MEMORY_MB)))
+
+
+class QueuedArchive:
+    """Stands in for the PageArchive in a shard worker: pages go to the main process, the archive's only writer."""
+
+    def __init__(self, results):
+        self.results = results
+
+    def put(self, url: str, content: bytes, meta: Optional[Dict] = None):
+        self.results.put(("page", url, content, meta))
+
+
+class ShardLogFilter(logging.Filter):
+    """Prefixes a shard worker's log records with its shard number."""
+
+    def __init__(self, shard: int):
+        super().__init__()
+        self.shard = shard
+
+    def filter(self, record):
+        record.msg = f"[shard {self.shard}] {record.msg}"
+        return True
+
+
+def enrichment_shard_worker(shard: int, leads, results, archive_pages: bool) -> Dict:
+    """
+    Process-pool entry point: enrich one shard of the leads with this process's own browser.
+
+    Finished leads, archived pages and log records are all sent to the main process through `results`.
+    """
+    global debug_sample_count
+    handler = QueueHandler(results)
+    handler.addFilter(ShardLogFilter(shard))
+    logger = logging.getLogger()
+    logger.handlers.clear()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    quiet_noisy_loggers()
+    if shard:
+        # Debug sample file names are numbered per process; let only the first shard write them
+        debug_sample_count = MAX_DEBUG_SAMPLES
+    archive = QueuedArchive(results) if archive_pages else None
+    return asyncio.run(enrich_leads(leads, lambda lead: results.put(("lead", lead)), archive, progress=False))
+
+
+def run_sharded_enrichment(leads, shards: int, on_result, archive=None) -> Dict:
+    """
+    Splits `leads` round-robin over `shards` worker processes, each with its own browser and semaphore.
+
+    This process is the single writer: it receives every finished lead (on_result), archived page and log record
+    from the workers and returns their combined stats. A worker that fails raises here once the others finish.
+    """
+    stats = new_enrichment_stats()
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=shards) as executor:
+        results = manager.Queue()
+        futures = [executor.submit(enrichment_shard_worker, shard, leads[shard::shards], results, archive is not None)
+                   for shard in range(shards)]
+        with tqdm(total=len(leads), desc="Enriching") as progress:
+            while True:
+                # Checked before the read: once every worker is done, an empty queue means nothing is left
+                finished = all(future.done() for future in futures)
+                try:
+                    item = results.get(timeout=0.5)
+                except queue.Empty:
+                    if finished:
+                        break
+                    continue
+                if isinstance(item, logging.LogRecord):
+                    logging.getLogger(item.name).handle(item)
+                elif item[0] == "lead":
+                    on_result(item[1])
+                    progress.update()
+                elif item[0] == "page" and archive:
+                    archive.put(item[1], item[2], meta=item[3])
+        for future in futures:
+            for key, value in future.result().items():
+                stats[key] += value
+    return stats
+
+
+def enriched_fieldnames(columns) -> List[str]:
+    """Output columns for enriched leads: every input column, in input order, then the enrichment columns."""
+    columns = [str(column) for column in columns]
+    return columns + [f for f in ENRICHMENT_FIELDS if f not in columns]
+
+
+async def run_enrichment_pipeline(csv_path_override=None, workers: Optional[int] = None):
+    """Main pipeline. `workers` overrides ENRICH_WORKERS (1 keeps every lead in this process)."""
     start_time = datetime.now()
 
     logging.info("=" * 80)
@@ -942,7 +1239,14 @@ async def run_enrichment_pipeline(csv_path_override=None):
     target_csv_path = csv_path_override or CSV_PATH
 
     try:
-        df = pd.read_csv(target_csv_path, dtype=str).fillna('')
+        if Path(target_csv_path).is_dir():
+            # Partitioned Parquet from FSBO; values come back as strings like the CSV path
+            if read_listings is None:
+                logging.critical(f"{target_csv_path} is a Parquet directory; reading it needs pyarrow (pip install pyarrow)")
+                return
+            df = read_listings(target_csv_path, columns=PARQUET_COLUMNS, as_strings=True)
+        else:
+            df = pd.read_csv(target_csv_path, dtype=str).fillna('')
         # Normalize column names to lowercase for easier access, but keep originals too
         # This helps handle variations like 'Street' vs 'street' vs 'address'
         df.columns = df.columns.str.strip()  # Remove any whitespace from column names
@@ -955,23 +1259,43 @@ async def run_enrichment_pipeline(csv_path_override=None):
         logging.critical("File not found")
         return
 
-    stats = {'enriched': 0, 'failed': 0, 'skipped': 0, 'saved_to_db': 0}
     total_leads = len(leads)
-    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
+    # Each lead is written as soon as it is enriched, so a crash keeps everything finished so far
+    writer = BufferedRecordWriter(ENRICHED_CSV_PATH, enriched_fieldnames(df.columns), mode="w",
+                                  flush_rows=ENRICHED_FLUSH_ROWS, encoding='utf-8-sig')
+
+    archive = None
+    if ARCHIVE_PAGES:
+        if PageArchive is None:
+            logging.error("Page archiving requested but zstandard is not installed; pages will not be archived")
+        else:
+            archive = PageArchive(PAGE_ARCHIVE_DIR)
 
-        tasks = [enrich_lead_task(lead, browser, semaphore, stats) for lead in leads]
-        enriched_results = await tqdm_asyncio.gather(*tasks, desc="Enriching")
+    enriched_results = []
 
-        await browser.close()
+    def write_result(lead):
+        writer.write(lead)
+        enriched_results.append(lead)
+
+    shards = max(1, min(workers or ENRICH_WORKERS or default_enrich_workers(), total_leads))
+    try:
+        if shards > 1:
+            logging.info(f"Enriching {total_leads} leads across {shards} browser processes")
+            # The shards run in other processes; this one only writes, so it waits for them off the event loop
+            stats = await asyncio.get_running_loop().run_in_executor(
+                None, run_sharded_enrichment, leads, shards, write_result, archive)
+        else:
+            stats = await enrich_leads(leads, write_result, archive)
+    finally:
+        writer.close()
+        if archive:
+            archive.close()
 
     # Log stats after enrichment phase
     logging.info(f"Enrichment phase complete: {stats['enriched']} enriched, {stats['failed']} failed, {stats['skipped']} skipped")
 
     if enriched_results:
-        pd.DataFrame(enriched_results).to_csv(ENRICHED_CSV_PATH, index=False, encoding='utf-8-sig')
         logging.info(f"✓ Saved: {ENRICHED_CSV_PATH}")
 
         for lead in tqdm_asyncio(enriched_results, desc="Uploading"):
@@ -996,5 +1320,49 @@ async def run_enrichment_pipeline(csv_path_override=None):
     logging.info("=" * 80)
 
 
+def reextract_job(archive_root, entry) -> Dict:
+    """Process-pool entry point: re-run TruePeopleSearchParser on one archived page for the lead stored with it."""
+    html_content = read_entry(archive_root, entry).decode('utf-8', errors='replace')
+    lead_data = dict(entry.meta['lead'])
+    extracted_data = TruePeopleSearchParser.extract_all(html_content, lead_data)
+    if extracted_data:
+        lead_data.update(extracted_data)
+    return lead_data
+
+
+def reextract_enrichment():
+    """
+    Re-run the current TruePeopleSearchParser over the latest archived page of every lead, on all cores and
+    without a browser, writing enriched rows to REEXTRACTED_CSV_PATH exactly as the live pipeline would.
+    """
+    if PageArchive is None:
+        logging.critical("Re-extraction needs the zstandard package")
+        return
+    archive = PageArchive(PAGE_ARCHIVE_DIR)
+    writer = None
+    enriched = 0
+    try:
+        with multiprocessing.Pool(os.cpu_count()) as pool:
+            entries = (entry for entry in archive.iter_latest() if entry.meta and 'lead' in entry.meta)
+            leads = pool.imap_unordered(partial(reextract_job, archive.root), entries, chunksize=REEXTRACT_CHUNKSIZE)
+            for lead in tqdm(leads, total=archive.count(meta_key='lead'), desc="Re-extracting"):
+                if writer is None:
+                    writer = BufferedRecordWriter(REEXTRACTED_CSV_PATH, enriched_fieldnames(lead), mode="w",
+                                                  flush_rows=ENRICHED_FLUSH_ROWS, encoding='utf-8-sig')
+                writer.write(lead)
+                enriched += any(lead.get(f) for f in ENRICHMENT_FIELDS if f != 'address')
+    finally:
+        if writer:
+            writer.close()
+        archive.close()
+    logging.info(f"Re-extraction complete: {enriched} leads with enrichment data")
+
+
 if __name__ == "__main__":
-    asyncio.run(run_enrichment_pipeline())
\ No newline at end of file
+    if "--reextract" in sys.argv[1:]:
+        reextract_enrichment()
+    else:
+        workers = None
+        if "--workers" in sys.argv[1:]:
+            workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        asyncio.run(run_enrichment_pipeline(workers=workers))
\ No newline at end of file
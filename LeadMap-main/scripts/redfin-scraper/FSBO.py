@@ -14,18 +14,34 @@ World-Class Redfin FSBO Lead Scraper
 - Extracts monthly payment estimates
 """
 import requests
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
-import pandas as pd
+import gzip
+import io
 from tqdm import tqdm
 import time
 import random
 import logging
 import sys
-from bs4 import BeautifulSoup
 import re
 import json
-from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import argparse
+import asyncio
+import ipaddress
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
 from requests_ip_rotator import ApiGateway
+from extraction import ExtractionEngine, Field, Css, XPath, Json, Regex, Ref, HTML_RULES_AVAILABLE, HTML_RULES_MISSING
+from sitemap_store import SitemapStateStore
+from frontier import UrlFrontier
+from run_manifest import RunManifest
+from record_writer import BufferedRecordWriter
+from crawl_control import AimdController, CrawlScheduler, FetchResult, OK, REQUEUED
+from gateway_registry import GatewayRegistry, boto3_client_factory
+from response_cache import ResponseCache
 
 # HomeHarvest requires Python 3.10+ due to type union syntax (| operator)
 # Skip import on older Python versions to avoid compatibility errors
@@ -38,17 +54,135 @@ if sys.version_info >= (3, 10):
 else:
     Scraper = None
 
+try:
+    # Listing pages are parsed with lxml; without it the scraper can still report price drops or tear down gateways
+    from lxml import etree, html as lxml_html
+except ImportError:
+    etree = lxml_html = None
+
+try:
+    # CRAWL_MODE = "async" needs httpx; the default threaded crawl does not
+    from async_fetcher import AsyncFetcher
+except ImportError:
+    AsyncFetcher = None
+
+try:
+    # The raw-page archive needs zstandard; crawling works without it
+    from page_archive import PageArchive, read_entry
+except ImportError:
+    PageArchive = None
+
+try:
+    # Typed Parquet output needs pyarrow; CSV output works without it
+    from parquet_store import PartitionedParquetWriter
+except ImportError:
+    PartitionedParquetWriter = None
+
+try:
+    # The price/status history is stored as Parquet, so it needs pyarrow as well
+    from listing_history import ListingHistory, price_drops
+except ImportError:
+    ListingHistory = price_drops = None
+
 TARGET_STATES = {
     'MN', 'IA', 'MO', 'AR', 'DC', 'ME', 'NH', 'VT', 'MA', 'RI', 'CT', 'NY', 'NJ', 'PA', 'DE', 'MD', 'VA', 'WV', 'NC',
     'SC', 'GA',
     'FL', 'AL', 'MS', 'TN', 'KY', 'OH', 'IN', 'IL', 'WI', 'MI', 'TX'
 }
+# Every state/territory code Redfin can use in a sitemap name; used to tell state sitemaps from the rest
+US_STATE_CODES = {
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA',
+    'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR',
+    'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY'
+}
 SITEMAP_URLS = [
     "https://www.redfin.com/newest_listings.xml"
     # "https://www.redfin.com/latest_listings.xml" # Remove broken sitemap to avoid 404
 ]
+# Sitemaps are streamed in chunks of this size so a 50k-URL urlset never sits in memory whole
+SITEMAP_CHUNK_SIZE = 64 * 1024
+# Number of child sitemaps fetched in parallel when the root is a sitemapindex
+SITEMAP_WORKERS = 8
 CSV_PATH = "C:/Users/jackt/Documents/redfin_leads/fsbo_leads.csv"
 LOG_PATH = "C:/Users/jackt/Documents/redfin_leads/scraper.log"
+# Incremental crawl: keep sitemap validators and listing <lastmod> values between runs
+INCREMENTAL_SITEMAPS = True
+SITEMAP_STATE_PATH = "C:/Users/jackt/Documents/redfin_leads/sitemap_state.db"
+# Cross-run frontier: every listing URL ever seen, with its scrape history and next due time
+FRONTIER_PATH = "C:/Users/jackt/Documents/redfin_leads/frontier.db"
+# Checkpoint/resume: each run's URL list and completed URLs; `FSBO.py --resume` continues the last unfinished run
+RUN_MANIFEST_PATH = "C:/Users/jackt/Documents/redfin_leads/run_manifest.db"
+CHECKPOINT_EVERY = 1000  # Completed listings between checkpoints (outputs synced, progress committed)
+CHECKPOINT_INTERVAL = 60  # Seconds between checkpoints
+# Listing response cache: validators, body hash and last parsed record per URL. Pages validated within the TTL
+# are not requested at all; older ones are revalidated, and an unchanged body reuses the stored record unparsed
+RESPONSE_CACHE = True
+RESPONSE_CACHE_DIR = "C:/Users/jackt/Documents/redfin_leads/response_cache"
+RESPONSE_CACHE_MAX_MB = 2048  # Least recently used pages are evicted beyond this
+RESPONSE_CACHE_TTL_HOURS = 6
+# Unchanged listings: the frontier keeps a fingerprint of each URL's last extracted record (without the fields in
+# FINGERPRINT_EXCLUDED_FIELDS). "write" emits every record, "skip" leaves identical records out of the outputs,
+# and "touch" also bumps their last_scraped_at in Supabase, TOUCH_BATCH_SIZE URLs per request
+UNCHANGED_LISTINGS = "skip"
+FINGERPRINT_EXCLUDED_FIELDS = {"scrape_date"}
+TOUCH_BATCH_SIZE = 500
+# Append-only history of field transitions per listing (Parquet partitioned by change date), so price drops
+# survive the listings upsert. days_on_mls is left out: it moves every day and follows from the first sighting.
+# With SUPABASE_HISTORY the same transitions are inserted into the listing_history table in batches.
+LISTING_HISTORY = True
+LISTING_HISTORY_DIR = "C:/Users/jackt/Documents/redfin_leads/listing_history"
+HISTORY_FIELDS = ("list_price", "status")
+SUPABASE_HISTORY = False
+RECRAWL_INTERVAL_HOURS = 24 * 7  # Unchanged listings are rescraped weekly
+RETRY_INTERVAL_HOURS = 1  # First retry after a failed scrape; doubles per consecutive failure
+MAX_RETRY_INTERVAL_HOURS = 24
+# Listing crawl: "threads" (blocking requests.Session) or "async" (one event loop, pooled httpx client;
+# needs the httpx package)
+CRAWL_MODE = "threads"
+# Requests in flight are governed by an AIMD controller between 1 and the mode's maximum
+SCRAPE_WORKERS = 10  # Thread mode: starting concurrency
+MAX_SCRAPE_WORKERS = 64  # Thread mode: worker threads, and the gateway adapter's connection pool size
+ASYNC_INITIAL_IN_FLIGHT = 20  # Async mode: starting concurrency
+ASYNC_MAX_IN_FLIGHT = 200  # Async mode: requests open at once across all gateway endpoints
+LATENCY_TARGET = 10  # Seconds; slower listing responses count as congestion
+# Transient fetch failures (429/403/5xx, timeouts, connection errors) are retried later in the same run
+FETCH_RETRY_BASE_DELAY = 5  # Seconds before the first retry; doubles per attempt, with jitter
+FETCH_RETRY_MAX_DELAY = 300
+MAX_FETCH_ATTEMPTS = 4  # After this many failed fetches the URL goes to the dead-letter file
+# Scraped rows are buffered and flushed every N rows or seconds, and fsynced every CSV_CHECKPOINT_ROWS
+CSV_FLUSH_ROWS = 200
+CSV_FLUSH_INTERVAL = 5
+CSV_CHECKPOINT_ROWS = 2000
+# Output formats written per run: "csv" (CSV_PATH) and/or "parquet" (typed, partitioned by state/scrape_date)
+OUTPUT_FORMATS = {"csv"}
+PARQUET_DIR = "C:/Users/jackt/Documents/redfin_leads/listings_parquet"
+PARQUET_ROWS_PER_FILE = 50000
+# Opt-in archive of every fetched listing page (zstd segments + index) for offline re-extraction
+ARCHIVE_PAGES = False
+PAGE_ARCHIVE_DIR = "C:/Users/jackt/Documents/redfin_leads/page_archive"
+# `FSBO.py --reextract` runs the current extractor over the archive and writes here instead of the live outputs
+REEXTRACT_CSV_PATH = "C:/Users/jackt/Documents/redfin_leads/fsbo_leads_reextracted.csv"
+REEXTRACT_PARQUET_DIR = "C:/Users/jackt/Documents/redfin_leads/listings_parquet_reextracted"
+DEAD_LETTER_PATH = "C:/Users/jackt/Documents/redfin_leads/dead_letters.jsonl"
+# API Gateway proxy endpoints, one per region. With PERSISTENT_GATEWAYS they are kept between runs in the
+# registry (health-checked and topped up at startup) and only deleted by `FSBO.py --teardown-gateways`
+GATEWAY_REGIONS = ["us-east-1", "us-west-2", "us-east-2", "eu-west-1"]
+PERSISTENT_GATEWAYS = True
+GATEWAY_REGISTRY_PATH = "C:/Users/jackt/Documents/redfin_leads/gateways.db"
+GATEWAY_API_URL = None  # Override the AWS API Gateway control-plane URL, e.g. a local moto_server for testing
+ASYNC_PER_HOST = 50  # Async mode: requests open at once per gateway endpoint
+ASYNC_HTTP2 = False  # Negotiate HTTP/2 with the gateway endpoints (requires the h2 package)
+REQUEST_TIMEOUT = 30  # Seconds per connect/read
+REQUEST_DEADLINE = 60  # Async mode: hard cap on one listing request, body included
+# Pages are parsed in a process pool so extraction runs on every core instead of behind the GIL
+PARSE_WORKERS = os.cpu_count() or 4
+PARSE_QUEUE_SIZE = PARSE_WORKERS * 4  # Fetched pages waiting for or under parse; fetchers block beyond this
+# Listing page parser backend, feeding the lxml document every extraction rule runs on:
+# "lxml" (libxml2, fastest) or "html.parser" (BeautifulSoup's pure-Python parser converted to an lxml tree;
+# several times slower, closest to how the old BeautifulSoup cascades saw a page). Pages libxml2 rejects
+# outright fall back to html.parser either way.
+HTML_PARSER = "lxml"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
 
 # Blacklisted phone numbers - these will not be included in the export
 BLACKLISTED_PHONE_NUMBERS = ["1-844-759-7732", "844-759-7732", "(844) 759-7732", "8447597732"]
@@ -80,54 +214,180 @@ FIELDS = [
     # Adding the newly requested fields
     "listing_agent_email"
 ]
+
+# Column types for Parquet output; every other field in FIELDS is a string
+FIELD_TYPES = {
+    "scrape_date": "date", "list_date": "date", "pending_date": "date", "last_sold_date": "date",
+    "beds": "int", "half_baths": "int", "sqft": "int", "year_built": "int", "stories": "int", "garage": "int",
+    "lot_sqft": "int", "days_on_mls": "int",
+    "full_baths": "float", "list_price": "float", "list_price_min": "float", "list_price_max": "float",
+    "sold_price": "float", "last_sold_price": "float", "price_per_sqft": "float", "hoa_fee": "float",
+    "estimated_value": "float", "tax_assessed_value": "float", "estimated_monthly_rental": "float",
+    "latitude": "float", "longitude": "float", "ai_investment_score": "float",
+}
 logging.basicConfig(filename=LOG_PATH, level=logging.INFO)
 
 
-def fetch_listing_urls_from_sitemap(sitemap_url, session):
-    """Recursively fetch all property URLs from Redfin sitemaps."""
+def _local_name(tag):
+    """Strip the XML namespace from an element tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def open_sitemap_stream(resp):
+    """
+    Wrap a streamed sitemap response in a binary file object for iterparse.
+    - Transfer encodings (Content-Encoding: gzip) are decoded by urllib3
+    - .xml.gz bodies served as application/x-gzip are detected by their magic bytes and gunzipped on the fly
+    """
+    resp.raw.decode_content = True
+    stream = io.BufferedReader(resp.raw, buffer_size=SITEMAP_CHUNK_SIZE)
+    if stream.peek(2)[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+
+def iter_sitemap_entries(sitemap_url, session, state_store=None):
+    """
+    Stream a sitemap and yield (kind, loc, lastmod) as each entry is closed.
+
+    kind is "sitemap" for <sitemap> children of a sitemapindex and "url" for <url> entries of a urlset.
+    Parsed elements are cleared as soon as they are yielded, so memory stays flat regardless of sitemap size.
+    With a state_store the request is conditional: a 304 yields only the children recorded for a
+    sitemapindex, and validators are recorded once the sitemap has been parsed to the end.
+    """
+    headers = state_store.conditional_headers(sitemap_url) if state_store else {}
+    with session.get(sitemap_url, timeout=30, stream=True, headers=headers) as resp:
+        if resp.status_code == 304:
+            logging.info(f"Sitemap unchanged since last run: {sitemap_url}")
+            for child_url in state_store.sitemap_children(sitemap_url):
+                yield "sitemap", child_url, None
+            return
+        resp.raise_for_status()
+        root = None
+        child_sitemaps = []
+        for event, elem in ET.iterparse(open_sitemap_stream(resp), events=("start", "end")):
+            if root is None:
+                root = elem
+                if _local_name(root.tag) not in ("sitemapindex", "urlset"):
+                    logging.warning(f"Unknown root tag {root.tag} in {sitemap_url}")
+                    return
+                continue
+            if event != "end":
+                continue
+
+            kind = _local_name(elem.tag)
+            if kind not in ("sitemap", "url"):
+                continue
+
+            loc = lastmod = None
+            for child in elem:
+                name = _local_name(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = (child.text or "").strip() or None
+            if loc:
+                if kind == "sitemap":
+                    child_sitemaps.append(loc)
+                yield kind, loc, lastmod
+
+            # Drop every finished entry still referenced by the root
+            root.clear()
+
+        if state_store:
+            state_store.record_sitemap(sitemap_url, resp.headers.get("ETag"), resp.headers.get("Last-Modified"),
+                                       child_sitemaps)
+
+
+def listing_state(loc):
+    """Return the state segment of a Redfin listing URL (https://www.redfin.com/FL/Miami/...), or ""."""
+    parts = urlsplit(loc).path.split("/", 2)
+    return parts[1] if len(parts) > 2 else ""
+
+
+# Redfin names per-state child sitemaps with the upper-case state code as the last token of the file name,
+# optionally followed by a shard number (sitemap_com_listings_FL.xml.gz, newest_listings_TX_2.xml), or
+# files them under an upper-case state directory (/sitemaps/FL/listings.xml), like listing URLs themselves
+SITEMAP_STATE_SUFFIX = re.compile(r'(?:^|[_-])([A-Z]{2})(?:[_-]\d+)?$')
+
+
+def sitemap_state(sitemap_url):
+    """
+    Return the state a child sitemap covers when its URL names one in Redfin's state-sitemap pattern, else None.
+    - Only upper-case codes count, so ordinary lower-case words (in, or, id, me, co, de, hi, ok, la) never prune
+    - None means "unsure": the sitemap is always fetched and its listings are filtered by URL instead
+    """
+    segments = [s for s in urlsplit(sitemap_url).path.split("/") if s]
+    if not segments:
+        return None
+    stem = re.sub(r'(\.xml)?(\.gz)?$', '', segments[-1], flags=re.I)
+    match = SITEMAP_STATE_SUFFIX.search(stem)
+    if match and match.group(1) in US_STATE_CODES:
+        return match.group(1)
+    for segment in segments[:-1]:
+        if segment in US_STATE_CODES:
+            return segment
+    return None
+
+
+def read_sitemap(sitemap_url, session, state_store=None):
+    """
+    Fetch one sitemap and return (child sitemap URLs, listing URLs in TARGET_STATES).
+    With a state_store only listings that are new or whose <lastmod> changed are returned.
+    """
+    child_sitemaps = []
     listing_urls = set()
+    url_count = 0
     try:
         logging.info(f"Fetching sitemap: {sitemap_url}")
-        resp = session.get(sitemap_url, timeout=30)
-        resp.raise_for_status()
-        root = ET.fromstring(resp.content)
-        if root.tag[0] == "{":
-            namespace = root.tag[1:].split("}")[0]
-        else:
-            namespace = ""
-        ns = {'ns': namespace} if namespace else {}
-
-        if root.tag.endswith('sitemapindex'):
-            sitemap_tags = root.findall('.//ns:sitemap', ns) if ns else root.findall('.//sitemap')
-            logging.info(f"Found {len(sitemap_tags)} state sitemaps in {sitemap_url}")
-            for sm in sitemap_tags:
-                state_url_tag = sm.find('ns:loc', ns) if ns else sm.find('loc')
-                if state_url_tag is not None:
-                    state_feed_url = state_url_tag.text
-                    logging.info(f"Fetching state sitemap: {state_feed_url}")
-                    state_listing_urls = fetch_listing_urls_from_sitemap(state_feed_url, session)
-                    listing_urls.update(state_listing_urls)
-        elif root.tag.endswith('urlset'):
-            url_tags = root.findall('.//ns:url', ns) if ns else root.findall('.//url')
-            logging.info(f"Found {len(url_tags)} listings in {sitemap_url}")
-            for url_tag in url_tags:
-                loc_tag = url_tag.find('ns:loc', ns) if ns else url_tag.find('loc')
-                if loc_tag is not None:
-                    loc = loc_tag.text
-                    if any(f"/{state}/" in loc for state in TARGET_STATES):
-                        listing_urls.add(loc)
-        else:
-            logging.warning(f"Unknown root tag {root.tag} in {sitemap_url}")
+        for kind, loc, lastmod in iter_sitemap_entries(sitemap_url, session, state_store):
+            if kind == "sitemap":
+                child_sitemaps.append(loc)
+            else:
+                url_count += 1
+                if listing_state(loc) in TARGET_STATES and (
+                        state_store is None or state_store.listing_changed(loc, lastmod)):
+                    listing_urls.add(loc)
+        if child_sitemaps:
+            logging.info(f"Found {len(child_sitemaps)} state sitemaps in {sitemap_url}")
+        if url_count:
+            logging.info(f"Found {url_count} listings in {sitemap_url}")
     except Exception as e:
         logging.error(f"Failed to parse sitemap {sitemap_url}: {e}")
+    return child_sitemaps, listing_urls
+
+
+def fetch_listing_urls_from_sitemap(sitemap_url, session, state_store=None, max_workers=SITEMAP_WORKERS):
+    """
+    Fetch all property URLs reachable from a sitemap.
+    Child sitemaps of a sitemapindex are fetched concurrently on a bounded pool, and children whose
+    state is outside TARGET_STATES are skipped before they are downloaded.
+    """
+    listing_urls = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(read_sitemap, sitemap_url, session, state_store)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                child_sitemaps, urls = future.result()
+                listing_urls.update(urls)
+                for child_url in child_sitemaps:
+                    state = sitemap_state(child_url)
+                    if state and state not in TARGET_STATES:
+                        logging.info(f"Skipping sitemap outside target states ({state}): {child_url}")
+                        continue
+                    pending.add(executor.submit(read_sitemap, child_url, session, state_store))
     return listing_urls
 
 
-def fetch_sitemap_urls(direct_session):
-    """Fetch all listing URLs from the main sitemap indexes using direct session."""
+def fetch_sitemap_urls(direct_session, state_store=None):
+    """
+    Fetch all listing URLs from the main sitemap indexes using direct session.
+    With a state_store only URLs that are new or changed since the last committed run are returned.
+    """
     all_listing_urls = set()
     for sitemap_url in SITEMAP_URLS:
-        urls = fetch_listing_urls_from_sitemap(sitemap_url, direct_session)
+        urls = fetch_listing_urls_from_sitemap(sitemap_url, direct_session, state_store)
         logging.info(f"Fetched {len(urls)} listing URLs from {sitemap_url}")
         all_listing_urls.update(urls)
     
@@ -146,25 +406,6 @@ def log_missing(field, url):
     logging.warning(f"{field} not found for {url}")
 
 
-# HELPER FUNCTIONS FOR ENHANCED EXTRACTION
-def deep_get(data, keys):
-    """Safely access nested dictionary items"""
-    if not data or not isinstance(data, dict):
-        return None
-
-    if not keys:
-        return data
-
-    if len(keys) == 1:
-        return data.get(keys[0])
-
-    key = keys[0]
-    if key in data and isinstance(data[key], dict):
-        return deep_get(data[key], keys[1:])
-
-    return None
-
-
 # NEW: Function to normalize ZIP codes
 def normalize_zip(zip_like):
     """
@@ -212,78 +453,103 @@ def clean_price_text(price_text):
     return price_str.strip()
 
 
-def extract_detailed_json(soup, url):
-    """Extract JSON data from script tags with more comprehensive patterns."""
-    json_patterns = [
-        r'window\.__INITIAL_STATE__\s*=\s*(\{.*?\});',
-        r'window\.__PRELOADED_STATE__\s*=\s*(\{.*?\});',
-        r'_PRELOADED_STATE_\s*=\s*(\{.*?\});',
-        r'window\.__reactServerState\s*=\s*(\{.*?\});',
-        r'window\.__APOLLO_STATE__\s*=\s*(\{.*?\});',
-        r'window\.__REDUX_STATE__\s*=\s*(\{.*?\});',
-        r'ReactDOM.hydrate\(.*?,\s*(\{.*?\})\);'
-    ]
-
-    for script in soup.find_all("script"):
-        if not script.string:
-            continue
+# Assignments that carry the page's embedded state, found by literal search rather than regex over script bodies
+STATE_MARKERS = [
+    "window.__INITIAL_STATE__",
+    "window.__PRELOADED_STATE__",
+    "_PRELOADED_STATE_",
+    "window.__reactServerState",
+    "window.__APOLLO_STATE__",
+    "window.__REDUX_STATE__",
+]
+LD_JSON = "ld+json"
+STATE_MARKER_PATTERN = re.compile(
+    r"(?:(" + "|".join(re.escape(marker) for marker in STATE_MARKERS) + r")\s*=\s*)"
+    r"|(?:<script[^>]*application/ld\+json[^>]*>\s*)"
+)
+JSON_DECODER = json.JSONDecoder()
 
-        script_text = script.string
-        for pattern in json_patterns:
-            try:
-                match = re.search(pattern, script_text, re.DOTALL)
-                if match:
-                    json_text = match.group(1)
-                    # Balance braces if needed
-                    open_braces = json_text.count('{')
-                    close_braces = json_text.count('}')
-                    if open_braces > close_braces:
-                        json_text += '}' * (open_braces - close_braces)
-                    return json.loads(json_text)
-            except Exception:
-                continue
 
-    # Try inline JSON with LD+JSON
-    for script in soup.find_all("script", {"type": "application/ld+json"}):
-        if script.string:
-            try:
-                return json.loads(script.string)
-            except:
-                continue
+def extract_state_blobs(html_text, url=""):
+    """
+    Find every embedded state object in one scan of the page.
 
-    return {}
+    Returns {marker: object} in document order, keyed by the STATE_MARKERS entry (first occurrence wins),
+    plus LD_JSON -> [objects] for <script type="application/ld+json"> blocks.
+    Each object is decoded in place with JSONDecoder.raw_decode and the scan resumes after it,
+    so multi-megabyte state blobs are walked once by the JSON decoder and never by a regex.
+    """
+    blobs = {}
+    position = 0
+    while True:
+        match = STATE_MARKER_PATTERN.search(html_text, position)
+        if not match:
+            break
+        marker = match.group(1) or LD_JSON
+        position = match.end()
+        if marker in blobs and marker != LD_JSON:
+            continue
+        if position >= len(html_text) or html_text[position] not in "{[":
+            continue
+        try:
+            value, position = JSON_DECODER.raw_decode(html_text, position)
+        except ValueError as e:
+            logging.debug(f"Undecodable {marker} blob for {url}: {e}")
+            continue
+        if marker == LD_JSON:
+            blobs.setdefault(LD_JSON, []).append(value)
+        else:
+            blobs[marker] = value
+    return blobs
 
 
-def extract_json_from_html(soup, url):
-    # Find JSON inside <script> tags
-    for script in soup.find_all("script"):
-        if script.string and "window.__INITIAL_STATE__" in script.string:
-            try:
-                match = re.search(r'window\.__INITIAL_STATE__\s*=\s*(\{.*?\});', script.string, re.DOTALL)
-                if match:
-                    json_text = match.group(1)
-                    return json.loads(json_text)
-            except Exception as e:
-                logging.error(f"Error parsing JSON for {url}: {e}")
-    return {}
+def parse_html(text, parser="lxml"):
+    """Parse a page into an lxml document with the given HTML_PARSER backend."""
+    if parser == "lxml":
+        try:
+            return lxml_html.fromstring(text)
+        except (etree.ParserError, ValueError) as e:
+            logging.debug(f"lxml rejected the page ({e}); parsing it with html.parser instead")
+    elif parser != "html.parser":
+        raise ValueError(f"Unknown HTML_PARSER {parser!r}; use 'lxml' or 'html.parser'")
+    # Imported here: BeautifulSoup is only needed for this backend
+    from lxml.html import soupparser
+    return soupparser.fromstring(text, features="html.parser")
 
 
-# Function for XPath extraction when needed - using lxml if available
-def extract_by_xpath(html_content, xpath_expression):
-    try:
-        from lxml import html
-        tree = html.fromstring(html_content)
-        elements = tree.xpath(xpath_expression)
-        if elements:
-            if hasattr(elements[0], 'text_content'):
-                return elements[0].text_content().strip()
-            elif isinstance(elements[0], str):
-                return elements[0].strip()
-    except ImportError:
-        logging.info("lxml not available for XPath extraction, falling back to CSS selectors")
-    except Exception as e:
-        logging.error(f"XPath extraction error: {e}")
-    return None
+class ListingPage:
+    """
+    A fetched listing page, parsed once into an lxml document shared by every extraction rule.
+    Embedded state is scanned for on first use, and every blob is decoded in that one scan.
+    """
+
+    def __init__(self, url, content, parser=None):
+        self.url = url
+        self.content = content
+        # Redfin serves UTF-8; decode up front so lxml does not fall back to latin-1 on pages without a charset
+        self.text = content.decode("utf-8", errors="replace")
+        self.tree = parse_html(self.text, parser or HTML_PARSER)
+        self._blobs = None
+
+    def json(self, blob):
+        """
+        Return an embedded JSON blob:
+        - "state": the first state object on the page, falling back to the first LD+JSON block
+        - "initial": window.__INITIAL_STATE__
+        """
+        if self._blobs is None:
+            self._blobs = extract_state_blobs(self.text, self.url)
+        if blob == "initial":
+            return self._blobs.get("window.__INITIAL_STATE__", {})
+        for marker, value in self._blobs.items():
+            if marker != LD_JSON:
+                return value
+        return self._blobs.get(LD_JSON, [{}])[0]
+
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'(\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})')
+PAYMENT_PATTERN = re.compile(r'\$[\d,]+/mo')
 
 
 # Function to extract email addresses from text
@@ -291,8 +557,7 @@ def extract_email_from_text(text):
     if not text:
         return None
 
-    email_pattern = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
-    match = email_pattern.search(text)
+    match = EMAIL_PATTERN.search(text)
     if match:
         return match.group(0)
     return None
@@ -325,900 +590,864 @@ def extract_phone_from_text(text):
     if not text:
         return None
 
-    phone_pattern = re.compile(r'(\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4})')
-    match = phone_pattern.search(text)
+    match = PHONE_PATTERN.search(text)
     if match:
         return normalize_phone(match.group(1))
     return None
 
 
-# NEW: Function to extract monthly payment estimate
-def extract_monthly_payment(soup, html_content):
-    """Extract monthly payment estimate using both CSS selectors and XPath."""
-    payment_estimate = ""
-
-    # Try CSS Selector
-    css_selector = "#MortgageCalculator > div.calculatorContentsContainer > div.MortgageCalculatorSummary.isDesktop > div > div.sectionText.shift-reset-right > div > p"
-    payment_tag = soup.select_one(css_selector)
-    if payment_tag:
-        payment_estimate = payment_tag.get_text(strip=True)
-        logging.info(f"Found monthly_payment_estimate using CSS selector: {payment_estimate}")
-        return payment_estimate
-
-    # Try XPath if CSS selector failed
-    xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[14]/section/div/div/div/div/div[1]/div[1]/div/div[1]/div/p'
-    payment_text = extract_by_xpath(html_content, xpath)
-    if payment_text:
-        payment_estimate = payment_text
-        logging.info(f"Found monthly_payment_estimate using XPath: {payment_estimate}")
-        return payment_estimate
-
-    # Generic mortgage calculator selector fallback
-    generic_selectors = [
-        ".MortgageCalculatorSummary p",
-        ".sectionText p",
-        "#MortgageCalculator p",
-    ]
-
-    for selector in generic_selectors:
-        tags = soup.select(selector)
-        for tag in tags:
-            text = tag.get_text(strip=True)
-            if re.search(r'\$[\d,]+/mo', text) or "per month" in text.lower():
-                payment_estimate = text
-                logging.info(f"Found monthly_payment_estimate using generic selector: {payment_estimate}")
-                return payment_estimate
-
-    return payment_estimate
-
-
-def scrape_redfin_listing(url, session):
-    """Scrape one Redfin property page and extract all fields. Log missing fields."""
-    try:
-        resp = session.get(url, timeout=30)
-        if resp.status_code != 200:
-            logging.warning(f"Failed to fetch {url}: {resp.status_code}")
-            return None
-        soup = BeautifulSoup(resp.text, "html.parser")
-        data = dict.fromkeys(FIELDS, "")
-        data['scrape_date'] = time.strftime("%Y-%m-%d")
-        data['property_url'] = url
-        data['property_id'] = url.split("/")[-1]
-        data['permalink'] = url
+def phone_allowed(phone):
+    return phone not in BLACKLISTED_PHONE_NUMBERS
 
-        # Try to extract embedded JSON for hidden fields
-        page_json = extract_json_from_html(soup, url)
-        detailed_json = extract_detailed_json(soup, url)
-
-        # NEW: Extract monthly payment estimate
-        data['monthly_payment_estimate'] = extract_monthly_payment(soup, resp.content)
-
-        # ENHANCED ADDRESS EXTRACTION
-        street_found = False
-
-        # Method 1: Original method with data-rf-test-id
-        street_tag = soup.find("span", {"data-rf-test-id": "abp-streetLine"})
-        if street_tag:
-            data['street'] = street_tag.get_text(strip=True)
-            street_found = True
-            logging.info(f"Found street using data-rf-test-id for {url}")
-
-        # Method 2: Try specific CSS selector for streetAddress class
-        if not street_found:
-            street_tag = soup.select_one('h1.streetAddress, .streetAddress, h1.addressBannerRevamp')
-            if street_tag:
-                data['street'] = street_tag.get_text(strip=True)
-                street_found = True
-                logging.info(f"Found street using streetAddress class for {url}")
-
-        # Method 3: Try the specific selectors from your requirements
-        if not street_found:
-            street_tag = soup.select_one(
-                '#content > div.detailsContent > div.theRailSection > div.alongTheRail > div:nth-child(1) > section > div > div > div > div.flex-1 > div.AddressBannerV2.deskto[...]')
-            if street_tag:
-                data['street'] = street_tag.get_text(strip=True)
-                street_found = True
-                logging.info(f"Found street using specific CSS selector for {url}")
-
-        # Method 4: More generic heading patterns
-        if not street_found:
-            address_candidates = [
-                soup.select_one('.address h1'),
-                soup.select_one('.address-container h1'),
-                soup.select_one('.AddressBannerV2 h1'),
-                soup.select_one('.address'),
-                soup.select_one('[data-rf-test-name="address-value"]'),
-                soup.find('h1', string=lambda s: s and any(char.isdigit() for char in s))
-            ]
-
-            for candidate in address_candidates:
-                if candidate:
-                    data['street'] = candidate.get_text(strip=True)
-                    street_found = True
-                    logging.info(f"Found street using generic patterns for {url}")
-                    break
 
-        # Method 5: Try to extract from JSON
-        if not street_found and detailed_json:
-            try:
-                # Try various paths where address might be stored in JSON
-                street = deep_get(detailed_json, ["payload", "propertyData", "address", "streetLine"]) or \
-                         deep_get(detailed_json, ["propertyData", "address", "streetLine"]) or \
-                         deep_get(detailed_json, ["address", "streetLine"]) or \
-                         deep_get(detailed_json, ["payload", "property", "streetAddress"])
-
-                if street:
-                    data['street'] = street
-                    street_found = True
-                    logging.info(f"Found street from JSON data for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting street from JSON for {url}: {e}")
+def photo_urls_from_json(items):
+    """Pull photo URLs out of a JSON media list (dicts keyed url/photoUrl/imageUrl)."""
+    if not isinstance(items, list):
+        return None
+    urls = [item.get('url') or item.get('photoUrl') or item.get('imageUrl') for item in items if isinstance(item, dict)]
+    return [u for u in urls if u]
+
+
+def lazy_photo_urls(urls):
+    """Keep only absolute image URLs from lazily-loaded <img> tags."""
+    return [u for u in urls if u.startswith('http') and ('.jpg' in u or '.png' in u or '.jpeg' in u)]
+
+
+def payment_text(text):
+    """Accept generic mortgage-calculator text only when it reads like a monthly payment."""
+    return text if PAYMENT_PATTERN.search(text) or "per month" in text.lower() else None
+
+
+def text_with_digit(text):
+    return text if any(char.isdigit() for char in text) else None
+
+
+def tel_href(href):
+    return normalize_phone(href[4:])  # Remove 'tel:' prefix
+
+
+def mailto_href(href):
+    return href[7:]  # Remove 'mailto:' prefix
+
+
+# Selectors and XPaths shared by more than one field
+MORTGAGE_SUMMARY_CSS = "#MortgageCalculator > div.calculatorContentsContainer > div.MortgageCalculatorSummary.isDesktop > div > div.sectionText.shift-reset-right > div > p"
+LISTING_CONTACT_CSS = "#house-info > div:nth-child(3) > div > div > div.listingContactSection"
+LISTING_CONTACT_XPATH = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[2]'
+AGENT_PHONE_EXTRA_XPATH = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[1]/div[2]/div/div/span[5]/div/span[2]'
+
+# Declarative extraction rules for FIELDS, in evaluation order.
+# Each Field lists its sources in priority order; Ref() reads a field extracted earlier in the list.
+# The rules are compiled once here and shared by every scrape.
+# Intended differences from the BeautifulSoup cascades these rules replaced (checked in tests/test_extraction.py):
+# - Pages are parsed with lxml instead of html.parser; element text is joined like get_text(strip=True)
+# - A match with empty text no longer ends a field's cascade, so e.g. an empty h1.streetAddress falls through
+#   to the JSON street instead of leaving street blank
+# - The cascade's third street selector was truncated ("...div.AddressBannerV2.deskto[...]") and raised on every
+#   page that reached it, losing the whole record; it is dropped, and .AddressBannerV2 h1 below covers that banner
+# - The last street fallback tests an h1's full text for a digit; soup.find(string=...) only saw single-string h1s
+# - status is extracted; the cascade left it blank, so the listing history never saw a status transition
+FIELD_RULES = [
+    Field('monthly_payment_estimate',
+          Css(MORTGAGE_SUMMARY_CSS),
+          XPath('/html/body/div[1]/div[8]/div[2]/div[1]/div[14]/section/div/div/div/div/div[1]/div[1]/div/div[1]/div/p'),
+          Css('.MortgageCalculatorSummary p', every=True, transform=payment_text),
+          Css('.sectionText p', every=True, transform=payment_text),
+          Css('#MortgageCalculator p', every=True, transform=payment_text)),
+
+    # Address
+    Field('street',
+          Css('span[data-rf-test-id="abp-streetLine"]'),
+          Css('h1.streetAddress, .streetAddress, h1.addressBannerRevamp'),
+          Css('.address h1'),
+          Css('.address-container h1'),
+          Css('.AddressBannerV2 h1'),
+          Css('.address'),
+          Css('[data-rf-test-name="address-value"]'),
+          Css('h1', every=True, transform=text_with_digit),
+          Json(["payload", "propertyData", "address", "streetLine"],
+               ["propertyData", "address", "streetLine"],
+               ["address", "streetLine"],
+               ["payload", "property", "streetAddress"]),
+          required=True),
+    Field('city',
+          Css('span[data-rf-test-id="abp-cityStateZip"]'),
+          Css('.cityStateZip'),
+          Css('.address-city'),
+          Css('[data-rf-test-name="city-value"]'),
+          Json(["payload", "propertyData", "address", "city"],
+               ["propertyData", "address", "city"],
+               ["address", "city"]),
+          required=True),
+    # Redfin listing URLs are https://www.redfin.com/{state}/{city}/{street-zip}/home/{id}
+    Field('state',
+          Regex(r'^[^/]*//[^/]+/([^/]+)/', target="url"),
+          required=True),
+    Field('zip_code',
+          Regex(r'^[^/]*//[^/]+/[^/]+/[^/]+/[^/]*?(\d{5})', target="url"),
+          Regex(r'^[^/]*//[^/]+/[^/]+/[^/]+/[^/\d]*(\d+)', target="url"),
+          Json(["payload", "propertyData", "address", "zipcode"],
+               ["propertyData", "address", "zipcode"],
+               ["address", "zipcode"],
+               ["zipCode"]),
+          normalize=normalize_zip,
+          required=True),
+
+    # Facts
+    Field('beds', Css('div[data-rf-test-id="abp-beds"]'), required=True),
+    Field('full_baths', Css('div[data-rf-test-id="abp-baths"]'), required=True),
+    Field('sqft', Css('div[data-rf-test-id="abp-sqFt"]'), required=True),
+    Field('list_price', Css('div[data-rf-test-id="abp-price"]'), normalize=clean_price_text, required=True),
+    Field('text', Css('div.remarks'), required=True),
+    # Listing status ("Active", "Pending", ...), tracked by the listing history alongside list_price
+    Field('status',
+          Css('span[data-rf-test-id="abp-status"], div[data-rf-test-id="abp-status"]'),
+          Css('.ListingStatusBannerSection, .listingStatusBanner'),
+          Json(["payload", "propertyData", "listingStatus"],
+               ["propertyData", "listingStatus"],
+               ["payload", "propertyData", "mlsStatus"],
+               ["propertyData", "mlsStatus"],
+               ["payload", "propertyData", "status"],
+               ["propertyData", "status"]),
+          accept=lambda status: isinstance(status, str)),
+
+    # Photos: kept as a list until the record is finalized
+    Field('photos',
+          Json(["payload", "propertyData", "media", "photos"],
+               ["propertyData", "media", "photos"],
+               ["payload", "propertyDetail", "photos"],
+               ["propertyDetail", "photos"],
+               transform=photo_urls_from_json),
+          Css('img.gallery-image', attr='src', collect=True),
+          Css('img.Photo', attr='src', collect=True),
+          Css('div.HomePhotos img', attr='src', collect=True),
+          Css('section.PhotosView img', attr='src', collect=True),
+          Css('.InlinePhotoPreview img', attr='src', collect=True),
+          Css("div[data-rf-test-id='gallery'] img", attr='src', collect=True),
+          Css('div.HomeCard img', attr='src', collect=True),
+          Css('.multimedia-img img', attr='src', collect=True),
+          Css('picture img', attr='src', collect=True),
+          Css('img[data-lazy-src], img[loading="lazy"]', attr=('data-lazy-src', 'data-src', 'src'), collect=True,
+              transform=lazy_photo_urls),
+          required=True),
+    Field('primary_photo', Ref('photos', 0), required=True),
+    Field('image1_url', Ref('photos', 0), Css('#MBImage > picture > img, #MBImage img', attr='src'), required=True),
+    Field('image2_url', Ref('photos', 1), Css('#MBImage6 > picture > img, #MBImage6 img', attr='src'), required=True),
+    Field('image3_url', Ref('photos', 2), Css('#MBImage9 > picture > img, #MBImage9 img', attr='src'), required=True),
+    Field('image4_url', Ref('photos', 3), Css('#MBImage18 > picture > img, #MBImage18 img', attr='src'), required=True),
+
+    # Agent and listing-agent phones
+    Field('agent_phone_1',
+          Css(MORTGAGE_SUMMARY_CSS, transform=extract_phone_from_text),
+          XPath('/html/body/div[1]/div[8]/div[2]/div[1]/div[18]/section/div/div/div/div/div[1]/div[1]/div/div[1]/div/p',
+                transform=extract_phone_from_text),
+          accept=phone_allowed),
+    Field('agent_phone_2',
+          Css("#content > div.detailsContent > div.theRailSection > div.alongTheRail > div:nth-child(12) > section > div > div > div.cta > p > a",
+              transform=normalize_phone),
+          XPath(AGENT_PHONE_EXTRA_XPATH, transform=normalize_phone),
+          accept=phone_allowed),
+    Field('listing_agent_phone',
+          Css("#content > div.detailsContent > div.belowTheRail > div:nth-child(2) > section > div > div.disclaimer > div > div.listingProvider > div.listingAgent",
+              transform=extract_phone_from_text),
+          XPath('/html/body/div[1]/div[8]/div[3]/div[2]/section/div/div[2]/div/div[1]/div[2]',
+                transform=extract_phone_from_text),
+          accept=phone_allowed),
+    Field('listing_agent_phone_2',
+          Css(LISTING_CONTACT_CSS, transform=extract_phone_from_text),
+          XPath(LISTING_CONTACT_XPATH, transform=extract_phone_from_text),
+          accept=phone_allowed),
+    Field('listing_agent_phone_3',
+          Css(LISTING_CONTACT_CSS + ' a[href^="tel:"]', attr='href', transform=tel_href),
+          accept=phone_allowed),
+    Field('listing_agent_phone_4',
+          Css(LISTING_CONTACT_CSS, transform=extract_phone_from_text),
+          XPath(LISTING_CONTACT_XPATH, transform=extract_phone_from_text),
+          accept=phone_allowed),
+    Field('listing_agent_phone_5',
+          Css("#house-info > div:nth-child(3) > div > div > div.agent-info-container > div.agent-info-content > div > div > span.agent-extra-info--phone > div > span:nth-child(2)",
+              transform=normalize_phone),
+          XPath(AGENT_PHONE_EXTRA_XPATH, transform=normalize_phone),
+          accept=phone_allowed),
+    Field('listing_source',
+          Css("#house-info > div:nth-child(3) > div > p"),
+          XPath('/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/p')),
+
+    # Listing agent email, mirrored into agent_email
+    Field('listing_agent_email',
+          Css("#house-info > div:nth-child(3) > div > div > div.agent-info-container > div.agent-info-content > div > div > span.agent-extra-info--email > div > span:nth-child(2)",
+              transform=lambda text: extract_email_from_text(text) or text),
+          XPath('/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[1]/div[2]/div/div/span[6]/div/span[2]',
+                transform=lambda text: extract_email_from_text(text) or text),
+          Css('.agent-info-content', transform=extract_email_from_text),
+          Css('.listingContactSection', transform=extract_email_from_text),
+          Css('.agentInfo', transform=extract_email_from_text),
+          Css('.contactInfo', transform=extract_email_from_text),
+          Css('span.email', transform=extract_email_from_text),
+          Css('a[href^="mailto:"]', attr='href', transform=mailto_href),
+          accept=lambda email: '@' in email),
+    Field('agent_email', Ref('listing_agent_email')),
+
+    # Primary agent phone: best of the phones above, then page-wide fallbacks
+    Field('agent_phone',
+          Ref('agent_phone_1'),
+          Ref('agent_phone_2'),
+          Css('.PhoneNumberDisplay', transform=extract_phone_from_text),
+          Css('.agentInfo', transform=extract_phone_from_text),
+          Css('.contactInfo', transform=extract_phone_from_text),
+          Css('.agent-phone', transform=extract_phone_from_text),
+          Css('[data-rf-test-name="agentPhoneValue"]', transform=extract_phone_from_text),
+          Css('a[href^="tel:"]', attr='href', every=True, transform=tel_href),
+          Json(["payload", "propertyData", "listingAgent", "phoneNumber"],
+               ["propertyData", "listingAgent", "phoneNumber"],
+               ["agentInfo", "phone"],
+               transform=normalize_phone),
+          Json(["propertyDetails", "listing", "agentPhone"], blob="initial", transform=normalize_phone),
+          accept=phone_allowed,
+          required=True),
+
+    # Agent and listing source details
+    Field('agent_name',
+          Css('#house-info > div:nth-child(3) > div > div > div.agent-info-container > div.agent-info-content > div > div > span.agent-basic-details--heading > span'),
+          XPath('/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[1]/div[2]/div/div/span[1]/span')),
+    Field('listing_source_name',
+          Css('#house-info > div:nth-child(3) > div > div > div.listingInfoSection > div > div.ListingSource > span.ListingSource--dataSourceName'),
+          XPath('/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[2]/div/div[2]/span[3]')),
+    Field('listing_source_id',
+          Css('#house-info > div:nth-child(3) > div > div > div.listingInfoSection > div > div.ListingSource > span.ListingSource--mlsId')),
+]
 
-        # If still not found, log it
-        if not street_found:
-            log_missing("street", url)
+EXTRACTION_ENGINE = ExtractionEngine(FIELD_RULES, on_missing=log_missing)
 
-        # City extraction (keeping the original with fallbacks)
-        city_tag = soup.find("span", {"data-rf-test-id": "abp-cityStateZip"})
-        if city_tag:
-            data['city'] = city_tag.get_text(strip=True)
-        else:
-            # Try to get city from alternate sources
-            city_candidates = [
-                soup.select_one('.cityStateZip'),
-                soup.select_one('.address-city'),
-                soup.select_one('[data-rf-test-name="city-value"]')
-            ]
-
-            for candidate in city_candidates:
-                if candidate:
-                    data['city'] = candidate.get_text(strip=True)
-                    break
 
-            # Try to extract city from JSON if still not found
-            if not data['city'] and detailed_json:
-                try:
-                    city = deep_get(detailed_json, ["payload", "propertyData", "address", "city"]) or \
-                           deep_get(detailed_json, ["propertyData", "address", "city"]) or \
-                           deep_get(detailed_json, ["address", "city"])
-
-                    if city:
-                        data['city'] = city
-                except Exception:
-                    pass
-
-            if not data['city']:
-                log_missing("city", url)
-
-        # Try to parse state/zip from URL if not found
-        url_parts = url.split("/")
-        if len(url_parts) > 4:
-            data['state'] = url_parts[3]
-            if len(url_parts) > 5:
-                # UPDATED: use normalize_zip for ZIP codes
-                zip_match = re.search(r'(\d{5})', url_parts[5])
-                if zip_match:
-                    data['zip_code'] = normalize_zip(zip_match.group(1))
-                else:
-                    # fallback: extract any digits and zero-pad
-                    any_digits = re.search(r'(\d+)', url_parts[5])
-                    if any_digits:
-                        data['zip_code'] = normalize_zip(any_digits.group(1))
-        else:
-            log_missing("state or zip_code", url)
-
-        # Try to get ZIP from JSON as well
-        if detailed_json and (not data.get('zip_code') or data.get('zip_code') == ""):
-            zip_val = deep_get(detailed_json, ["payload", "propertyData", "address", "zipcode"]) or \
-                      deep_get(detailed_json, ["propertyData", "address", "zipcode"]) or \
-                      deep_get(detailed_json, ["address", "zipcode"]) or \
-                      deep_get(detailed_json, ["zipCode"])
-
-            if zip_val:
-                data['zip_code'] = normalize_zip(zip_val)
-
-        # Example for beds, baths, sqft, price
-        beds_tag = soup.find("div", {"data-rf-test-id": "abp-beds"})
-        baths_tag = soup.find("div", {"data-rf-test-id": "abp-baths"})
-        sqft_tag = soup.find("div", {"data-rf-test-id": "abp-sqFt"})
-        price_tag = soup.find("div", {"data-rf-test-id": "abp-price"})
-        data['beds'] = beds_tag.get_text(strip=True) if beds_tag else log_missing("beds", url)
-        data['full_baths'] = baths_tag.get_text(strip=True) if baths_tag else log_missing("full_baths", url)
-        data['sqft'] = sqft_tag.get_text(strip=True) if sqft_tag else log_missing("sqft", url)
-
-        # UPDATED: Clean price text to remove "Price," and "—Est." text
-        if price_tag:
-            raw_price = price_tag.get_text(strip=True)
-            data['list_price'] = clean_price_text(raw_price)
-            logging.info(f"Cleaned price from '{raw_price}' to '{data['list_price']}'")
-        else:
-            log_missing("list_price", url)
+def parse_redfin_listing(url, content, scrape_date=None):
+    """
+    Extract all fields from a fetched Redfin property page. Log missing fields.
+    scrape_date defaults to today; re-extraction passes the date the page was originally fetched.
+    """
+    try:
+        # Parse once; every rule in FIELD_RULES runs against this document
+        page = ListingPage(url, content)
+        data = dict.fromkeys(FIELDS, "")
+        data['scrape_date'] = scrape_date or time.strftime("%Y-%m-%d")
+        data['property_url'] = url
+        data['property_id'] = url.split("/")[-1]
+        data['permalink'] = url
 
-        # Get description text
-        desc_tag = soup.find("div", {"class": "remarks"})
-        data['text'] = desc_tag.get_text(strip=True) if desc_tag else log_missing("text", url)
+        EXTRACTION_ENGINE.extract(page, data)
 
-        # ENHANCED PHOTO EXTRACTION WITH MULTIPLE METHODS
-        photo_found = False
+        if data['photos']:
+            data['photos'] = ",".join(data['photos'])
 
-        # Method 1: Try to extract from JSON data (most reliable when available)
-        if detailed_json:
-            # Extract photo URLs from the JSON
-            try:
-                media_items = deep_get(detailed_json, ["payload", "propertyData", "media", "photos"]) or \
-                              deep_get(detailed_json, ["propertyData", "media", "photos"]) or \
-                              deep_get(detailed_json, ["payload", "propertyDetail", "photos"]) or \
-                              deep_get(detailed_json, ["propertyDetail", "photos"])
-
-                if media_items and isinstance(media_items, list) and len(media_items) > 0:
-                    # Extract the URLs from the media items
-                    photo_urls = []
-                    for item in media_items:
-                        if isinstance(item, dict):
-                            url_val = item.get('url') or item.get('photoUrl') or item.get('imageUrl')
-                            if url_val:
-                                photo_urls.append(url_val)
-
-                    if photo_urls:
-                        data['photos'] = ",".join(photo_urls)
-                        data['primary_photo'] = photo_urls[0]
-
-                        # Fill individual image slots
-                        if len(photo_urls) > 0:
-                            data['image1_url'] = photo_urls[0]
-                        if len(photo_urls) > 1:
-                            data['image2_url'] = photo_urls[1]
-                        if len(photo_urls) > 2:
-                            data['image3_url'] = photo_urls[2]
-                        if len(photo_urls) > 3:
-                            data['image4_url'] = photo_urls[3]
-
-                        photo_found = True
-                        logging.info(f"Found {len(photo_urls)} images from JSON data for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting photos from JSON for {url}: {e}")
-
-        # Method 2: Original method - gallery images
-        if not photo_found:
-            photo_tags = soup.find_all("img", {"class": "gallery-image"})
-            if photo_tags:
-                urls = [img.get('src') for img in photo_tags if img.get('src')]
-                if urls:
-                    data['photos'] = ",".join(urls)
-                    data['primary_photo'] = urls[0]
-
-                    # Fill individual image slots
-                    if len(urls) > 0:
-                        data['image1_url'] = urls[0]
-                    if len(urls) > 1:
-                        data['image2_url'] = urls[1]
-                    if len(urls) > 2:
-                        data['image3_url'] = urls[2]
-                    if len(urls) > 3:
-                        data['image4_url'] = urls[3]
-
-                    photo_found = True
-                    logging.info(f"Found {len(urls)} images using gallery-image class for {url}")
-
-        # Method 3: Try multiple CSS selectors for photo gallery
-        if not photo_found:
-            selectors = [
-                "img.Photo",  # Common class name
-                "div.HomePhotos img",  # Common container
-                "section.PhotosView img",  # Another common pattern
-                ".InlinePhotoPreview img",  # Another gallery pattern
-                "div[data-rf-test-id='gallery'] img",  # Test ID approach
-                "div.HomeCard img",  # HomeCard images
-                ".multimedia-img img",  # Another common pattern
-                "picture img"  # Any image in picture tag
-            ]
-
-            for selector in selectors:
-                photo_tags = soup.select(selector)
-                if photo_tags:
-                    urls = [img.get('src') for img in photo_tags if img.get('src')]
-                    if urls:
-                        data['photos'] = ",".join(urls)
-                        data['primary_photo'] = urls[0]
-
-                        # Fill individual image slots
-                        if len(urls) > 0:
-                            data['image1_url'] = urls[0]
-                        if len(urls) > 1:
-                            data['image2_url'] = urls[1]
-                        if len(urls) > 2:
-                            data['image3_url'] = urls[2]
-                        if len(urls) > 3:
-                            data['image4_url'] = urls[3]
-
-                        photo_found = True
-                        logging.info(f"Found {len(urls)} images using selector '{selector}' for {url}")
-                        break
-
-        # Method 4: Try the specific ID selectors
-        if not data.get('image1_url'):
-            img1 = soup.select_one('#MBImage > picture > img, #MBImage img')
-            if img1 and img1.get('src'):
-                data['image1_url'] = img1.get('src')
-                logging.info(f"Found image1 with specific ID for {url}")
-
-        if not data.get('image2_url'):
-            img2 = soup.select_one('#MBImage6 > picture > img, #MBImage6 img')
-            if img2 and img2.get('src'):
-                data['image2_url'] = img2.get('src')
-                logging.info(f"Found image2 with specific ID for {url}")
-
-        if not data.get('image3_url'):
-            img3 = soup.select_one('#MBImage9 > picture > img, #MBImage9 img')
-            if img3 and img3.get('src'):
-                data['image3_url'] = img3.get('src')
-                logging.info(f"Found image3 with specific ID for {url}")
-
-        if not data.get('image4_url'):
-            img4 = soup.select_one('#MBImage18 > picture > img, #MBImage18 img')
-            if img4 and img4.get('src'):
-                data['image4_url'] = img4.get('src')
-                logging.info(f"Found image4 with specific ID for {url}")
-
-        # Method 5: Check for lazily-loaded images
-        if not photo_found:
-            lazy_imgs = soup.select('img[data-lazy-src], img[loading="lazy"]')
-            if lazy_imgs:
-                urls = []
-                for img in lazy_imgs:
-                    url_val = img.get('data-lazy-src') or img.get('data-src') or img.get('src')
-                    if url_val and url_val.startswith('http') and (
-                            '.jpg' in url_val or '.png' in url_val or '.jpeg' in url_val):
-                        urls.append(url_val)
-
-                if urls:
-                    data['photos'] = ",".join(urls)
-                    data['primary_photo'] = urls[0]
-
-                    # Fill individual image slots
-                    if len(urls) > 0:
-                        data['image1_url'] = urls[0]
-                    if len(urls) > 1:
-                        data['image2_url'] = urls[1]
-                    if len(urls) > 2:
-                        data['image3_url'] = urls[2]
-                    if len(urls) > 3:
-                        data['image4_url'] = urls[3]
-
-                    photo_found = True
-                    logging.info(f"Found {len(urls)} images from lazy-loaded images for {url}")
-
-        # Log missing if still not found
-        if not data.get('photos'):
-            log_missing("photos", url)
-        if not data.get('primary_photo'):
-            log_missing("primary_photo", url)
-        if not data.get('image1_url'):
-            log_missing("image1_url", url)
-        if not data.get('image2_url'):
-            log_missing("image2_url", url)
-        if not data.get('image3_url'):
-            log_missing("image3_url", url)
-        if not data.get('image4_url'):
-            log_missing("image4_url", url)
-
-        # AGENT PHONE EXTRACTION - FOCUSED FIX
-        # Using exact XPath and CSS selectors provided
-
-        phone_found = False
-
-        # Method 1: Agent Phone 1 - Direct CSS selector for mortgage calculator
-        try:
-            # Exact CSS selector provided
-            phone1_selector = "#MortgageCalculator > div.calculatorContentsContainer > div.MortgageCalculatorSummary.isDesktop > div > div.sectionText.shift-reset-right > div > p"
-            phone1_tag = soup.select_one(phone1_selector)
-
-            if phone1_tag:
-                print(f"Found phone1_tag content: {phone1_tag.get_text(strip=True)}")  # Debug print
-                phone_text = phone1_tag.get_text(strip=True)
-                phone_number = extract_phone_from_text(phone_text)
-
-                if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                    data['agent_phone'] = phone_number  # Set as primary agent_phone
-                    data['agent_phone_1'] = phone_number
-                    phone_found = True
-                    print(f"Set agent_phone to {phone_number} from mortgage calculator")
-                    logging.info(f"Found agent_phone from mortgage calculator: {phone_number} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting agent_phone_1 with CSS: {e}")
+        return data
 
-        # Method 2: Agent Phone 1 - XPath approach
-        if not phone_found:
-            try:
-                # Exact XPath provided
-                phone1_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[18]/section/div/div/div/div/div[1]/div[1]/div/div[1]/div/p'
-                phone_text = extract_by_xpath(resp.content, phone1_xpath)
-
-                if phone_text:
-                    print(f"Found phone1 XPath content: {phone_text}")  # Debug print
-                    phone_number = extract_phone_from_text(phone_text)
-
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['agent_phone'] = phone_number  # Set as primary agent_phone
-                        data['agent_phone_1'] = phone_number
-                        phone_found = True
-                        print(f"Set agent_phone to {phone_number} from XPath mortgage calculator")
-                        logging.info(f"Found agent_phone from XPath mortgage calculator: {phone_number} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting agent_phone_1 with XPath: {e}")
+    except Exception as e:
+        logging.error(f"Error scraping listing {url}: {e}")
+        return None
 
-        # Method 3: Agent Phone 2 - CSS selector
-        try:
-            # Exact CSS selector provided
-            phone2_selector = "#content > div.detailsContent > div.theRailSection > div.alongTheRail > div:nth-child(12) > section > div > div > div.cta > p > a"
-            phone2_tag = soup.select_one(phone2_selector)
-
-            if phone2_tag:
-                print(f"Found phone2_tag content: {phone2_tag.get_text(strip=True)}")  # Debug print
-                phone_text = phone2_tag.get_text(strip=True)
-                phone_number = normalize_phone(phone_text)
-
-                if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                    data['agent_phone_2'] = phone_number
-                    # If primary phone not set, use this one
-                    if not data.get('agent_phone'):
-                        data['agent_phone'] = phone_number
-                        phone_found = True
-                        print(f"Set agent_phone to {phone_number} from CTA")
-                    logging.info(f"Found agent_phone_2 from CTA: {phone_number} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting agent_phone_2 with CSS: {e}")
 
-        # Method 4: Agent Phone 2 - XPath
-        if not phone_found:
-            try:
-                # Exact XPath provided
-                phone2_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[1]/div[2]/div/div/span[5]/div/span[2]'
-                phone_text = extract_by_xpath(resp.content, phone2_xpath)
-
-                if phone_text:
-                    print(f"Found phone2 XPath content: {phone_text}")  # Debug print
-                    phone_number = normalize_phone(phone_text)
-
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['agent_phone_2'] = phone_number
-                        # If primary phone not set, use this one
-                        if not data.get('agent_phone'):
-                            data['agent_phone'] = phone_number
-                            phone_found = True
-                            print(f"Set agent_phone to {phone_number} from XPath agent info")
-                        logging.info(f"Found agent_phone_2 from XPath agent info: {phone_number} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting agent_phone_2 with XPath: {e}")
+def fetch_redfin_listing(url, session, headers=None):
+    """Fetch one Redfin property page. Returns a FetchResult; content is only meaningful when status is 200."""
+    started = time.monotonic()
+    try:
+        resp = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if resp.status_code not in (200, 304):
+            logging.warning(f"Failed to fetch {url}: {resp.status_code}")
+        return FetchResult(url, resp.status_code, resp.content, resp.headers, time.monotonic() - started, None)
 
-        # NEW FIELDS: LISTING AGENT PHONE AND EMAIL EXTRACTION
+    except Exception as e:
+        logging.error(f"Error scraping listing {url}: {e}")
+        return FetchResult(url, None, b"", {}, time.monotonic() - started, e)
 
-        # Method 1: Listing Agent Phone - from listing agent section in disclaimer
-        try:
-            # Exact CSS selector provided
-            listing_agent_selector = "#content > div.detailsContent > div.belowTheRail > div:nth-child(2) > section > div > div.disclaimer > div > div.listingProvider > div.listingAgent"
-            listing_agent_tag = soup.select_one(listing_agent_selector)
-
-            if listing_agent_tag:
-                print(f"Found listing agent tag content: {listing_agent_tag.get_text(strip=True)}")
-                phone_number = extract_phone_from_text(listing_agent_tag.get_text(strip=True))
-
-                if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                    data['listing_agent_phone'] = phone_number
-                    print(f"Set listing_agent_phone to {phone_number}")
-                    logging.info(f"Found listing_agent_phone from disclaimer section: {phone_number} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting listing_agent_phone with CSS: {e}")
 
-        # Method 2: Listing Agent Phone - XPath approach
-        if not data.get('listing_agent_phone'):
-            try:
-                listing_agent_xpath = '/html/body/div[1]/div[8]/div[3]/div[2]/section/div/div[2]/div/div[1]/div[2]'
-                listing_agent_text = extract_by_xpath(resp.content, listing_agent_xpath)
+def redate_record(record):
+    """Copy of a cached record stamped with today's scrape date."""
+    return dict(record, scrape_date=time.strftime("%Y-%m-%d"))
 
-                if listing_agent_text:
-                    print(f"Found listing agent XPath content: {listing_agent_text}")
-                    phone_number = extract_phone_from_text(listing_agent_text)
 
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['listing_agent_phone'] = phone_number
-                        print(f"Set listing_agent_phone to {phone_number} from XPath")
-                        logging.info(f"Found listing_agent_phone from XPath: {phone_number} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting listing_agent_phone with XPath: {e}")
+def revalidate_listing(cache, url, result, entry):
+    """
+    Fold a listing fetch into the response cache. Returns (result, record):
+    - a 304 becomes a 200 carrying the cached body
+    - when the body is unchanged (304, or a 200 with the same hash) and a record was parsed from it before,
+      record is that record and the page does not need parsing again
+    - a 304 whose cached body is gone stays a 304 and the entry is dropped: the caller fetches again without
+      validators (see refetch_needed)
+    """
+    if result.status == 304 and entry is not None:
+        body = cache.body(entry)
+        if body is None:
+            logging.warning(f"Cached body for {url} is missing; fetching it again")
+            cache.forget(url)
+            return result, None
+        cache.mark_revalidated(url, result.headers)
+        result = result._replace(status=200, content=body)
+        unchanged = True
+    elif result.status == 200:
+        unchanged = cache.store(url, result.content, result.headers) == getattr(entry, "content_hash", None)
+    else:
+        return result, None
+    if unchanged and entry.record is not None:
+        return result, redate_record(entry.record)
+    return result, None
 
-        # Method 3: Listing Agent Phone 2 - from listing contact section
-        try:
-            listing_contact_selector = "#house-info > div:nth-child(3) > div > div > div.listingContactSection"
-            listing_contact_tag = soup.select_one(listing_contact_selector)
 
-            if listing_contact_tag:
-                print(f"Found listing contact section: {listing_contact_tag.get_text(strip=True)}")
-                phone_number = extract_phone_from_text(listing_contact_tag.get_text(strip=True))
+def refetch_needed(result, entry):
+    """True when a conditional fetch got a 304 that revalidate_listing could not serve from the cache."""
+    return entry is not None and result.status == 304
 
-                if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                    data['listing_agent_phone_2'] = phone_number
-                    print(f"Set listing_agent_phone_2 to {phone_number}")
-                    logging.info(f"Found listing_agent_phone_2 from contact section: {phone_number} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting listing_agent_phone_2 with CSS: {e}")
 
-        # Method 4: Listing Agent Phone 2 - XPath approach
-        if not data.get('listing_agent_phone_2'):
-            try:
-                listing_contact_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[2]'
-                listing_contact_text = extract_by_xpath(resp.content, listing_contact_xpath)
+def fetch_listing_cached(url, session, cache=None):
+    """fetch_redfin_listing with conditional revalidation against `cache`; returns (result, reusable record)."""
+    if cache is None:
+        return fetch_redfin_listing(url, session), None
+    entry = cache.lookup(url)
+    result, record = revalidate_listing(cache, url, fetch_redfin_listing(
+        url, session, ResponseCache.conditional_headers(entry)), entry)
+    if refetch_needed(result, entry):
+        result, record = revalidate_listing(cache, url, fetch_redfin_listing(url, session), None)
+    return result, record
 
-                if listing_contact_text:
-                    print(f"Found listing contact XPath content: {listing_contact_text}")
-                    phone_number = extract_phone_from_text(listing_contact_text)
 
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['listing_agent_phone_2'] = phone_number
-                        print(f"Set listing_agent_phone_2 to {phone_number} from XPath")
-                        logging.info(f"Found listing_agent_phone_2 from XPath: {phone_number} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting listing_agent_phone_2 with XPath: {e}")
+def scrape_redfin_listing(url, session, cache=None):
+    """Scrape one Redfin property page and extract all fields. Log missing fields."""
+    record = cache.fresh_record(url) if cache else None
+    if record is not None:
+        return redate_record(record)
+    result, record = fetch_listing_cached(url, session, cache)
+    if result.status != 200:
+        return None
+    if record is not None:
+        return record
+    data = parse_redfin_listing(url, result.content)
+    if cache and data:
+        cache.store_record(url, data)
+    return data
 
-        # Method 5: Listing Agent Phone 3 - (same section as Phone 2 but separate extraction logic)
-        try:
-            # Look for tel: links specifically in the listing contact section
-            if 'listing_contact_tag' in locals() and listing_contact_tag:
-                tel_links = listing_contact_tag.select('a[href^="tel:"]')
-                if tel_links:
-                    href = tel_links[0].get('href', '')
-                    if href.startswith('tel:'):
-                        phone_number = normalize_phone(href[4:])  # Remove 'tel:' prefix
-                        if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                            data['listing_agent_phone_3'] = phone_number
-                            print(f"Set listing_agent_phone_3 to {phone_number} from tel: link")
-                            logging.info(f"Found listing_agent_phone_3 from tel link: {phone_number} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting listing_agent_phone_3 with CSS: {e}")
 
-        # START: New fields from user request
-        # Listing_Agent_Phone_Number_4
-        try:
-            phone4_selector = "#house-info > div:nth-child(3) > div > div > div.listingContactSection"
-            phone4_tag = soup.select_one(phone4_selector)
-            if phone4_tag:
-                phone_text = phone4_tag.get_text(strip=True)
-                phone_number = extract_phone_from_text(phone_text)
-                if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                    data['listing_agent_phone_4'] = phone_number
-                    logging.info(f"Found listing_agent_phone_4 from CSS: {phone_number} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting listing_agent_phone_4 with CSS: {e}")
+def parse_listing_job(url, content, scrape_date=None):
+    """Process-pool entry point: parse one page and ship this worker's extraction timings back with it."""
+    return parse_redfin_listing(url, content, scrape_date), EXTRACTION_ENGINE.drain_stats()
 
-        if not data.get('listing_agent_phone_4'):
-            try:
-                phone4_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[2]'
-                phone_text = extract_by_xpath(resp.content, phone4_xpath)
-                if phone_text:
-                    phone_number = extract_phone_from_text(phone_text)
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['listing_agent_phone_4'] = phone_number
-                        logging.info(f"Found listing_agent_phone_4 from XPath: {phone_number} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting listing_agent_phone_4 with XPath: {e}")
 
-        # Listing_Agent_Phone_Number_5
-        try:
-            phone5_selector = "#house-info > div:nth-child(3) > div > div > div.agent-info-container > div.agent-info-content > div > div > span.agent-extra-info--phone > div > span:nth-child(2)"
-            phone5_tag = soup.select_one(phone5_selector)
-            if phone5_tag:
-                phone_text = phone5_tag.get_text(strip=True)
-                phone_number = normalize_phone(phone_text)
-                if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                    data['listing_agent_phone_5'] = phone_number
-                    logging.info(f"Found listing_agent_phone_5 from CSS: {phone_number} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting listing_agent_phone_5 with CSS: {e}")
+def reextract_job(archive_root, entry):
+    """Process-pool entry point for re-extraction: read one page straight from its archive segment and parse it."""
+    content = read_entry(archive_root, entry)
+    return parse_listing_job(entry.url, content, time.strftime("%Y-%m-%d", time.localtime(entry.fetched_at)))
 
-        if not data.get('listing_agent_phone_5'):
-            try:
-                phone5_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[1]/div[2]/div/div/span[5]/div/span[2]'
-                phone_text = extract_by_xpath(resp.content, phone5_xpath)
-                if phone_text:
-                    phone_number = normalize_phone(phone_text)
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['listing_agent_phone_5'] = phone_number
-                        logging.info(f"Found listing_agent_phone_5 from XPath: {phone_number} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting listing_agent_phone_5 with XPath: {e}")
 
-        # Listing_Source
-        try:
-            source_selector = "#house-info > div:nth-child(3) > div > p"
-            source_tag = soup.select_one(source_selector)
-            if source_tag:
-                data['listing_source'] = source_tag.get_text(strip=True)
-                logging.info(f"Found listing_source from CSS for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting listing_source with CSS: {e}")
+def collect_parsed(job):
+    """Unpack a parse_listing_job result in the parent, folding its timings into EXTRACTION_ENGINE."""
+    data, stats = job
+    EXTRACTION_ENGINE.merge_stats(stats)
+    return data
 
-        if not data.get('listing_source'):
-            try:
-                source_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/p'
-                source_text = extract_by_xpath(resp.content, source_xpath)
-                if source_text:
-                    data['listing_source'] = source_text
-                    logging.info(f"Found listing_source from XPath for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting listing_source with XPath: {e}")
-        # END: New fields from user request
 
-        # Method 6: Listing Agent Email
-        try:
-            # Exact CSS selector provided
-            email_selector = "#house-info > div:nth-child(3) > div > div > div.agent-info-container > div.agent-info-content > div > div > span.agent-extra-info--email > div > span:nth-child(2)"
-            email_tag = soup.select_one(email_selector)
-
-            if email_tag:
-                print(f"Found email tag content: {email_tag.get_text(strip=True)}")
-                email_text = email_tag.get_text(strip=True)
-                email = extract_email_from_text(email_text) or email_text
-
-                if email and '@' in email:
-                    data['listing_agent_email'] = email
-                    data['agent_email'] = email  # Also set the main agent_email field
-                    print(f"Set listing_agent_email to {email}")
-                    logging.info(f"Found listing_agent_email: {email} for {url}")
-        except Exception as e:
-            logging.error(f"Error extracting listing_agent_email with CSS: {e}")
+def archive_cached_page(archive, cache, url, content=None):
+    """
+    Archive a page served from the response cache if the archive has no copy of it yet (e.g. it was cached
+    before ARCHIVE_PAGES was turned on), so re-extraction still covers it. content defaults to the cached body.
+    """
+    if archive.contains(url):
+        return
+    if content is None:
+        entry = cache.lookup(url)
+        content = cache.body(entry) if entry else None
+    if content:
+        archive.put(url, content)
 
-        # Method 7: Listing Agent Email - XPath approach
-        if not data.get('listing_agent_email'):
-            try:
-                email_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[1]/div[2]/div/div/span[6]/div/span[2]'
-                email_text = extract_by_xpath(resp.content, email_xpath)
-
-                if email_text:
-                    print(f"Found email XPath content: {email_text}")
-                    email = extract_email_from_text(email_text) or email_text
-
-                    if email and '@' in email:
-                        data['listing_agent_email'] = email
-                        data['agent_email'] = email  # Also set the main agent_email field
-                        print(f"Set listing_agent_email to {email} from XPath")
-                        logging.info(f"Found listing_agent_email from XPath: {email} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting listing_agent_email with XPath: {e}")
 
-        # Method 8: Last resort - look for any email pattern in the page
-        if not data.get('listing_agent_email'):
-            try:
-                # Look for email addresses in specific areas first
-                potential_email_containers = [
-                    soup.select_one('.agent-info-content'),
-                    soup.select_one('.listingContactSection'),
-                    soup.select_one('.agentInfo'),
-                    soup.select_one('.contactInfo'),
-                    soup.select_one('span.email')
-                ]
-
-                for container in potential_email_containers:
-                    if not container:
+def crawl_listings_threaded(urls, session, parser, on_result, archive=None, cache=None):
+    """
+    Two-stage crawl: worker threads fetch pages and hand the raw bytes to the `parser` process pool.
+    - An AIMD controller sets how many fetches run at once (SCRAPE_WORKERS up to MAX_SCRAPE_WORKERS)
+    - Transient failures are retried with backoff without holding a thread while they wait
+    - At most PARSE_QUEUE_SIZE pages are queued for parsing; beyond that fetch threads block until one finishes
+    - Results are handled in completion order, so one slow page never holds back the ones already done
+    on_result(url, data) is called on the calling thread for every URL, with data None on failure.
+    With a response `cache`, pages validated within its TTL are not fetched and unchanged pages are not parsed.
+    Every page that is parsed is also stored in `archive` when one is given, and so is a page served from the
+    cache that the archive has no copy of yet.
+    Returns the dead-lettered URLs.
+    """
+    parse_slots = threading.BoundedSemaphore(PARSE_QUEUE_SIZE)
+    controller = AimdController(initial=SCRAPE_WORKERS, maximum=MAX_SCRAPE_WORKERS, latency_target=LATENCY_TARGET)
+    scheduler = CrawlScheduler(urls, controller, base_delay=FETCH_RETRY_BASE_DELAY,
+                               max_delay=FETCH_RETRY_MAX_DELAY, max_attempts=MAX_FETCH_ATTEMPTS)
+
+    def fetch_stage(url):
+        result, record = fetch_listing_cached(url, session, cache)
+        if result.status != 200:
+            return result, None
+        if record is not None:
+            # Unchanged page: hand back the cached record as if the parser had produced it
+            if archive:
+                archive_cached_page(archive, cache, url, result.content)
+            parsed = Future()
+            parsed.set_result((record, {}))
+            return result, parsed
+        if archive:
+            archive.put(url, result.content)
+        parse_slots.acquire()
+        parsed = parser.submit(parse_listing_job, url, result.content)
+        parsed.add_done_callback(lambda _: parse_slots.release())
+        return result, parsed
+
+    fetching, parsing = {}, {}
+    with ThreadPoolExecutor(max_workers=MAX_SCRAPE_WORKERS) as fetchers:
+        while True:
+            while scheduler.has_capacity(len(fetching)):
+                url = scheduler.next_url()
+                if url is None:
+                    break
+                record = cache.fresh_record(url) if cache else None
+                if record is not None:
+                    if archive:
+                        archive_cached_page(archive, cache, url)
+                    on_result(url, redate_record(record))
+                    continue
+                fetching[fetchers.submit(fetch_stage, url)] = url
+            if scheduler.finished(len(fetching)) and not parsing:
+                break
+
+            timeout = scheduler.wait_timeout()
+            if not fetching and not parsing:
+                # Only retries are left; sleep until the first one is ready
+                time.sleep(timeout)
+                continue
+            done, _ = wait(list(fetching) + list(parsing), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetching:
+                    url = fetching.pop(future)
+                    try:
+                        result, parsed = future.result()
+                    except Exception as e:
+                        # Retried, backed off and dead-lettered like any other failed fetch
+                        logging.error(f"Error scraping listing {url}: {e}")
+                        result, parsed = FetchResult(url, None, b"", {}, 0, e), None
+                    outcome = scheduler.observe(url, result.status, result.elapsed, result.error)
+                    if outcome == REQUEUED:
                         continue
+                    if parsed is not None:
+                        parsing[parsed] = url
+                        continue
+                    on_result(url, None)
+                else:
+                    url = parsing.pop(future)
+                    data = None
+                    try:
+                        data = collect_parsed(future.result())
+                        if cache and data:
+                            cache.store_record(url, data)
+                    except Exception as e:
+                        logging.error(f"Error scraping listing {url}: {e}")
+                    on_result(url, data)
+    logging.info(f"Crawl finished at concurrency {controller.window} after {controller.decreases} slowdowns")
+    return scheduler.dead_letters
+
+
+def gateway_rewrite(endpoints):
+    """
+    Build an AsyncFetcher rewrite that routes a listing URL through a random API Gateway endpoint,
+    the same way requests_ip_rotator.ApiGateway.send does for requests sessions.
+    """
+    def rewrite(url):
+        path = url.split("://", 1)[1].split("/", 1)[1]
+        # Without this header the gateway forwards our real IP in X-Forwarded-For
+        forwarded_for = str(ipaddress.IPv4Address(random.getrandbits(32)))
+        return f"https://{random.choice(endpoints)}/ProxyStage/{path}", {"X-My-X-Forwarded-For": forwarded_for}
+    return rewrite
 
-                    container_text = container.get_text(strip=True)
-                    email = extract_email_from_text(container_text)
-
-                    if email:
-                        data['listing_agent_email'] = email
-                        data['agent_email'] = email
-                        print(f"Set listing_agent_email to {email} from container search")
-                        logging.info(f"Found listing_agent_email from container search: {email} for {url}")
-                        break
-            except Exception as e:
-                logging.error(f"Error extracting email from containers: {e}")
 
-        # Last resort - scan all a tags with mailto: href
-        if not data.get('listing_agent_email'):
-            try:
-                mailto_links = soup.select('a[href^="mailto:"]')
-                for link in mailto_links:
-                    href = link.get('href', '')
-                    if href.startswith('mailto:'):
-                        email = href[7:]  # Remove 'mailto:' prefix
-                        data['listing_agent_email'] = email
-                        data['agent_email'] = email
-                        print(f"Set listing_agent_email to {email} from mailto: link")
-                        logging.info(f"Found listing_agent_email from mailto: link: {email} for {url}")
-                        break
-            except Exception as e:
-                logging.error(f"Error extracting email from mailto links: {e}")
+async def crawl_listings_async(urls, endpoints, parser, on_result, archive=None, cache=None):
+    """
+    Fetch listing URLs from one event loop, with an AIMD controller setting how many requests are open
+    (ASYNC_INITIAL_IN_FLIGHT up to ASYNC_MAX_IN_FLIGHT) and transient failures retried with backoff.
+    Pages are parsed in the `parser` process pool so the loop keeps servicing sockets; once PARSE_QUEUE_SIZE
+    pages are waiting on the parser, no new requests are started until one finishes.
+    on_result(url, data) is called on the loop thread for every URL, with data None on failure.
+    With a response `cache`, pages validated within its TTL are not fetched and unchanged pages are not parsed.
+    Every page that is parsed is also stored in `archive` when one is given, and so is a page served from the
+    cache that the archive has no copy of yet.
+    Cache and archive reads and writes (SQLite and disk) run on the loop's default executor, off the loop.
+    Returns the dead-lettered URLs.
+    """
+    loop = asyncio.get_running_loop()
 
-        # Method 5: Last resort - look for any phone number pattern in the page
-        if not phone_found:
-            try:
-                # Look for phone numbers in specific areas first
-                potential_phone_containers = [
-                    soup.select_one('.PhoneNumberDisplay'),
-                    soup.select_one('.agentInfo'),
-                    soup.select_one('.contactInfo'),
-                    soup.select_one('.agent-phone'),
-                    soup.select_one('[data-rf-test-name="agentPhoneValue"]')
-                ]
-
-                for container in potential_phone_containers:
-                    if not container:
-                        continue
+    def off_loop(func, *args):
+        return loop.run_in_executor(None, func, *args)
 
-                    container_text = container.get_text(strip=True)
-                    phone_number = extract_phone_from_text(container_text)
+    parse_slots = asyncio.Semaphore(PARSE_QUEUE_SIZE)
+    controller = AimdController(initial=ASYNC_INITIAL_IN_FLIGHT, maximum=ASYNC_MAX_IN_FLIGHT,
+                                latency_target=LATENCY_TARGET)
+    scheduler = CrawlScheduler(urls, controller, base_delay=FETCH_RETRY_BASE_DELAY,
+                               max_delay=FETCH_RETRY_MAX_DELAY, max_attempts=MAX_FETCH_ATTEMPTS)
+    fetching = {}
+    parsing = set()
 
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['agent_phone'] = phone_number
-                        phone_found = True
-                        print(f"Set agent_phone to {phone_number} from container search")
-                        logging.info(f"Found agent_phone from container search: {phone_number} for {url}")
-                        break
-            except Exception as e:
-                logging.error(f"Error extracting phone from containers: {e}")
+    async def parse(url, content):
+        data = None
+        try:
+            data = collect_parsed(await loop.run_in_executor(parser, parse_listing_job, url, content))
+            if cache and data:
+                await off_loop(cache.store_record, url, data)
+        except Exception as e:
+            logging.error(f"Error scraping listing {url}: {e}")
+        finally:
+            parse_slots.release()
+        on_result(url, data)
+
+    fetcher = AsyncFetcher(max_in_flight=ASYNC_MAX_IN_FLIGHT, per_host=ASYNC_PER_HOST, http2=ASYNC_HTTP2,
+                           timeout=REQUEST_TIMEOUT, deadline=REQUEST_DEADLINE,
+                           headers={"User-Agent": USER_AGENT}, rewrite=gateway_rewrite(endpoints))
+
+    async def fetch(url):
+        if cache is None:
+            return await fetcher.fetch(url), None
+        entry = await off_loop(cache.lookup, url)
+        result = await fetcher.fetch(url, ResponseCache.conditional_headers(entry))
+        result, record = await off_loop(revalidate_listing, cache, url, result, entry)
+        if refetch_needed(result, entry):
+            result, record = await off_loop(revalidate_listing, cache, url, await fetcher.fetch(url), None)
+        return result, record
+
+    def reap_parsed():
+        # Re-raise anything on_result threw (e.g. a failed write) instead of leaving it in the task
+        for task in [task for task in parsing if task.done()]:
+            parsing.discard(task)
+            task.result()
+
+    async with fetcher:
+        while True:
+            reap_parsed()
+            while scheduler.has_capacity(len(fetching)):
+                url = scheduler.next_url()
+                if url is None:
+                    break
+                record = await off_loop(cache.fresh_record, url) if cache else None
+                if record is not None:
+                    if archive:
+                        await off_loop(archive_cached_page, archive, cache, url)
+                    on_result(url, redate_record(record))
+                    continue
+                fetching[asyncio.ensure_future(fetch(url))] = url
+            if scheduler.finished(len(fetching)):
+                break
+
+            timeout = scheduler.wait_timeout()
+            if not fetching:
+                # Only retries are left; sleep until the first one is ready
+                await asyncio.sleep(timeout)
+                continue
+            done, _ = await asyncio.wait(fetching, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                url = fetching.pop(task)
+                try:
+                    result, record = task.result()
+                except Exception as e:
+                    # Retried, backed off and dead-lettered like any other failed fetch
+                    result, record = FetchResult(url, None, b"", {}, 0, e), None
+                outcome = scheduler.observe(url, result.status, result.elapsed, result.error)
+                if outcome == REQUEUED:
+                    continue
+                if outcome != OK:
+                    if result.error is not None:
+                        logging.error(f"Error scraping listing {url}: {result.error}")
+                    else:
+                        logging.warning(f"Failed to fetch {url}: {result.status}")
+                    on_result(url, None)
+                    continue
+                if record is not None:
+                    if archive:
+                        await off_loop(archive_cached_page, archive, cache, url, result.content)
+                    on_result(url, record)
+                    continue
+                if archive:
+                    await off_loop(archive.put, url, result.content)
+                await parse_slots.acquire()
+                parse_task = asyncio.ensure_future(parse(url, result.content))
+                parsing.add(parse_task)
+        if parsing:
+            await asyncio.wait(parsing)
+        reap_parsed()
+    logging.info(f"Crawl finished at concurrency {controller.window} after {controller.decreases} slowdowns")
+    return scheduler.dead_letters
+
+
+def prepare_record(data):
+    """Normalize ZIP code and price formatting on a scraped record before it is written."""
+    # normalize_zip always yields a 5-digit string (or ""), so leading zeros survive the CSV
+    if 'zip_code' in data:
+        data['zip_code'] = normalize_zip(data['zip_code'])
+
+    # Clean price text again to ensure no "Price," or "—Est." text
+    if data.get('list_price'):
+        data['list_price'] = clean_price_text(data['list_price'])
+    return data
+
+
+def record_fingerprint(data):
+    """Stable hash of a record's FIELDS, leaving out volatile ones such as the scrape date."""
+    stable = [(field, "" if data.get(field) is None else str(data.get(field)))
+              for field in FIELDS if field not in FINGERPRINT_EXCLUDED_FIELDS]
+    return hashlib.sha256(json.dumps(stable, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def save_record(data, writers):
+    """
+    Queue one scraped record on each of the run's output writers (CSV and/or Parquet).
+    Returns False if any writer rejected it, so the caller does not treat the record as stored.
+    """
+    prepare_record(data)
+    saved = True
+    for writer in writers:
+        try:
+            writer.write(data)
+        except Exception as e:
+            logging.error(f"Failed to write {data['property_url']} to {writer.__class__.__name__}: {e}")
+            saved = False
+    if saved:
+        logging.debug(f"Saved data for {data['property_url']}")
+    return saved
 
-        # Last resort - scan all a tags with tel: href
-        if not phone_found:
-            try:
-                tel_links = soup.select('a[href^="tel:"]')
-                for link in tel_links:
-                    href = link.get('href', '')
-                    if href.startswith('tel:'):
-                        phone_number = normalize_phone(href[4:])  # Remove 'tel:' prefix
-                        if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                            data['agent_phone'] = phone_number
-                            phone_found = True
-                            print(f"Set agent_phone to {phone_number} from tel: link")
-                            logging.info(f"Found agent_phone from tel: link: {phone_number} for {url}")
-                            break
-            except Exception as e:
-                logging.error(f"Error extracting phone from tel links: {e}")
 
-        # Extract from JSON if available and still not found
-        if not phone_found and detailed_json:
-            try:
-                phone = deep_get(detailed_json, ["payload", "propertyData", "listingAgent", "phoneNumber"]) or \
-                        deep_get(detailed_json, ["propertyData", "listingAgent", "phoneNumber"]) or \
-                        deep_get(detailed_json, ["agentInfo", "phone"]) or \
-                        deep_get(page_json, ["propertyDetails", "listing", "agentPhone"])
-
-                if phone:
-                    phone_number = normalize_phone(phone)
-                    if phone_number and phone_number not in BLACKLISTED_PHONE_NUMBERS:
-                        data['agent_phone'] = phone_number
-                        phone_found = True
-                        print(f"Set agent_phone to {phone_number} from JSON data")
-                        logging.info(f"Found agent_phone from JSON data: {phone_number} for {url}")
-            except Exception as e:
-                logging.error(f"Error extracting phone from JSON: {e}")
-
-        if not phone_found:
-            log_missing("agent_phone", url)
-            print(f"WARNING: Failed to find agent_phone for {url}")
-
-        # Agent Name
-        agent_name_tag = soup.select_one(
-            '#house-info > div:nth-child(3) > div > div > div.agent-info-container > div.agent-info-content > div > div > span.agent-basic-details--heading > span')
-        if agent_name_tag:
-            data['agent_name'] = agent_name_tag.get_text(strip=True)
-            logging.info(f"Found agent_name using CSS for {url}")
-        else:
-            # Try XPath
-            agent_name_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[1]/div[2]/div/div/span[1]/span'
-            agent_name = extract_by_xpath(resp.content, agent_name_xpath)
-            if agent_name:
-                data['agent_name'] = agent_name
-                logging.info(f"Found agent_name using XPath for {url}")
-
-        # Listing Source Name
-        source_name_tag = soup.select_one(
-            '#house-info > div:nth-child(3) > div > div > div.listingInfoSection > div > div.ListingSource > span.ListingSource--dataSourceName')
-        if source_name_tag:
-            data['listing_source_name'] = source_name_tag.get_text(strip=True)
-            logging.info(f"Found listing_source_name using CSS for {url}")
+def open_output_writers(csv_path=None, parquet_dir=None, csv_mode="w"):
+    """
+    Create the writers for OUTPUT_FORMATS (at CSV_PATH / PARQUET_DIR unless overridden).
+    csv_mode "a" appends to an existing CSV instead of replacing it; Parquet output always adds new files.
+    """
+    csv_path = csv_path or CSV_PATH
+    parquet_dir = parquet_dir or PARQUET_DIR
+    writers = []
+    if "csv" in OUTPUT_FORMATS:
+        # Opened on the first row, so a run that scrapes nothing leaves the previous CSV in place
+        writers.append(BufferedRecordWriter(csv_path, FIELDS, mode=csv_mode, flush_rows=CSV_FLUSH_ROWS,
+                                            flush_interval=CSV_FLUSH_INTERVAL, checkpoint_rows=CSV_CHECKPOINT_ROWS))
+    if "parquet" in OUTPUT_FORMATS:
+        if PartitionedParquetWriter is None:
+            logging.error("Parquet output requested but pyarrow is not installed; skipping it")
         else:
-            # Try XPath
-            source_name_xpath = '/html/body/div[1]/div[8]/div[2]/div[1]/div[6]/section/div/div/div/div[3]/div/div/div[2]/div/div[2]/span[3]'
-            source_name = extract_by_xpath(resp.content, source_name_xpath)
-            if source_name:
-                data['listing_source_name'] = source_name
-                logging.info(f"Found listing_source_name using XPath for {url}")
-
-        # Listing Source ID
-        source_id_tag = soup.select_one(
-            '#house-info > div:nth-child(3) > div > div > div.listingInfoSection > div > div.ListingSource > span.ListingSource--mlsId')
-        if source_id_tag:
-            data['listing_source_id'] = source_id_tag.get_text(strip=True)
-            logging.info(f"Found listing_source_id using CSS for {url}")
-
-        return data
-
-    except Exception as e:
-        logging.error(f"Error scraping listing {url}: {e}")
-        return None
+            writers.append(PartitionedParquetWriter(parquet_dir, FIELDS, FIELD_TYPES,
+                                                    rows_per_file=PARQUET_ROWS_PER_FILE))
+    return writers
 
 
-def save_to_csv(data, mode="a"):
-    """Save data to a CSV file with proper handling of ZIP codes and price formatting."""
+def write_dead_letters(dead_letters):
+    """Append listings that exhausted their fetch attempts to DEAD_LETTER_PATH, one JSON object per line."""
+    if not dead_letters:
+        return
     try:
-        # ensure zip is normalized
-        if data and 'zip_code' in data:
-            data['zip_code'] = normalize_zip(data['zip_code'])
-
-        # Clean price text again to ensure no "Price," or "—Est." text
-        if data and 'list_price' in data and data['list_price']:
-            data['list_price'] = clean_price_text(data['list_price'])
-
-        df = pd.DataFrame([data])
-
-        # Explicitly ensure dtype is string for zip_code column
-        if 'zip_code' in df.columns:
-            df['zip_code'] = df['zip_code'].astype(str).apply(lambda x: x.zfill(5) if x and x.isdigit() else x)
-
-        if mode == "w":
-            df.to_csv(CSV_PATH, index=False, columns=FIELDS)
-        else:
-            df.to_csv(CSV_PATH, mode=mode, header=False, index=False, columns=FIELDS)
-        logging.info(f"Saved data for {data['property_url']} to CSV")
+        with open(DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+            for entry in dead_letters:
+                f.write(json.dumps(entry) + "\n")
+        logging.warning(f"{len(dead_letters)} listings exhausted their retries; see {DEAD_LETTER_PATH}")
     except Exception as e:
-        logging.error(f"Failed to write to CSV: {e}")
+        logging.error(f"Failed to write dead letters: {e}")
 
 
-def main():
-    """Main function to orchestrate the scraping process."""
+def main(resume=False):
+    """
+    Main function to orchestrate the scraping process.
+    With resume=True the last unfinished run continues from its manifest instead of rediscovering listings.
+    """
+    if not HTML_RULES_AVAILABLE:
+        logging.error(HTML_RULES_MISSING)
+        return
     logging.info("Starting Redfin FSBO scraper.")
 
     target_domain = "https://www.redfin.com"
 
     # Create a direct session for sitemap requests
     direct_session = requests.Session()
-    direct_session.headers.update({
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
-    })
+    # Size the connection pool to the sitemap fan-out so parallel fetches keep their connections alive
+    direct_session.mount("https://", HTTPAdapter(pool_connections=SITEMAP_WORKERS, pool_maxsize=SITEMAP_WORKERS))
+    direct_session.headers.update({"User-Agent": USER_AGENT})
+
+    state_store = SitemapStateStore(SITEMAP_STATE_PATH) if INCREMENTAL_SITEMAPS else None
+    archive = None
+    if ARCHIVE_PAGES:
+        if PageArchive is None:
+            logging.error("Page archiving requested but zstandard is not installed; pages will not be archived")
+        else:
+            archive = PageArchive(PAGE_ARCHIVE_DIR)
+    cache = ResponseCache(RESPONSE_CACHE_DIR, max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+                          ttl=RESPONSE_CACHE_TTL_HOURS * 3600) if RESPONSE_CACHE else None
+    history = open_listing_history() if LISTING_HISTORY else None
+    frontier = UrlFrontier(FRONTIER_PATH, recrawl_interval_hours=RECRAWL_INTERVAL_HOURS,
+                           retry_interval_hours=RETRY_INTERVAL_HOURS,
+                           max_retry_interval_hours=MAX_RETRY_INTERVAL_HOURS)
 
-    try:
-        # First fetch sitemap URLs directly (no API Gateway)
-        listing_urls = fetch_sitemap_urls(direct_session)
-        logging.info(f"Found {len(listing_urls)} listings from sitemaps")
+    manifest = RunManifest(RUN_MANIFEST_PATH, checkpoint_every=CHECKPOINT_EVERY,
+                           checkpoint_interval=CHECKPOINT_INTERVAL)
 
-        if not listing_urls:
-            logging.warning("No listing URLs found. Check if sitemap parsing worked correctly.")
-            return
+    try:
+        run_id = manifest.unfinished_run() if resume else None
+        resumed = run_id is not None
+        if resume and not resumed:
+            logging.warning("No unfinished run to resume; starting a new one")
+        if resumed:
+            # Discovery already happened in the interrupted run; its URL list is in the manifest
+            logging.info(f"Resuming run {run_id}")
+        else:
+            # First fetch sitemap URLs directly (no API Gateway)
+            listing_urls = fetch_sitemap_urls(direct_session, state_store)
+            logging.info(f"Found {len(listing_urls)} listings from sitemaps")
+
+            # New and changed listings are due immediately; the frontier adds any recrawls that have come due
+            frontier.add(listing_urls)
+            due_count = frontier.count_due()
+            logging.info(f"{due_count} listings due for scraping")
+
+            if not due_count:
+                if state_store:
+                    logging.info("No new, changed or due listings since the last run.")
+                    state_store.commit()
+                else:
+                    logging.warning("No listing URLs found. Check if sitemap parsing worked correctly.")
+                return
 
-        # Now initialize API Gateway for individual property requests
-        gateway = ApiGateway(target_domain, regions=["us-east-1", "us-west-2", "us-east-2", "eu-west-1"])
-        gateway.start()
-        logging.info("Started API Gateway for property page requests")
+            def due_urls():
+                for batch in frontier.iter_due_batches():
+                    # Shuffle the URLs to avoid sequential scraping patterns
+                    random.shuffle(batch)
+                    yield from batch
 
-        # Create a session for property pages that uses the gateway
-        gateway_session = requests.Session()
-        gateway_session.mount(target_domain, gateway)
-        gateway_session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36"
-        })
+            run_id = manifest.start_run(due_urls())
+            # The manifest now owns the discovered work, so the sitemap state can advance even if the crawl dies
+            if state_store:
+                state_store.commit()
 
-        # Shuffle the URLs to avoid sequential scraping patterns
-        random.shuffle(listing_urls)
+        pending_count = manifest.count_pending(run_id)
+        logging.info(f"{pending_count} listings left to scrape in run {run_id}")
 
-        is_first_run = True
+        # Now initialize API Gateway for individual property requests
+        # Size the adapter pool to the worker count so every thread keeps its connection alive
+        gateway = ApiGateway(target_domain, regions=GATEWAY_REGIONS,
+                             pool_connections=MAX_SCRAPE_WORKERS, pool_maxsize=MAX_SCRAPE_WORKERS)
+        if PERSISTENT_GATEWAYS:
+            registry = open_gateway_registry(target_domain)
+            try:
+                endpoints = registry.ensure()
+            finally:
+                registry.close()
+            if not endpoints:
+                raise RuntimeError("No API Gateway endpoints available")
+            # A non-empty list makes start() use these endpoints instead of creating any
+            gateway.start(endpoints=endpoints)
+        else:
+            gateway.start()
+        logging.info("Started API Gateway for property page requests")
 
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = []
-            for url in listing_urls:
-                futures.append(executor.submit(scrape_redfin_listing, url, gateway_session))
+        # A resumed run appends to the rows the interrupted run already wrote
+        output_writers = open_output_writers(csv_mode="a" if resumed else "w")
+        progress = tqdm(total=pending_count, desc="Scraping listings")
 
-            for future in tqdm(futures, total=len(futures), desc="Scraping listings"):
-                data = future.result()
-                if data:
-                    save_to_csv(data, "w" if is_first_run else "a")
-                    is_first_run = False
+        touch = None
+        if UNCHANGED_LISTINGS == "touch":
+            try:
+                from supabase_client import touch_listings as touch
+            except ImportError as e:
+                logging.error(f"Cannot touch unchanged listings in Supabase ({e}); they will only be skipped")
+        # Fingerprints recorded by this run itself may belong to rows lost in a crash, so only older ones count
+        run_started = manifest.started_at(run_id)
+        unchanged = {"skipped": 0, "touched": 0, "pending": []}
+
+        def flush_touches():
+            if touch and unchanged["pending"]:
+                unchanged["touched"] += touch(unchanged["pending"])
+            unchanged["pending"] = []
+
+        def handle_result(url, data):
+            progress.update()
+            fingerprint = None
+            outcome = "scraped" if data else "failed"
+            if data:
+                prepare_record(data)
+                if history:
+                    history.observe(data)
+                fingerprint = record_fingerprint(data)
+                previous, fingerprinted_at = frontier.fingerprint(url)
+                if UNCHANGED_LISTINGS != "write" and previous == fingerprint and fingerprinted_at < run_started:
+                    unchanged["skipped"] += 1
+                    unchanged["pending"].append(url)
+                    if len(unchanged["pending"]) >= TOUCH_BATCH_SIZE:
+                        flush_touches()
+                elif not save_record(data, output_writers):
+                    # Keep the old fingerprint and retry soon, so the next run does not skip it as unchanged
+                    outcome, fingerprint = "write_failed", None
+            frontier.record(url, outcome, success=outcome == "scraped", fingerprint=fingerprint)
+            if manifest.mark_done(run_id, url, outcome):
+                # Rows must be on disk before the manifest says they are done
+                for writer in output_writers:
+                    writer.checkpoint()
+                if history:
+                    history.checkpoint()
+                manifest.commit()
+
+        pending_urls = manifest.iter_pending(run_id)
+        with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as parser:
+            crawl_mode = CRAWL_MODE
+            if crawl_mode == "async" and AsyncFetcher is None:
+                logging.error("CRAWL_MODE is async but httpx is not installed (pip install httpx); using threads")
+                crawl_mode = "threads"
+            if crawl_mode == "async":
+                logging.info(f"Async crawl with up to {ASYNC_MAX_IN_FLIGHT} requests in flight")
+                dead_letters = asyncio.run(crawl_listings_async(pending_urls, gateway.endpoints, parser,
+                                                                handle_result, archive, cache))
+            else:
+                # Create a session for property pages that uses the gateway
+                gateway_session = requests.Session()
+                gateway_session.mount(target_domain, gateway)
+                gateway_session.headers.update({"User-Agent": USER_AGENT})
+                dead_letters = crawl_listings_threaded(pending_urls, gateway_session, parser, handle_result,
+                                                       archive, cache)
+        progress.close()
+        write_dead_letters(dead_letters)
+        flush_touches()
+        logging.info(f"{unchanged['skipped']} unchanged listings not rewritten"
+                     + (f", {unchanged['touched']} touched in Supabase" if touch else ""))
+
+        for writer in output_writers:
+            # Opens the CSV even if every listing was unchanged, so the previous run's rows are not left behind
+            writer.write_many(())
+            writer.checkpoint()
+        if history:
+            history.checkpoint()
+        manifest.commit()
+        manifest.finish_run(run_id)
+
+        EXTRACTION_ENGINE.log_stats()
 
     except Exception as e:
         logging.error(f"An error occurred during scraping: {e}")
     finally:
-        # Always shut down the gateway to avoid AWS charges
+        # Flush buffered rows before the frontier and manifest commit them as scraped
+        outputs_closed = True
+        for writer in locals().get('output_writers', []):
+            try:
+                writer.close()
+            except Exception as e:
+                outputs_closed = False
+                logging.error(f"Error closing {writer.__class__.__name__}: {e}")
+        if outputs_closed:
+            manifest.commit()
+        if state_store:
+            state_store.rollback()
+            state_store.close()
+        if archive:
+            archive.close()
+        if cache:
+            cache.close()
+        if history:
+            try:
+                history.close()
+            except Exception as e:
+                logging.error(f"Error closing listing history: {e}")
+        manifest.close()
+        frontier.close()
+        # Per-run gateways are always shut down to avoid AWS charges; persistent ones outlive the run
         try:
-            if 'gateway' in locals():
+            if 'gateway' in locals() and not PERSISTENT_GATEWAYS:
                 logging.info("Shutting down API Gateways...")
                 gateway.shutdown()
                 logging.info("API Gateways shut down.")
@@ -1226,5 +1455,102 @@ def main():
             logging.error(f"Error shutting down API Gateway: {e}")
 
 
+def open_listing_history():
+    if ListingHistory is None:
+        logging.error("Listing history requested but pyarrow is not installed; transitions will not be recorded")
+        return None
+    sink = None
+    if SUPABASE_HISTORY:
+        try:
+            from supabase_client import save_listing_history as sink
+        except ImportError as e:
+            logging.error(f"Cannot write listing history to Supabase ({e}); keeping it locally only")
+    return ListingHistory(LISTING_HISTORY_DIR, fields=HISTORY_FIELDS, sink=sink)
+
+
+def open_gateway_registry(target_domain="https://www.redfin.com"):
+    return GatewayRegistry(GATEWAY_REGISTRY_PATH, target_domain, GATEWAY_REGIONS,
+                           client_factory=boto3_client_factory(endpoint_url=GATEWAY_API_URL))
+
+
+def teardown_gateways():
+    """Delete the persistent API Gateway endpoints in every region."""
+    registry = open_gateway_registry()
+    try:
+        deleted = registry.teardown()
+        print(f"Deleted {len(deleted)} API Gateway endpoints")
+    finally:
+        registry.close()
+
+
+def reextract_listings(since=None):
+    """
+    Re-run the current extractor over the latest archived copy of every listing page, on PARSE_WORKERS
+    processes and without any network access. Records go through the same writers as a live run,
+    at REEXTRACT_CSV_PATH / REEXTRACT_PARQUET_DIR; scrape_date is the date each page was fetched.
+    """
+    if PageArchive is None:
+        logging.error("Re-extraction needs the zstandard package")
+        return
+    if not HTML_RULES_AVAILABLE:
+        logging.error(HTML_RULES_MISSING)
+        return
+    archive = PageArchive(PAGE_ARCHIVE_DIR)
+    output_writers = open_output_writers(REEXTRACT_CSV_PATH, REEXTRACT_PARQUET_DIR)
+    progress = tqdm(total=archive.count(), desc="Re-extracting listings")
+
+    def handle(done):
+        for future in done:
+            try:
+                data = collect_parsed(future.result())
+            except Exception as e:
+                logging.error(f"Error re-extracting listing: {e}")
+                data = None
+            if data:
+                save_record(data, output_writers)
+            progress.update()
+
+    try:
+        with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as parser:
+            pending = set()
+            for entry in archive.iter_latest(since):
+                if len(pending) >= PARSE_QUEUE_SIZE:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    handle(done)
+                pending.add(parser.submit(reextract_job, archive.root, entry))
+            handle(wait(pending).done)
+        EXTRACTION_ENGINE.log_stats()
+    finally:
+        progress.close()
+        for writer in output_writers:
+            writer.close()
+        archive.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Redfin FSBO lead scraper")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last unfinished crawl, appending to its output")
+    parser.add_argument("--reextract", action="store_true",
+                        help="re-run extraction over the page archive instead of crawling")
+    parser.add_argument("--since", metavar="YYYY-MM-DD",
+                        help="with --reextract, only pages fetched on or after this date")
+    parser.add_argument("--price-drops", type=int, metavar="DAYS",
+                        help="list listings whose price dropped in the last DAYS days and exit")
+    parser.add_argument("--teardown-gateways", action="store_true",
+                        help="delete the persistent API Gateway endpoints and exit")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.teardown_gateways:
+        teardown_gateways()
+    elif args.price_drops is not None:
+        if price_drops is None:
+            sys.exit("--price-drops reads the Parquet listing history, which needs pyarrow (pip install pyarrow)")
+        print(price_drops(LISTING_HISTORY_DIR, args.price_drops).to_string(index=False))
+    elif args.reextract:
+        reextract_listings(time.mktime(time.strptime(args.since, "%Y-%m-%d")) if args.since else None)
+    else:
+        main(resume=args.resume)
@@ -0,0 +1,135 @@
+"""
+Pool of warm Playwright browser contexts for enrichment.
+
+- Up to `size` contexts, each with one open page and identical options, are created up front (or, with
+  start(prefill=False), the first time they are needed)
+- A task borrows a slot with acquire() and hands it back with release(); nothing is created per lead
+- On release the page is reset (about:blank, cookies cleared) so no state leaks from one lead to the next;
+  the context's HTTP cache is kept, but Playwright turns that cache off in any context with a request route,
+  e.g. one installed by `setup` (request_blocking.ResourceBlocker)
+- A slot is replaced by a fresh context after `max_navigations` page loads, or at once if it was marked broken
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+BLANK_URL = "about:blank"
+
+
+class PoolSlot:
+    """One context/page pair and how many pages it has loaded."""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.navigations = 0
+        # Set by the borrower when the page may be left in a bad state (crash, hung navigation, ...)
+        self.broken = False
+
+    def _on_navigated(self, frame):
+        if frame == self.page.main_frame and frame.url != BLANK_URL:
+            self.navigations += 1
+
+
+class BrowserContextPool:
+    """Fixed-size pool of pre-created browser contexts and pages."""
+
+    def __init__(self, browser, size: int, context_options: Optional[Dict] = None, max_navigations: int = 50,
+                 clear_cookies: bool = True, warm_url: Optional[str] = None,
+                 setup: Optional[Callable[[object], Awaitable]] = None):
+        """
+        - size: number of slots (the most leads that can hold a page at once)
+        - context_options: keyword arguments for browser.new_context()
+        - max_navigations: page loads after which a slot's context is thrown away and recreated
+        - clear_cookies: clear the context's cookies between leads (the HTTP cache, where enabled, is kept)
+        - warm_url: page each new slot loads once before its first lead, to fill its HTTP cache; of no use when
+          `setup` installs request routes, since those disable the cache
+        - setup: coroutine run on every new context before its page is opened (e.g. to install request routes)
+        """
+        self.browser = browser
+        self.size = size
+        self.context_options = context_options or {}
+        self.max_navigations = max_navigations
+        self.clear_cookies = clear_cookies
+        self.warm_url = warm_url
+        self.setup = setup
+        self.contexts_created = 0
+        self.recycled = 0
+        self._idle = asyncio.Queue()
+        self._slots = set()
+        self._creating = 0
+
+    async def start(self, prefill: bool = True):
+        """Create the pool's contexts now, or leave them to be opened on first use with prefill=False."""
+        if prefill:
+            slots = await asyncio.gather(*(self._new_slot() for _ in range(self.size)))
+            for slot in slots:
+                self._idle.put_nowait(slot)
+            logging.info(f"Browser context pool ready with {self.size} warm contexts")
+        else:
+            logging.info(f"Browser context pool will open up to {self.size} contexts on demand")
+        return self
+
+    async def _new_slot(self) -> PoolSlot:
+        context = await self.browser.new_context(**self.context_options)
+        if self.setup:
+            await self.setup(context)
+        page = await context.new_page()
+        slot = PoolSlot(context, page)
+        page.on("framenavigated", slot._on_navigated)
+        self.contexts_created += 1
+        self._slots.add(slot)
+        if self.warm_url:
+            try:
+                await page.goto(self.warm_url, wait_until="load")
+                await page.goto(BLANK_URL)
+            except Exception as e:
+                logging.debug(f"Warm-up of new browser context failed: {e}")
+            slot.navigations = 0
+        return slot
+
+    async def acquire(self) -> PoolSlot:
+        """Borrow an idle slot, waiting if all of them are in use."""
+        if self._idle.empty() and len(self._slots) + self._creating < self.size:
+            # Not yet opened on demand, or a replacement failed earlier; open one for this borrower
+            self._creating += 1
+            try:
+                return await self._new_slot()
+            finally:
+                self._creating -= 1
+        return await self._idle.get()
+
+    async def release(self, slot: PoolSlot):
+        """Reset a borrowed slot and return it, or replace it if it is broken or has served its navigations."""
+        if not slot.broken and slot.navigations < self.max_navigations:
+            try:
+                await slot.page.goto(BLANK_URL)
+                if self.clear_cookies:
+                    await slot.context.clear_cookies()
+                self._idle.put_nowait(slot)
+                return
+            except Exception as e:
+                logging.debug(f"Resetting browser context failed, replacing it: {e}")
+        await self._recycle(slot)
+
+    async def _recycle(self, slot: PoolSlot):
+        self._slots.discard(slot)
+        self.recycled += 1
+        try:
+            await slot.context.close()
+        except Exception as e:
+            logging.debug(f"Closing recycled browser context failed: {e}")
+        try:
+            self._idle.put_nowait(await self._new_slot())
+        except Exception as e:
+            # Leave the pool one slot short rather than failing the lead that was just released
+            logging.error(f"Could not replace browser context ({e}); pool now has {len(self._slots)} slots")
+
+    async def close(self):
+        for slot in list(self._slots):
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        self._slots.clear()
+        logging.info(f"Browser context pool closed: {self.contexts_created} contexts created, {self.recycled} recycled")
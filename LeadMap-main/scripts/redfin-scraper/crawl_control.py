@@ -0,0 +1,192 @@
+"""
+Flow control for FSBO listing crawls.
+
+- AimdController: additive-increase / multiplicative-decrease limit on in-flight requests, driven by
+  response latency and throttling statuses (429/403/5xx, timeouts)
+- DelayQueue: heap of items that become ready at a given time, so waiting URLs never hold a worker
+- FetchResult: the outcome of one listing request, as produced by both the threaded and the async crawl
+- CrawlScheduler: hands out the next URL to fetch (ready retries first, then fresh URLs) within the
+  controller's limit, retries transient failures with jittered exponential backoff and dead-letters
+  URLs that run out of attempts
+
+None of these are thread-safe; they are driven from the single thread (or event loop) running the crawl.
+"""
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import namedtuple
+from typing import Iterable, Optional
+
+# Responses that mean "slow down" rather than "this page is broken"
+THROTTLE_STATUSES = {403, 429}
+
+OK = "ok"
+REQUEUED = "requeued"
+FAILED = "failed"
+DEAD = "dead"
+
+# status is None and error is set when the request never produced a response
+FetchResult = namedtuple("FetchResult", ["url", "status", "content", "headers", "elapsed", "error"])
+
+
+def is_throttled(status: Optional[int], error: Optional[BaseException] = None) -> bool:
+    """True if a response (or the lack of one) signals that the site or gateway is overloaded."""
+    if error is not None:
+        return isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower()
+    return status in THROTTLE_STATUSES or (status is not None and status >= 500)
+
+
+def is_retryable(status: Optional[int], error: Optional[BaseException] = None) -> bool:
+    """True if another attempt may succeed: throttling, 5xx and any transport error, but not e.g. a 404."""
+    return error is not None or is_throttled(status)
+
+
+class AimdController:
+    """Concurrency limit that grows by `increase` per round of successes and shrinks by `decrease` on congestion."""
+
+    def __init__(self, initial: int = 10, minimum: int = 1, maximum: int = 200, increase: float = 1.0,
+                 decrease: float = 0.5, latency_target: float = 10.0, cooldown: float = 5.0):
+        """
+        - initial/minimum/maximum: bounds on the number of requests in flight
+        - increase: added to the limit once per `limit` successful responses (one "round trip" of the window)
+        - decrease: factor applied to the limit on a throttled or slow response
+        - latency_target: responses slower than this (seconds) count as congestion
+        - cooldown: minimum seconds between two decreases, so one burst of 429s only halves the limit once
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self._last_decrease = float("-inf")
+        self.decreases = 0
+
+    @property
+    def window(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self.limit)
+
+    def on_success(self, latency: float):
+        if latency > self.latency_target:
+            self.on_congestion(f"latency {latency:.1f}s")
+            return
+        self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def on_congestion(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        previous = self.window
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.decreases += 1
+        logging.info(f"Concurrency {previous} -> {self.window} ({reason})")
+
+
+class DelayQueue:
+    """Min-heap of items keyed by the monotonic time they become ready."""
+
+    def __init__(self):
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item, delay: float):
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._order), item))
+
+    def pop_ready(self):
+        """Return the earliest item whose time has come, or None."""
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    def next_ready_in(self) -> Optional[float]:
+        """Seconds until the earliest item is ready (0 if one already is), or None when empty."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+
+class CrawlScheduler:
+    """
+    Feeds URLs to a crawl loop under an AimdController.
+    Retryable failures wait on a DelayQueue for base_delay * 2^(attempt - 1) (capped at max_delay, with the
+    upper half jittered) and are handed out again; a URL that fails max_attempts times is dead-lettered.
+    """
+
+    def __init__(self, urls: Iterable[str], controller: AimdController, base_delay: float = 5.0,
+                 max_delay: float = 300.0, max_attempts: int = 4):
+        self.controller = controller
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.dead_letters = []
+        self._fresh = iter(urls)
+        self._fresh_done = False
+        self._delayed = DelayQueue()
+        self._attempts = {}
+
+    def has_capacity(self, in_flight: int) -> bool:
+        return in_flight < self.controller.window
+
+    def next_url(self) -> Optional[str]:
+        """Next URL to fetch now: a retry whose delay has passed, else a fresh one, else None."""
+        url = self._delayed.pop_ready()
+        if url is not None or self._fresh_done:
+            return url
+        url = next(self._fresh, None)
+        if url is None:
+            self._fresh_done = True
+        return url
+
+    def finished(self, in_flight: int) -> bool:
+        """True once every URL has been handed out and resolved."""
+        return self._fresh_done and not self._delayed and not in_flight
+
+    def wait_timeout(self) -> Optional[float]:
+        """How long a crawl loop with nothing completing may block before a retry becomes ready."""
+        return self._delayed.next_ready_in()
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based): exponential, capped, with equal jitter."""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def observe(self, url: str, status: Optional[int], latency: float, error: Optional[BaseException] = None) -> str:
+        """
+        Feed one fetch outcome to the controller and retry queue.
+        Returns OK, REQUEUED (will be handed out again), FAILED (not retryable) or DEAD (out of attempts).
+        """
+        if error is None and status == 200:
+            self._attempts.pop(url, None)
+            self.controller.on_success(latency)
+            return OK
+        if is_throttled(status, error):
+            self.controller.on_congestion(f"HTTP {status}" if error is None else type(error).__name__)
+        if not is_retryable(status, error):
+            self._attempts.pop(url, None)
+            return FAILED
+
+        attempts = self._attempts.get(url, 0) + 1
+        if attempts >= self.max_attempts:
+            self._attempts.pop(url, None)
+            self.dead_letters.append({
+                "url": url,
+                "attempts": attempts,
+                "status": status,
+                "error": repr(error) if error is not None else None,
+                "failed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            logging.warning(f"Giving up on {url} after {attempts} attempts")
+            return DEAD
+        self._attempts[url] = attempts
+        delay = self.backoff(attempts)
+        logging.info(f"Retrying {url} in {delay:.1f}s (attempt {attempts + 1} of {self.max_attempts})")
+        self._delayed.push(url, delay)
+        return REQUEUED
@@ -0,0 +1,289 @@
+"""
+Declarative field-extraction engine for scraped listing pages.
+
+- Each output field is a Field spec: an ordered list of sources tried until one yields an accepted value
+- Sources are JSON paths into the page's embedded state, CSS selectors, XPaths, regexes, or earlier fields
+- Specs are compiled once: CSS is translated to XPath and every XPath/regex is precompiled
+- One ExtractionEngine runs the specs over a single parsed lxml document and times every field
+
+A page object only needs `url`, `tree` (lxml document), `text` (decoded HTML) and `json(blob)`.
+CSS and XPath sources need lxml and cssselect; callers check HTML_RULES_AVAILABLE before running them.
+"""
+import logging
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+
+try:
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    etree = None
+    CSSSelector = None
+
+HTML_RULES_AVAILABLE = CSSSelector is not None
+HTML_RULES_MISSING = "CSS/XPath extraction needs the lxml and cssselect packages (pip install lxml cssselect)"
+
+
+def deep_get(data, keys):
+    """Safely access nested dictionary items"""
+    if not data or not isinstance(data, dict):
+        return None
+
+    if not keys:
+        return data
+
+    if len(keys) == 1:
+        return data.get(keys[0])
+
+    key = keys[0]
+    if key in data and isinstance(data[key], dict):
+        return deep_get(data[key], keys[1:])
+
+    return None
+
+
+def element_text(element):
+    """Join the stripped text nodes of an element, the way BeautifulSoup's get_text(strip=True) does."""
+    return "".join(s.strip() for s in element.itertext())
+
+
+class Source(ABC):
+    """
+    A compiled extraction source.
+    - transform: applied to each raw candidate before the field's normalizer
+    - every: consider every match in document order instead of only the first
+    """
+    kind = "source"
+
+    def __init__(self, transform=None, every=False):
+        self.transform = transform
+        self.every = every
+
+    @abstractmethod
+    def candidates(self, page, data):
+        """Yield raw candidate values from the page (`data` holds the fields extracted so far)."""
+
+    def __repr__(self):
+        return f"{self.kind}({self.describe()})"
+
+    def describe(self):
+        return ""
+
+
+class Css(Source):
+    """
+    CSS selector compiled to XPath once.
+    - attr: attribute name (or tuple of names tried in order) to read instead of the element text
+    - collect: yield one list of every non-empty match instead of one candidate per element
+    """
+    kind = "css"
+
+    def __init__(self, selector, attr=None, collect=False, transform=None, every=False):
+        super().__init__(transform, every)
+        self.selector = selector
+        self.attrs = (attr,) if isinstance(attr, str) else attr
+        self.collect = collect
+        self._select = CSSSelector(selector, translator="html") if HTML_RULES_AVAILABLE else None
+
+    def _value(self, element):
+        if not self.attrs:
+            return element_text(element)
+        for attr in self.attrs:
+            value = element.get(attr)
+            if value:
+                return value
+        return None
+
+    def candidates(self, page, data):
+        if self._select is None:
+            raise RuntimeError(HTML_RULES_MISSING)
+        elements = self._select(page.tree)
+        if self.collect:
+            values = [v for v in map(self._value, elements) if v]
+            if values:
+                yield values
+            return
+        for element in elements if self.every else elements[:1]:
+            yield self._value(element)
+
+    def describe(self):
+        return self.selector
+
+
+class XPath(Source):
+    """Precompiled XPath; elements yield their text_content(), string results are yielded as-is."""
+    kind = "xpath"
+
+    def __init__(self, expression, transform=None, every=False):
+        super().__init__(transform, every)
+        self.expression = expression
+        self._evaluate = etree.XPath(expression) if HTML_RULES_AVAILABLE else None
+
+    def candidates(self, page, data):
+        if self._evaluate is None:
+            raise RuntimeError(HTML_RULES_MISSING)
+        results = self._evaluate(page.tree)
+        if not isinstance(results, list):
+            results = [results]
+        for result in results if self.every else results[:1]:
+            if hasattr(result, "text_content"):
+                yield result.text_content().strip()
+            elif isinstance(result, str):
+                yield result.strip()
+
+    def describe(self):
+        return self.expression
+
+
+class Json(Source):
+    """One or more key paths into a JSON blob embedded in the page, tried in order."""
+    kind = "json"
+
+    def __init__(self, *paths, blob="state", transform=None):
+        super().__init__(transform)
+        self.paths = [tuple(p) for p in paths]
+        self.blob = blob
+
+    def candidates(self, page, data):
+        document = page.json(self.blob)
+        if not document:
+            return
+        for path in self.paths:
+            value = deep_get(document, list(path))
+            if value:
+                yield value
+
+    def describe(self):
+        return f"{self.blob}: " + " | ".join(".".join(p) for p in self.paths)
+
+
+class Regex(Source):
+    """Precompiled regex over the page HTML (target="html") or the page URL (target="url")."""
+    kind = "regex"
+
+    def __init__(self, pattern, group=1, target="html", flags=0, transform=None):
+        super().__init__(transform)
+        self.pattern = re.compile(pattern, flags)
+        self.group = group
+        self.target = target
+
+    def candidates(self, page, data):
+        match = self.pattern.search(page.url if self.target == "url" else page.text)
+        if match:
+            yield match.group(self.group)
+
+    def describe(self):
+        return f"{self.target}: {self.pattern.pattern}"
+
+
+class Ref(Source):
+    """A field extracted earlier in the same pass (optionally one item of a list value)."""
+    kind = "ref"
+
+    def __init__(self, field, index=None, transform=None):
+        super().__init__(transform)
+        self.field = field
+        self.index = index
+
+    def candidates(self, page, data):
+        value = data.get(self.field)
+        if self.index is not None:
+            value = value[self.index] if isinstance(value, list) and len(value) > self.index else None
+        if value:
+            yield value
+
+    def describe(self):
+        return self.field if self.index is None else f"{self.field}[{self.index}]"
+
+
+class Field:
+    """
+    Extraction spec for one output field.
+    - sources: tried in order; the first candidate that survives normalize and accept wins
+    - normalize: applied to every candidate after the source's own transform
+    - accept: predicate on the normalized value (defaults to "non-empty")
+    - required: report the field through the engine's on_missing callback when nothing matches
+    """
+
+    def __init__(self, name, *sources, normalize=None, accept=None, required=False):
+        self.name = name
+        self.sources = sources
+        self.normalize = normalize
+        self.accept = accept or bool
+        self.required = required
+
+    def extract(self, page, data):
+        for source in self.sources:
+            try:
+                for value in source.candidates(page, data):
+                    if source.transform and value:
+                        value = source.transform(value)
+                    if self.normalize and value:
+                        value = self.normalize(value)
+                    if value and self.accept(value):
+                        logging.debug(f"Found {self.name} via {source!r} for {page.url}")
+                        return value
+            except Exception as e:
+                logging.error(f"Error extracting {self.name} via {source!r} for {page.url}: {e}")
+        return None
+
+
+class ExtractionEngine:
+    """Runs a list of compiled Field specs over a page and keeps per-field cost statistics."""
+
+    def __init__(self, fields, on_missing=None):
+        self.fields = list(fields)
+        self.on_missing = on_missing
+        self._lock = threading.Lock()
+        # field name -> [runs, hits, total seconds]
+        self._stats = {field.name: [0, 0, 0.0] for field in self.fields}
+
+    def extract(self, page, data=None):
+        """Fill `data` (a new dict by default) with every field found on the page and return it."""
+        data = {} if data is None else data
+        for field in self.fields:
+            started = time.perf_counter()
+            value = field.extract(page, data)
+            elapsed = time.perf_counter() - started
+            if value is not None:
+                data[field.name] = value
+            elif field.required and self.on_missing:
+                self.on_missing(field.name, page.url)
+            with self._lock:
+                stats = self._stats[field.name]
+                stats[0] += 1
+                stats[1] += value is not None
+                stats[2] += elapsed
+        return data
+
+    def stats(self):
+        """Return [(field, runs, hits, total_seconds)] sorted by total time, most expensive first."""
+        with self._lock:
+            rows = [(name, runs, hits, seconds) for name, (runs, hits, seconds) in self._stats.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def drain_stats(self):
+        """Return the counters gathered since the last drain and reset them (for shipping out of a worker process)."""
+        with self._lock:
+            drained = {name: list(stats) for name, stats in self._stats.items() if stats[0]}
+            for stats in self._stats.values():
+                stats[:] = [0, 0, 0.0]
+        return drained
+
+    def merge_stats(self, drained):
+        """Fold counters from drain_stats() in another process into this engine's totals."""
+        with self._lock:
+            for name, (runs, hits, seconds) in drained.items():
+                stats = self._stats.setdefault(name, [0, 0, 0.0])
+                stats[0] += runs
+                stats[1] += hits
+                stats[2] += seconds
+
+    def log_stats(self, top=15):
+        """Log the most expensive fields so slow rules can be tuned."""
+        for name, runs, hits, seconds in self.stats()[:top]:
+            if runs:
+                logging.info(f"Extraction cost {name}: {seconds * 1000 / runs:.2f} ms/page, "
+                             f"hit rate {hits / runs:.0%} over {runs} pages")
@@ -0,0 +1,157 @@
+"""
+Disk-backed URL frontier for FSBO listing crawls.
+
+- One SQLite row per listing URL with first-seen / last-seen / last-scraped timestamps and the last outcome
+- A recrawl policy decides when each URL is due again; only due URLs are scheduled
+- Due URLs are read in keyset-paginated batches, so millions of rows never have to fit in RAM
+- Each URL also keeps a fingerprint of its last extracted record, so unchanged listings need not be written again
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional
+
+HOUR = 3600
+
+
+class UrlFrontier:
+    """SQLite-backed frontier of listing URLs with a simple recrawl policy."""
+
+    def __init__(self, path: str, recrawl_interval_hours: float = 24 * 7, retry_interval_hours: float = 1,
+                 max_retry_interval_hours: float = 24, commit_every: int = 200):
+        """
+        - recrawl_interval_hours: how long a successfully scraped URL rests before it is due again
+        - retry_interval_hours: first delay after a failed scrape, doubled per consecutive failure
+        - max_retry_interval_hours: cap on the failure delay
+        - commit_every: number of recorded outcomes buffered per transaction
+        """
+        self.path = path
+        self.recrawl_interval = recrawl_interval_hours * HOUR
+        self.retry_interval = retry_interval_hours * HOUR
+        self.max_retry_interval = max_retry_interval_hours * HOUR
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " url TEXT PRIMARY KEY,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " last_scraped REAL,"
+            " outcome TEXT,"
+            " failures INTEGER NOT NULL DEFAULT 0,"
+            " next_due REAL NOT NULL,"
+            " fingerprint TEXT,"
+            " fingerprinted_at REAL)"
+        )
+        # Frontiers created before fingerprints were tracked
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+        for column, kind in (("fingerprint", "TEXT"), ("fingerprinted_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE frontier ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_next_due ON frontier (next_due, url)")
+        self._conn.commit()
+
+    def add(self, urls: Iterable[str]) -> int:
+        """
+        Record URLs discovered (new or changed) in the sitemaps and make them due now.
+        Returns the number of URLs processed.
+        """
+        now = time.time()
+        count = 0
+        with self._lock:
+            batch = []
+            for url in urls:
+                batch.append((url, now, now, now))
+                if len(batch) >= 1000:
+                    count += self._upsert_discovered(batch)
+                    batch = []
+            if batch:
+                count += self._upsert_discovered(batch)
+            self._conn.commit()
+        return count
+
+    def _upsert_discovered(self, batch) -> int:
+        self._conn.executemany(
+            "INSERT INTO frontier (url, first_seen, last_seen, next_due) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(url) DO UPDATE SET last_seen = excluded.last_seen,"
+            " next_due = MIN(frontier.next_due, excluded.next_due)",
+            batch,
+        )
+        return len(batch)
+
+    def count_due(self, now: Optional[float] = None) -> int:
+        """Number of URLs due at `now` (defaults to the current time)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM frontier WHERE next_due <= ?", (now,)).fetchone()[0]
+
+    def iter_due_batches(self, now: Optional[float] = None, batch_size: int = 1000) -> Iterator[List[str]]:
+        """
+        Yield due URLs in batches, oldest due first.
+        The due cut-off is fixed when iteration starts, so URLs rescheduled mid-run are not yielded again.
+        """
+        now = time.time() if now is None else now
+        last_due, last_url = float("-inf"), ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT next_due, url FROM frontier"
+                    " WHERE next_due <= ? AND (next_due, url) > (?, ?)"
+                    " ORDER BY next_due, url LIMIT ?",
+                    (now, last_due, last_url, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_due, last_url = rows[-1]
+            yield [url for _, url in rows]
+
+    def iter_due(self, now: Optional[float] = None, batch_size: int = 1000) -> Iterator[str]:
+        """Yield due URLs one at a time (see iter_due_batches)."""
+        for batch in self.iter_due_batches(now, batch_size):
+            yield from batch
+
+    def fingerprint(self, url: str):
+        """(fingerprint, fingerprinted_at) of the URL's last extracted record, or (None, None)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, fingerprinted_at FROM frontier WHERE url = ?", (url,)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def record(self, url: str, outcome: str, success: bool, fingerprint: Optional[str] = None):
+        """
+        Record a scrape outcome and schedule the URL's next crawl per the recrawl policy.
+        A successful scrape may pass its record fingerprint; fingerprinted_at only moves when it changes.
+        """
+        now = time.time()
+        with self._lock:
+            if success:
+                self._conn.execute(
+                    "UPDATE frontier SET last_scraped = ?, outcome = ?, failures = 0, next_due = ?,"
+                    " fingerprinted_at = CASE WHEN ? IS NULL OR fingerprint IS ? THEN fingerprinted_at ELSE ? END,"
+                    " fingerprint = COALESCE(?, fingerprint) WHERE url = ?",
+                    (now, outcome, now + self.recrawl_interval, fingerprint, fingerprint, now, fingerprint, url),
+                )
+            else:
+                row = self._conn.execute("SELECT failures FROM frontier WHERE url = ?", (url,)).fetchone()
+                failures = (row[0] if row else 0) + 1
+                delay = min(self.retry_interval * (2 ** (failures - 1)), self.max_retry_interval)
+                self._conn.execute(
+                    "UPDATE frontier SET last_scraped = ?, outcome = ?, failures = ?, next_due = ? WHERE url = ?",
+                    (now, outcome, failures, now + delay, url),
+                )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+        logging.info(f"Closed URL frontier at {self.path}")
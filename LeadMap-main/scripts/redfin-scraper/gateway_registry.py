@@ -0,0 +1,233 @@
+"""
+Persistent registry of API Gateway proxy endpoints shared across FSBO runs.
+
+- One SQLite row per (site, region) with the REST API id and endpoint created for it
+- ensure() health-checks the registered APIs, adopts same-named APIs left behind by earlier runs and only
+  creates APIs for regions that still have none; the result is passed to ApiGateway.start(endpoints=...)
+- Nothing is deleted at the end of a run; teardown() removes every API for the site on explicit request
+- All AWS calls go through a client_factory(region) returning an "apigateway" client, so the registry can run
+  against a local stand-in (a moto server via endpoint_url, or any object with the same methods)
+"""
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+STAGE_NAME = "ProxyStage"
+
+
+def api_name_for(site: str) -> str:
+    """Name requests_ip_rotator.ApiGateway gives the APIs it creates for a site."""
+    return site + " - IP Rotate API"
+
+
+def error_code(error: Exception) -> Optional[str]:
+    """AWS error code of a botocore ClientError (or a stand-in raising the same shape)."""
+    return getattr(error, "response", {}).get("Error", {}).get("Code")
+
+
+def boto3_client_factory(endpoint_url: Optional[str] = None, access_key_id=None, access_key_secret=None):
+    """client_factory for real AWS, or for a local stand-in listening at endpoint_url."""
+    import boto3.session
+
+    session = boto3.session.Session()
+
+    def make_client(region: str):
+        return session.client("apigateway", region_name=region, endpoint_url=endpoint_url,
+                              aws_access_key_id=access_key_id, aws_secret_access_key=access_key_secret)
+
+    return make_client
+
+
+class GatewayRegistry:
+    """SQLite-backed registry of long-lived API Gateway endpoints for one target site."""
+
+    def __init__(self, path: str, site: str, regions: List[str], client_factory: Optional[Callable] = None):
+        """
+        - site: target origin, e.g. "https://www.redfin.com" (APIs proxy to this site)
+        - regions: AWS regions that should each have one endpoint
+        - client_factory: region -> apigateway client (default: boto3 with the ambient credentials)
+        """
+        self.path = path
+        self.site = site.rstrip("/")
+        self.api_name = api_name_for(self.site)
+        self.regions = list(regions)
+        self.client_factory = client_factory or boto3_client_factory()
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS gateways ("
+            " site TEXT NOT NULL, region TEXT NOT NULL, api_id TEXT NOT NULL, endpoint TEXT NOT NULL,"
+            " created_at REAL NOT NULL, checked_at REAL, PRIMARY KEY (site, region))"
+        )
+        self._conn.commit()
+
+    def _client(self, region: str):
+        with self._lock:
+            if region not in self._clients:
+                self._clients[region] = self.client_factory(region)
+            return self._clients[region]
+
+    def registered(self) -> Dict[str, str]:
+        """region -> API id for every endpoint currently in the registry."""
+        with self._lock:
+            rows = self._conn.execute("SELECT region, api_id FROM gateways WHERE site = ?", (self.site,)).fetchall()
+        return dict(rows)
+
+    def endpoints(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT endpoint FROM gateways WHERE site = ? ORDER BY region", (self.site,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def ensure(self) -> List[str]:
+        """
+        Return one healthy endpoint per region, reusing registered APIs and creating only what is missing.
+        Regions that cannot be checked or created are logged and left out.
+        """
+        registered = self.registered()
+        with ThreadPoolExecutor(max_workers=max(1, len(self.regions))) as executor:
+            results = list(executor.map(lambda region: self._ensure_region(region, registered.get(region)),
+                                        self.regions))
+
+        now = time.time()
+        reused = created = 0
+        with self._lock:
+            for region, (api_id, status) in zip(self.regions, results):
+                if api_id is None:
+                    self._conn.execute("DELETE FROM gateways WHERE site = ? AND region = ?", (self.site, region))
+                    continue
+                if status == "created":
+                    created += 1
+                else:
+                    reused += 1
+                self._conn.execute(
+                    "INSERT INTO gateways (site, region, api_id, endpoint, created_at, checked_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(site, region) DO UPDATE SET api_id = excluded.api_id,"
+                    " endpoint = excluded.endpoint, checked_at = excluded.checked_at,"
+                    " created_at = CASE WHEN gateways.api_id = excluded.api_id THEN gateways.created_at"
+                    " ELSE excluded.created_at END",
+                    (self.site, region, api_id, self.endpoint_for(region, api_id), now, now),
+                )
+            self._conn.commit()
+        endpoints = self.endpoints()
+        logging.info(f"Using {len(endpoints)} API Gateway endpoints for {self.site} ({reused} reused, {created} new)")
+        return endpoints
+
+    @staticmethod
+    def endpoint_for(region: str, api_id: str) -> str:
+        return f"{api_id}.execute-api.{region}.amazonaws.com"
+
+    def _ensure_region(self, region: str, api_id: Optional[str]):
+        """(api_id, "reused" | "created") for one region, or (None, None) if it has no usable endpoint."""
+        try:
+            client = self._client(region)
+            if api_id is not None:
+                if self.is_healthy(client, api_id):
+                    return api_id, "reused"
+                logging.warning(f"Registered API Gateway {api_id} in {region} is gone or broken; replacing it")
+            for api in self._list_apis(client):
+                if api.get("name", "").startswith(self.api_name) and api["id"] != api_id \
+                        and self.is_healthy(client, api["id"]):
+                    logging.info(f"Adopting existing API Gateway {api['id']} in {region}")
+                    return api["id"], "reused"
+            api_id = self._create_api(client)
+            logging.info(f"Created API Gateway {api_id} in {region}")
+            return api_id, "created"
+        except Exception as e:
+            if error_code(e) == "UnrecognizedClientException":
+                logging.warning(f"API Gateway region {region} is not enabled for this account")
+            else:
+                logging.error(f"Could not set up API Gateway in {region}: {e}")
+            return None, None
+
+    @staticmethod
+    def is_healthy(client, api_id: str) -> bool:
+        """True if the API still exists and has its proxy stage deployed."""
+        try:
+            client.get_rest_api(restApiId=api_id)
+            client.get_stage(restApiId=api_id, stageName=STAGE_NAME)
+            return True
+        except Exception as e:
+            if error_code(e) == "NotFoundException":
+                return False
+            raise
+
+    @staticmethod
+    def _list_apis(client) -> List[Dict]:
+        apis = []
+        position = None
+        while True:
+            response = client.get_rest_apis(limit=500, **({"position": position} if position else {}))
+            apis.extend(response.get("items", []))
+            position = response.get("position")
+            if not position:
+                return apis
+
+    def _create_api(self, client) -> str:
+        """Create a proxy REST API the same way requests_ip_rotator.ApiGateway.init_gateway does."""
+        api_id = client.create_rest_api(name=self.api_name, endpointConfiguration={"types": ["REGIONAL"]})["id"]
+        root_id = client.get_resources(restApiId=api_id)["items"][0]["id"]
+        proxy_id = client.create_resource(restApiId=api_id, parentId=root_id, pathPart="{proxy+}")["id"]
+        for resource_id, uri in ((root_id, self.site), (proxy_id, f"{self.site}/{{proxy}}")):
+            client.put_method(
+                restApiId=api_id, resourceId=resource_id, httpMethod="ANY", authorizationType="NONE",
+                requestParameters={
+                    "method.request.path.proxy": True,
+                    "method.request.header.X-My-X-Forwarded-For": True,
+                },
+            )
+            client.put_integration(
+                restApiId=api_id, resourceId=resource_id, type="HTTP_PROXY", httpMethod="ANY",
+                integrationHttpMethod="ANY", uri=uri, connectionType="INTERNET",
+                requestParameters={
+                    "integration.request.path.proxy": "method.request.path.proxy",
+                    "integration.request.header.X-Forwarded-For": "method.request.header.X-My-X-Forwarded-For",
+                },
+            )
+        client.create_deployment(restApiId=api_id, stageName=STAGE_NAME)
+        return api_id
+
+    def teardown(self) -> List[str]:
+        """Delete every API for this site in every region (registered or not) and clear the registry."""
+        registered = self.registered()
+        deleted = []
+        for region in self.regions:
+            try:
+                client = self._client(region)
+                api_ids = {api["id"] for api in self._list_apis(client)
+                           if api.get("name", "").startswith(self.api_name)}
+            except Exception as e:
+                if error_code(e) != "UnrecognizedClientException":
+                    logging.error(f"Could not list API Gateways in {region}: {e}")
+                continue
+            if region in registered:
+                api_ids.add(registered[region])
+            for api_id in api_ids:
+                while True:
+                    try:
+                        client.delete_rest_api(restApiId=api_id)
+                        deleted.append(api_id)
+                    except Exception as e:
+                        if error_code(e) == "TooManyRequestsException":
+                            time.sleep(1)
+                            continue
+                        if error_code(e) != "NotFoundException":
+                            logging.error(f"Failed to delete API Gateway {api_id} in {region}: {e}")
+                    break
+            with self._lock:
+                self._conn.execute("DELETE FROM gateways WHERE site = ? AND region = ?", (self.site, region))
+                self._conn.commit()
+        logging.info(f"Deleted {len(deleted)} API Gateways for {self.site}")
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,171 @@
+"""
+Append-only price and status history for scraped listings.
+
+- Only transitions are stored: one row per (listing, field) whenever the observed value differs from the last
+  one recorded, starting with the first observation (old_value null)
+- Rows go to hive-partitioned Parquet under <root>/change_date=YYYY-MM-DD/, so "what changed in the last
+  N days" reads only those days' partitions and the handful of columns it needs
+- The last recorded value per (listing, field) lives in <root>/_state.db (SQLite; pyarrow skips "_" files),
+  so finding a transition is one keyed lookup instead of a scan of earlier snapshots
+- checkpoint() makes the buffered transitions durable before committing the state they were derived from; an
+  optional sink (e.g. a Supabase table) receives each batch at the same point, and a rejected batch is retried
+  at the next checkpoint (up to max_unsent transitions are held for a failing sink)
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from parquet_store import METADATA_FILE, PartitionedParquetWriter, read_listings, to_float
+
+STATE_FILE = "_state.db"
+PARTITION_COLS = ("change_date",)
+
+HISTORY_COLUMNS = ["property_url", "state", "field", "old_value", "new_value", "old_number", "new_number",
+                   "changed_at", "change_date"]
+HISTORY_TYPES = {"old_number": "float", "new_number": "float", "change_date": "date"}
+
+
+class ListingHistory:
+    """Records field transitions for listings as they are scraped."""
+
+    def __init__(self, root: str, fields=("list_price", "status"), numeric_fields=("list_price",),
+                 sink: Optional[Callable[[List[Dict]], Optional[bool]]] = None, sink_batch_size: int = 500,
+                 max_unsent: int = 100000):
+        """
+        - fields: record fields whose transitions are kept
+        - numeric_fields: fields whose values are also stored as numbers (old_number / new_number)
+        - sink: optional callable receiving lists of transition rows, e.g. a batched database insert; a batch it
+          returns False for is kept and offered again at the next checkpoint
+        - max_unsent: transitions kept for a failing sink; beyond this the oldest are dropped (they stay in the
+          Parquet history, only the sink misses them)
+        """
+        self.root = root
+        self.fields = tuple(fields)
+        self.numeric_fields = set(numeric_fields)
+        self.sink = sink
+        self.sink_batch_size = sink_batch_size
+        self.max_unsent = max_unsent
+        self.sink_dropped = 0
+        self.transitions = 0
+        os.makedirs(root, exist_ok=True)
+        self._writer = PartitionedParquetWriter(root, HISTORY_COLUMNS, HISTORY_TYPES, partition_cols=PARTITION_COLS)
+        self._unsent = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, STATE_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS latest ("
+            " url TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, changed_at REAL NOT NULL,"
+            " PRIMARY KEY (url, field)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def observe(self, record: Dict, observed_at: Optional[float] = None) -> List[Dict]:
+        """Compare a scraped record with the last recorded values and stage any transitions (returned)."""
+        url = record.get("property_url")
+        if not url:
+            return []
+        observed_at = time.time() if observed_at is None else observed_at
+        changed_at = datetime.datetime.fromtimestamp(observed_at)
+        rows = []
+        with self._lock:
+            previous = dict(self._conn.execute(
+                f"SELECT field, value FROM latest WHERE url = ? AND field IN ({','.join('?' * len(self.fields))})",
+                (url, *self.fields),
+            ).fetchall())
+            for field in self.fields:
+                value = record.get(field)
+                value = "" if value is None else str(value).strip()
+                # A field missing from one scrape is an extraction gap, not a transition
+                if not value or value == previous.get(field):
+                    continue
+                old = previous.get(field)
+                numeric = field in self.numeric_fields
+                rows.append({
+                    "property_url": url,
+                    "state": record.get("state"),
+                    "field": field,
+                    "old_value": old,
+                    "new_value": value,
+                    "old_number": to_float(old) if numeric else None,
+                    "new_number": to_float(value) if numeric else None,
+                    "changed_at": changed_at.isoformat(timespec="seconds"),
+                    "change_date": changed_at.date(),
+                })
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO latest (url, field, value, changed_at) VALUES (?, ?, ?, ?)",
+                    (url, field, value, observed_at),
+                )
+            if rows:
+                self.transitions += len(rows)
+                self._writer.write_many(rows)
+                if self.sink:
+                    self._unsent.extend(rows)
+                    overflow = len(self._unsent) - self.max_unsent
+                    if overflow > 0:
+                        del self._unsent[:overflow]
+                        self.sink_dropped += overflow
+        return rows
+
+    def checkpoint(self):
+        """Write buffered transitions, hand them to the sink, then commit the state they came from."""
+        with self._lock:
+            self._writer.checkpoint()
+            if self.sink:
+                while self._unsent:
+                    batch = self._unsent[:self.sink_batch_size]
+                    if self.sink([{**row, "change_date": row["change_date"].isoformat()} for row in batch]) is False:
+                        # Keep the batch (and everything after it) for the next checkpoint
+                        logging.error(f"Listing history sink rejected {len(batch)} transitions; "
+                                      f"{len(self._unsent)} kept to retry at the next checkpoint")
+                        break
+                    del self._unsent[:len(batch)]
+                if self.sink_dropped:
+                    logging.error(f"Dropped {self.sink_dropped} listing history transitions the sink never accepted "
+                                  f"(over {self.max_unsent} waiting); they are kept in {self.root} only")
+                    self.sink_dropped = 0
+            self._conn.commit()
+
+    def close(self):
+        self.checkpoint()
+        with self._lock:
+            if self._unsent:
+                logging.error(f"{len(self._unsent)} listing history transitions never reached the sink; "
+                              f"they are kept in {self.root} only")
+            self._writer.close()
+            self._conn.close()
+        logging.info(f"Recorded {self.transitions} listing field transitions in {self.root}")
+
+
+def read_history(root: str, since: Optional[datetime.date] = None, field: Optional[str] = None,
+                 columns: Optional[List[str]] = None):
+    """Transitions on or after `since` (optionally for one field) as a DataFrame; only those days are read."""
+    condition = None
+    if since is not None:
+        condition = ds.field("change_date") >= since
+    if field is not None:
+        by_field = ds.field("field") == field
+        condition = by_field if condition is None else condition & by_field
+    return read_listings(root, columns=columns, filter=condition, partition_cols=PARTITION_COLS)
+
+
+def price_drops(root: str, days: int = 7, today: Optional[datetime.date] = None):
+    """Listings whose price went down in the last `days` days, biggest drop first."""
+    columns = ["property_url", "state", "old_number", "new_number", "changed_at"]
+    if not os.path.exists(os.path.join(root, METADATA_FILE)):
+        # No transition recorded yet (or no history at all at this path)
+        return pd.DataFrame(columns=columns + ["drop"])
+    since = (today or datetime.date.today()) - datetime.timedelta(days=days)
+    condition = ((ds.field("change_date") >= since) & (ds.field("field") == "list_price")
+                 & (ds.field("new_number") < ds.field("old_number")))
+    drops = read_listings(root, columns=columns, filter=condition, partition_cols=PARTITION_COLS)
+    drops["drop"] = drops["old_number"] - drops["new_number"]
+    return drops.sort_values("drop", ascending=False, ignore_index=True)
@@ -2,12 +2,20 @@ import pandas as pd
 import redis
 import json
 import logging
+import os
+
+try:
+    from parquet_store import read_listings
+except ImportError:
+    read_listings = None
 
 # --- Configuration ---
-CSV_PATH = "C:/Users/test/Documents/Buisness/fsbo_leads.csv"
+CSV_PATH = "C:/Users/test/Documents/Buisness/fsbo_leads.csv"  # or the scraper's Parquet directory
 REDIS_HOST = 'localhost'  # Or your cloud Redis IP
 REDIS_PORT = 6379
 REDIS_QUEUE_NAME = 'enrichment_jobs'
+# Parquet input: only the columns a job needs (worker.py searches by the address and keys the row on property_url)
+JOB_COLUMNS = ['property_url', 'property_id', 'permalink', 'street', 'unit', 'city', 'state', 'zip_code']
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -18,7 +26,13 @@ def main():
     logging.info("--- Starting Orchestrator ---")
     
     try:
-        df = pd.read_csv(CSV_PATH, dtype=str).fillna('')
+        if os.path.isdir(CSV_PATH):
+            if read_listings is None:
+                logging.error(f"FATAL: {CSV_PATH} is a Parquet directory but pyarrow is not installed. Aborting.")
+                return
+            df = read_listings(CSV_PATH, columns=JOB_COLUMNS, as_strings=True)
+        else:
+            df = pd.read_csv(CSV_PATH, dtype=str).fillna('')
         leads = df.to_dict('records')
         logging.info(f"Loaded {len(leads)} leads from {CSV_PATH}.")
     except FileNotFoundError:
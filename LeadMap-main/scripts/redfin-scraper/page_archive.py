@@ -0,0 +1,154 @@
+"""
+Compressed archive of fetched pages for offline re-extraction.
+
+- Every page is stored as its own zstd frame appended to a rolling segment file (segment-000001.zst, ...)
+- A SQLite index maps (url, fetched_at) to segment / offset / length plus a small JSON `meta` blob
+- Any archived page can be read back by seeking to its frame, so re-extraction never touches the network
+- read_entry() is a plain function, so process-pool workers can read pages straight from the segments
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Iterator, Optional
+
+import zstandard
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".zst"
+INDEX_FILE = "index.db"
+
+ArchiveEntry = namedtuple("ArchiveEntry", ["url", "fetched_at", "segment", "offset", "length", "status", "meta"])
+
+
+def segment_path(root: str, segment: int) -> str:
+    return os.path.join(root, f"{SEGMENT_PREFIX}{segment:06d}{SEGMENT_SUFFIX}")
+
+
+def read_entry(root: str, entry: ArchiveEntry) -> bytes:
+    """Read and decompress one archived page."""
+    with open(segment_path(root, entry.segment), "rb") as f:
+        f.seek(entry.offset)
+        frame = f.read(entry.length)
+    return zstandard.ZstdDecompressor().decompress(frame)
+
+
+class PageArchive:
+    """Append-only zstd segment store of raw pages with a SQLite index. One writer process at a time."""
+
+    def __init__(self, root: str, segment_bytes: int = 256 * 1024 * 1024, level: int = 3, commit_every: int = 100):
+        """
+        - segment_bytes: start a new segment once the current one reaches this size
+        - level: zstd compression level
+        - commit_every: pages written per index transaction (segments are flushed before each commit)
+        """
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.commit_every = commit_every
+        self.level = level
+        os.makedirs(root, exist_ok=True)
+        # ZstdCompressor is not thread-safe; each thread writing pages gets its own
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(os.path.join(root, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT NOT NULL, fetched_at REAL NOT NULL, segment INTEGER NOT NULL, offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL, status INTEGER, meta TEXT, PRIMARY KEY (url, fetched_at))"
+        )
+        self._conn.commit()
+        segments = [int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in os.listdir(root)
+                    if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)]
+        self._segment = max(segments, default=1)
+        self._file = open(segment_path(root, self._segment), "ab")
+
+    def put(self, url: str, content: bytes, fetched_at: Optional[float] = None, status: int = 200,
+            meta: Optional[Dict] = None):
+        """Compress and append one page."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        frame = self._compressor().compress(content)
+        with self._lock:
+            if self._file.tell() >= self.segment_bytes:
+                self._file.close()
+                self._segment += 1
+                self._file = open(segment_path(self.root, self._segment), "ab")
+            offset = self._file.tell()
+            self._file.write(frame)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, fetched_at, segment, offset, length, status, meta)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, fetched_at, self._segment, offset, len(frame), status, json.dumps(meta) if meta else None),
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._commit()
+
+    def _compressor(self):
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor
+
+    def _commit(self):
+        # The index must never point past what is on disk
+        self._file.flush()
+        self._conn.commit()
+        self._pending = 0
+
+    def contains(self, url: str) -> bool:
+        """Whether any fetch of the URL is archived."""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM pages WHERE url = ? LIMIT 1", (url,)).fetchone() is not None
+
+    def count(self, meta_key: Optional[str] = None) -> int:
+        """Number of archived URLs; with meta_key, only those whose latest fetch has that key in its meta."""
+        with self._lock:
+            if meta_key is None:
+                return self._conn.execute("SELECT COUNT(DISTINCT url) FROM pages").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT meta, MAX(fetched_at) FROM pages GROUP BY url)"
+                " WHERE json_extract(meta, ?) IS NOT NULL", ("$." + meta_key,)
+            ).fetchone()[0]
+
+    def iter_latest(self, since: Optional[float] = None, batch_size: int = 1000) -> Iterator[ArchiveEntry]:
+        """
+        Yield the most recent archived fetch of every URL (optionally only fetches at or after `since`),
+        keyset-paginated by URL so the index never has to fit in memory.
+        """
+        since = float("-inf") if since is None else since
+        last_url = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT url, MAX(fetched_at), segment, offset, length, status, meta FROM pages"
+                    " WHERE url > ? GROUP BY url HAVING MAX(fetched_at) >= ? ORDER BY url LIMIT ?",
+                    (last_url, since, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_url = rows[-1][0]
+            for url, fetched_at, segment, offset, length, status, meta in rows:
+                yield ArchiveEntry(url, fetched_at, segment, offset, length, status, json.loads(meta) if meta else None)
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Latest archived page for a URL, or None."""
+        with self._lock:
+            self._file.flush()
+            row = self._conn.execute(
+                "SELECT url, fetched_at, segment, offset, length, status, meta FROM pages"
+                " WHERE url = ? ORDER BY fetched_at DESC LIMIT 1", (url,)
+            ).fetchone()
+        return read_entry(self.root, ArchiveEntry(*row)) if row else None
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._file.close()
+            self._conn.close()
+        logging.info(f"Closed page archive at {self.root}")
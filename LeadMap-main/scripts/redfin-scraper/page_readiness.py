@@ -0,0 +1,123 @@
+"""
+Event-driven readiness for enrichment pages, instead of fixed sleeps after each load.
+
+- A page is ready as soon as the property card or a "no results" marker is in the DOM, or the network has
+  gone quiet, whichever comes first; the wait gives up at a deadline and the caller parses what is there
+- While a challenge page is showing only the content markers count, since a challenge page is quiet too
+- static_page_ready() applies the same markers to HTML fetched without a browser
+- WaitTimer keeps the per-run split of time spent waiting (readiness, backoff) versus working
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+CARD_SELECTOR = 'div.card.card-body.shadow-form, div.shadow-form, div.card-body'
+NO_RESULTS_MARKERS = ("no results found", "we found 0")
+
+# Polled in the page; innerText is only read once the cheap selector check has failed
+READY_SCRIPT = """([selector, markers]) => {
+    if (document.querySelector(selector)) return true;
+    const text = document.body ? document.body.innerText.toLowerCase() : '';
+    return markers.some(marker => text.includes(marker));
+}"""
+READY_POLL_MS = 100
+
+# Static-HTML equivalents of CARD_SELECTOR, and the signs of an interstitial instead of a result page
+CARD_CLASS_RE = re.compile(r'<div[^>]+class="[^"]*\b(?:card-body|shadow-form)\b', re.IGNORECASE)
+CHALLENGE_MARKERS = ("checking your browser", "just a moment...", "cf-chl", "captcha", "access denied")
+
+
+def static_page_ready(html: str) -> bool:
+    """Whether HTML fetched without a browser already holds a parseable result (card or no-results marker)."""
+    text = html.lower()
+    if any(marker in text for marker in CHALLENGE_MARKERS):
+        return False
+    return bool(CARD_CLASS_RE.search(html)) or any(marker in text for marker in NO_RESULTS_MARKERS)
+
+
+async def wait_until_ready(page, timeout_ms: float, network_idle: bool = True) -> str:
+    """
+    Wait until the page has content to parse.
+
+    - Returns "content" (card or no-results marker found), "idle" (network quiet) or "timeout"
+    - network_idle=False waits for the content markers only (e.g. while a challenge is resolving)
+    """
+    waiters = {asyncio.ensure_future(page.wait_for_function(
+        READY_SCRIPT, arg=[CARD_SELECTOR, list(NO_RESULTS_MARKERS)], polling=READY_POLL_MS, timeout=timeout_ms,
+    )): "content"}
+    if network_idle:
+        waiters[asyncio.ensure_future(page.wait_for_load_state("networkidle", timeout=timeout_ms))] = "idle"
+    deadline = time.monotonic() + timeout_ms / 1000
+    pending = set(waiters)
+    outcome = "timeout"
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            finished = [task for task in done if task.exception() is None]
+            if finished:
+                # Prefer "content" if both signals landed together
+                outcome = min((waiters[task] for task in finished), key=("content", "idle").index)
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        # Retrieve every result so timeouts and cancellations are not reported as unhandled
+        await asyncio.gather(*waiters, return_exceptions=True)
+    return outcome
+
+
+class WaitTimer:
+    """Accumulates how long leads spend in each phase, and how their readiness waits ended."""
+
+    WAIT_PHASES = ("readiness", "backoff")
+
+    def __init__(self):
+        self.seconds = Counter()
+        self.outcomes = Counter()
+        self.leads = 0
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.monotonic() - start
+
+    def lead_done(self, started: float):
+        """Count one lead that held a page since `started` (a time.monotonic() value)."""
+        self.seconds["lead"] += time.monotonic() - started
+        self.leads += 1
+
+    async def backoff(self, page, ms: float):
+        with self.phase("backoff"):
+            await page.wait_for_timeout(ms)
+
+    async def ready(self, page, timeout_ms: float, network_idle: bool = True) -> str:
+        with self.phase("readiness"):
+            outcome = await wait_until_ready(page, timeout_ms, network_idle)
+        self.outcomes[outcome] += 1
+        return outcome
+
+    def log_report(self):
+        total = self.seconds["lead"]
+        if not self.leads or total <= 0:
+            return
+        waiting = sum(self.seconds[name] for name in self.WAIT_PHASES)
+        navigating = self.seconds["navigation"]
+        working = max(total - waiting - navigating, 0.0)
+        logging.info(f"Page time over {self.leads} leads: {waiting:.1f}s waiting ({waiting / total:.0%}), "
+                     f"{navigating:.1f}s navigating ({navigating / total:.0%}), "
+                     f"{working:.1f}s working ({working / total:.0%})")
+        logging.info(f"Per lead: {self.seconds['readiness'] / self.leads:.2f}s readiness, "
+                     f"{self.seconds['backoff'] / self.leads:.2f}s backoff, "
+                     f"{navigating / self.leads:.2f}s navigation, {working / self.leads:.2f}s working")
+        if self.outcomes:
+            ready = ", ".join(f"{outcome} {count}" for outcome, count in self.outcomes.most_common())
+            logging.info(f"Readiness waits ended by: {ready}")
@@ -0,0 +1,260 @@
+"""
+Typed, partitioned Parquet output for scraped listings.
+
+- Rows are coerced to a typed Arrow schema: "$450,000" -> 450000.0, "3 Beds" -> 3, "2025-10-29" -> date
+- Files are laid out hive-style as <root>/state=FL/scrape_date=2025-10-29/part-<run>-<n>.parquet, so readers
+  can prune whole partitions and read only the columns they need
+- Rows are buffered per partition and written out in large files (one row group each), zstd-compressed;
+  checkpoints spill the buffers to a hidden staging area instead of cutting small files
+- The full schema (partition columns included) is kept in <root>/_common_metadata so readers need no field list
+"""
+import datetime
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+NUMBER_PATTERN = re.compile(r'-?\d[\d,]*(?:\.\d+)?|-?\.\d+')
+DATE_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+
+METADATA_FILE = "_common_metadata"
+# Checkpointed rows not yet folded into a full file; hidden from readers by its "_" prefix
+PENDING_DIR = "_pending"
+# Directory name pyarrow's hive partitioning reads back as null
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+ARROW_TYPES = {
+    "string": pa.string(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "date": pa.date32(),
+}
+
+
+def to_float(value) -> Optional[float]:
+    """First number in a value, ignoring currency symbols and thousands separators."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER_PATTERN.search(str(value))
+    return float(match.group(0).replace(",", "")) if match else None
+
+
+def to_int(value) -> Optional[int]:
+    number = to_float(value)
+    return int(number) if number is not None else None
+
+
+def to_date(value) -> Optional[datetime.date]:
+    if not value:
+        return None
+    if isinstance(value, datetime.date):
+        return value
+    match = DATE_PATTERN.search(str(value))
+    if not match:
+        return None
+    try:
+        return datetime.date(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+
+def to_string(value) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+CONVERTERS = {"string": to_string, "int": to_int, "float": to_float, "date": to_date}
+
+
+def build_schema(fields: List[str], types: Dict[str, str]) -> pa.Schema:
+    """Arrow schema for `fields`; anything not listed in `types` is a string."""
+    return pa.schema([(name, ARROW_TYPES[types.get(name, "string")]) for name in fields])
+
+
+def partitioning(schema: pa.Schema, partition_cols) -> ds.Partitioning:
+    return ds.partitioning(pa.schema([schema.field(col) for col in partition_cols]), flavor="hive")
+
+
+def partition_value(value) -> str:
+    """Directory-safe rendering of a partition value."""
+    text = "" if value is None else str(value)
+    return re.sub(r'[^A-Za-z0-9_.-]', "_", text) or NULL_PARTITION
+
+
+class PartitionedParquetWriter:
+    """
+    Buffers typed rows per partition and writes them as hive-partitioned Parquet files of about rows_per_file rows.
+
+    checkpoint() makes the buffered rows durable without cutting a file: they are spilled to
+    <root>/_pending/<run>/ (pyarrow skips "_" paths) and folded into the partition's next full file.
+    Spills left behind by a run that crashed are folded in by the next writer opened on the same root.
+    """
+
+    def __init__(self, root: str, fields: List[str], types: Dict[str, str],
+                 partition_cols=("state", "scrape_date"), rows_per_file: int = 50000, compression: str = "zstd"):
+        """
+        - fields/types: column order and "int" / "float" / "date" for the typed columns (others are strings)
+        - partition_cols: columns encoded in the directory path instead of the files
+        - rows_per_file: rows gathered per partition (buffered or spilled) before a file is written
+        """
+        self.root = root
+        self.schema = build_schema(fields, types)
+        self.partition_cols = tuple(partition_cols)
+        self.file_schema = pa.schema([f for f in self.schema if f.name not in self.partition_cols])
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.rows_written = 0
+        self.files_written = 0
+        self._converters = [(f.name, CONVERTERS[types.get(f.name, "string")]) for f in self.file_schema]
+        self._partition_converters = [CONVERTERS[types.get(col, "string")] for col in self.partition_cols]
+        self._buffers = {}
+        # partition key -> ([spill paths], spilled row count)
+        self._spilled = {}
+        self._spills_written = 0
+        self._lock = threading.Lock()
+        self.recover()
+
+    def write(self, row: Dict):
+        key = tuple(convert(row.get(col)) for col, convert in zip(self.partition_cols, self._partition_converters))
+        typed = {name: convert(row.get(name)) for name, convert in self._converters}
+        with self._lock:
+            buffer = self._buffers.setdefault(key, [])
+            buffer.append(typed)
+            if len(buffer) + self._spilled.get(key, ((), 0))[1] >= self.rows_per_file:
+                self._write_partition(key)
+
+    def write_many(self, rows: Iterable[Dict]):
+        for row in rows:
+            self.write(row)
+
+    def _partition_path(self, key) -> str:
+        return os.path.join(*(f"{col}={partition_value(value)}" for col, value in zip(self.partition_cols, key)))
+
+    def _write_table(self, table, path):
+        """Write a file under a temporary name, fsync it and move it into place."""
+        directory, name = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        # "." keeps a half-written file out of dataset discovery
+        partial = os.path.join(directory, f".{name}.partial")
+        with open(partial, "wb") as f:
+            pq.write_table(table, f, compression=self.compression)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+
+    def _write_partition(self, key):
+        """Write a partition's spilled and buffered rows out as one file and drop the spills."""
+        spills, _ = self._spilled.pop(key, ([], 0))
+        tables = [read_file(path, self.file_schema) for path in spills]
+        rows = self._buffers.pop(key, [])
+        if rows:
+            tables.append(pa.Table.from_pylist(rows, schema=self.file_schema))
+        if not tables:
+            return
+        table = pa.concat_tables(tables)
+        # Named after the first spill when there is one, so recovery after a crash here cannot write it twice
+        if spills:
+            name = spill_file_name(self.run_id, spills[0])
+        else:
+            name = f"part-{self.run_id}-{self.files_written:05d}.parquet"
+        self._write_table(table, os.path.join(self.root, self._partition_path(key), name))
+        for path in spills:
+            os.remove(path)
+        self.rows_written += table.num_rows
+        self.files_written += 1
+
+    def flush(self):
+        """Write every partition's spilled and buffered rows out as files."""
+        with self._lock:
+            for key in list(self._spilled.keys() | self._buffers.keys()):
+                self._write_partition(key)
+
+    def checkpoint(self):
+        """Make every row written so far durable by spilling the buffers; no dataset file is cut early."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            for key, rows in buffers.items():
+                path = os.path.join(self.root, PENDING_DIR, self.run_id, self._partition_path(key),
+                                    f"s{self._spills_written:06d}.parquet")
+                self._write_table(pa.Table.from_pylist(rows, schema=self.file_schema), path)
+                self._spills_written += 1
+                spills, count = self._spilled.get(key, ([], 0))
+                self._spilled[key] = (spills + [path], count + len(rows))
+
+    def recover(self):
+        """Fold spills left by earlier runs that never closed into dataset files."""
+        pending = os.path.join(self.root, PENDING_DIR)
+        if not os.path.isdir(pending):
+            return
+        for run_id in sorted(os.listdir(pending)):
+            run_dir = os.path.join(pending, run_id)
+            if run_id == self.run_id or not os.path.isdir(run_dir):
+                continue
+            recovered = 0
+            for directory, _, files in os.walk(run_dir):
+                spills = sorted(os.path.join(directory, f) for f in files if f.endswith(".parquet"))
+                if not spills:
+                    continue
+                target = os.path.join(self.root, os.path.relpath(directory, run_dir),
+                                      spill_file_name(run_id, spills[0]))
+                if not os.path.exists(target):
+                    table = pa.concat_tables([read_file(path, self.file_schema) for path in spills])
+                    self._write_table(table, target)
+                    recovered += table.num_rows
+                for path in spills:
+                    os.remove(path)
+            shutil.rmtree(run_dir, ignore_errors=True)
+            logging.info(f"Recovered {recovered} checkpointed rows of unfinished run {run_id} under {self.root}")
+
+    def close(self):
+        self.flush()
+        shutil.rmtree(os.path.join(self.root, PENDING_DIR, self.run_id), ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+        pq.write_metadata(self.schema, os.path.join(self.root, METADATA_FILE))
+        logging.info(f"Wrote {self.rows_written} rows in {self.files_written} Parquet files under {self.root}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def spill_file_name(run_id: str, first_spill: str) -> str:
+    """Dataset file name for a partition's spills, fixed by the first of them."""
+    return f"part-{run_id}-{os.path.splitext(os.path.basename(first_spill))[0]}.parquet"
+
+
+def read_file(path: str, schema: pa.Schema) -> pa.Table:
+    """Read one Parquet file as-is (no partition columns inferred from its path)."""
+    return pq.ParquetFile(path).read().cast(schema)
+
+
+def read_listings(root: str, columns: Optional[List[str]] = None, filter=None, as_strings: bool = False,
+                  partition_cols=("state", "scrape_date")):
+    """
+    Read a partitioned listing dataset into a pandas DataFrame.
+    - columns: read only these columns (default: all)
+    - filter: pyarrow.dataset expression such as ds.field("state") == "FL"; prunes partitions before any file is opened
+    - as_strings: render every value as a string with "" for nulls, matching pd.read_csv(dtype=str).fillna('')
+    """
+    schema = pq.read_schema(os.path.join(root, METADATA_FILE))
+    dataset = ds.dataset(root, format="parquet", schema=schema, partitioning=partitioning(schema, partition_cols))
+    table = dataset.to_table(columns=columns, filter=filter)
+    if as_strings:
+        table = pa.table({name: pc.fill_null(column.cast(pa.string()), "")
+                          for name, column in zip(table.column_names, table.columns)})
+    return table.to_pandas()
@@ -0,0 +1,131 @@
+"""
+Buffered, thread-safe CSV record writer shared by the scraper and enrichment stages.
+
+- Keeps one file handle open for the whole run instead of reopening the CSV per row
+- Rows go through the csv module into an in-process buffer that is flushed every `flush_rows`
+  rows or `flush_interval` seconds, whichever comes first; a background timer flushes a slow tail
+  even when no further rows arrive
+- checkpoint() flushes and fsyncs, so everything written before it survives a crash
+- write() may be called from any number of threads
+- Keys that are not in the header are dropped, with one warning per column so a lost column is visible
+"""
+import csv
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List
+
+
+class BufferedRecordWriter:
+    """Append dict rows to a CSV file with batched flushes and explicit fsync checkpoints."""
+
+    def __init__(self, path: str, fields: List[str], mode: str = "w", flush_rows: int = 500,
+                 flush_interval: float = 5.0, checkpoint_rows: int = 5000, encoding: str = "utf-8"):
+        """
+        - fields: column order; keys missing from a row are written empty, unknown keys are dropped (and logged)
+        - mode: "w" truncates and writes the header, "a" appends (writing the header only if the file is empty)
+        - flush_rows / flush_interval: flush the OS-level buffer after this many rows, or once rows have waited
+          this many seconds (0 disables the timer)
+        - checkpoint_rows: fsync after this many rows (0 to fsync only on checkpoint() and close())
+        The file is opened on the first write, so a run that produces no rows leaves existing output untouched.
+        """
+        self.path = path
+        self.fields = list(fields)
+        self._field_set = frozenset(self.fields)
+        self.mode = mode
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.checkpoint_rows = checkpoint_rows
+        self.encoding = encoding
+        self.rows_written = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._unflushed = 0
+        self._unsynced = 0
+        self._last_flush = time.monotonic()
+        self._dropped = set()
+        self._closed = threading.Event()
+        self._timer = None
+
+    def _open(self):
+        write_header = self.mode == "w" or not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, self.mode, newline="", encoding=self.encoding, buffering=1024 * 1024)
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction="ignore")
+        if write_header:
+            self._writer.writeheader()
+        if self.flush_interval > 0:
+            self._closed.clear()
+            self._timer = threading.Thread(target=self._flush_periodically, name="record-writer-flush", daemon=True)
+            self._timer.start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._file is not None and self._unflushed:
+                    self._flush()
+
+    def write(self, row: Dict):
+        self.write_many((row,))
+
+    def write_many(self, rows: Iterable[Dict]):
+        with self._lock:
+            if self._file is None:
+                self._open()
+            count = 0
+            for row in rows:
+                extra = row.keys() - self._field_set
+                if extra and not extra <= self._dropped:
+                    self._note_dropped(extra)
+                self._writer.writerow(row)
+                count += 1
+            self.rows_written += count
+            self._unflushed += count
+            self._unsynced += count
+            if self.checkpoint_rows and self._unsynced >= self.checkpoint_rows:
+                self._sync()
+            elif self._unflushed >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def _note_dropped(self, keys):
+        for key in sorted(keys - self._dropped):
+            logging.warning(f"Column {key!r} is not in the header of {self.path}; its values are not written")
+        self._dropped |= keys
+
+    def _flush(self):
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def _sync(self):
+        self._flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def checkpoint(self):
+        """Flush buffered rows and fsync them to disk."""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def close(self):
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._sync()
+            finally:
+                self._file.close()
+                self._file = None
+        logging.info(f"Wrote {self.rows_written} rows to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,127 @@
+"""
+Request interception for enrichment page loads: only fetch what the HTML parser needs.
+
+- Requests for blocked resource types (images, fonts, stylesheets, media, ...) are aborted
+- Requests to known ad / analytics / tracking hosts are aborted whatever their type
+- The main-frame document and allow-listed hosts (e.g. the Cloudflare challenge) always go through
+- Trade-off: Playwright turns the browser HTTP cache off in any context with a request route, whatever its
+  pattern, so a blocked context re-downloads the documents and scripts it lets through on every page load.
+  Blocking wins when most of a page's bytes are images, fonts and ad/tracker traffic (as on the enrichment
+  result pages); turn it off where a warm cache matters more
+- Every context the blocker is attached to reports into one per-run tally: main-frame page loads routed,
+  requests blocked by type and host with an estimate of the bytes saved, and the bytes actually loaded
+"""
+import logging
+from collections import Counter
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+
+# Matched as host suffixes, so "doubleclick.net" also covers "stats.g.doubleclick.net"
+DEFAULT_BLOCKED_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googletagservices.com", "googletagmanager.com",
+    "google-analytics.com", "adservice.google.com", "googleadservices.com", "facebook.net", "facebook.com",
+    "amazon-adsystem.com", "adnxs.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+    "rubiconproject.com", "pubmatic.com", "openx.net", "casalemedia.com", "advertising.com", "moatads.com",
+    "scorecardresearch.com", "quantserve.com", "hotjar.com", "clarity.ms", "bat.bing.com", "nr-data.net",
+    "sentry.io", "adsrvr.org", "3lift.com", "sharethrough.com", "media.net", "yieldmo.com", "indexww.com",
+)
+
+DEFAULT_ALLOWED_HOSTS = ("challenges.cloudflare.com",)
+
+# Typical transfer sizes used to estimate what an aborted request would have cost (it is never downloaded)
+ESTIMATED_BYTES = {
+    "image": 60_000, "media": 500_000, "font": 40_000, "stylesheet": 30_000, "script": 80_000,
+    "xhr": 5_000, "fetch": 5_000, "document": 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+def host_matches(host: str, suffixes: Iterable[str]) -> bool:
+    return any(host == suffix or host.endswith("." + suffix) for suffix in suffixes)
+
+
+class ResourceBlocker:
+    """Route handler that aborts unneeded requests and tallies what it saved."""
+
+    def __init__(self, blocked_types: Optional[Iterable[str]] = None, blocked_hosts: Optional[Iterable[str]] = None,
+                 allowed_hosts: Optional[Iterable[str]] = None):
+        """
+        - blocked_types: Playwright resource types to abort (default: images, media, fonts, stylesheets, ...)
+        - blocked_hosts: host suffixes whose requests are aborted whatever their type
+        - allowed_hosts: host suffixes that are never blocked
+        """
+        self.blocked_types = set(DEFAULT_BLOCKED_TYPES if blocked_types is None else blocked_types)
+        self.blocked_hosts = tuple(DEFAULT_BLOCKED_HOSTS if blocked_hosts is None else blocked_hosts)
+        self.allowed_hosts = tuple(DEFAULT_ALLOWED_HOSTS if allowed_hosts is None else allowed_hosts)
+        self.blocked_by_type = Counter()
+        self.blocked_by_host = Counter()
+        self.estimated_bytes_saved = 0
+        self.pages = 0
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+
+    async def attach(self, context):
+        """Install the route handler and byte accounting on a browser context (this disables its HTTP cache)."""
+        await context.route("**/*", self.handle)
+        context.on("requestfinished", self._on_finished)
+
+    @staticmethod
+    def is_page_load(request) -> bool:
+        """The main-frame document of a navigation (challenge reloads and redirects each count)."""
+        return request.is_navigation_request() and request.frame.parent_frame is None
+
+    def should_block(self, request) -> Optional[str]:
+        """Why a request should be aborted ("type" or "host"), or None to let it through."""
+        if self.is_page_load(request):
+            return None
+        host = (urlsplit(request.url).hostname or "").lower()
+        if host_matches(host, self.allowed_hosts):
+            return None
+        if host_matches(host, self.blocked_hosts):
+            return "host"
+        if request.resource_type in self.blocked_types:
+            return "type"
+        return None
+
+    async def handle(self, route):
+        request = route.request
+        reason = self.should_block(request)
+        if reason is None:
+            if self.is_page_load(request):
+                self.pages += 1
+            await route.continue_()
+            return
+        self.blocked_by_type[request.resource_type] += 1
+        if reason == "host":
+            self.blocked_by_host[(urlsplit(request.url).hostname or "").lower()] += 1
+        self.estimated_bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+        await route.abort("blockedbyclient")
+
+    async def _on_finished(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.loaded_requests += 1
+        self.loaded_bytes += sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+
+    def log_report(self):
+        """Log this run's blocking totals, and per-page figures over the page loads that went through the route."""
+        blocked = sum(self.blocked_by_type.values())
+        pages = self.pages
+        mb = 1024 * 1024
+        logging.info(f"Request blocking: {blocked} requests aborted (~{self.estimated_bytes_saved / mb:.1f} MB "
+                     f"estimated saved), {self.loaded_requests} loaded ({self.loaded_bytes / mb:.1f} MB) "
+                     f"over {pages} page loads")
+        if pages:
+            logging.info(f"Request blocking per page: {blocked / pages:.1f} aborted "
+                         f"(~{self.estimated_bytes_saved / pages / 1024:.0f} KB), "
+                         f"{self.loaded_bytes / pages / 1024:.0f} KB loaded")
+        if blocked:
+            by_type = ", ".join(f"{kind} {count}" for kind, count in self.blocked_by_type.most_common())
+            logging.info(f"Request blocking by type: {by_type}")
+        if self.blocked_by_host:
+            by_host = ", ".join(f"{host} {count}" for host, count in self.blocked_by_host.most_common(10))
+            logging.info(f"Request blocking top third-party hosts: {by_host}")
@@ -0,0 +1,222 @@
+"""
+On-disk HTTP response cache for listing pages, keyed by URL.
+
+- Each entry keeps the response's ETag / Last-Modified, a SHA-256 of the body, the zlib-compressed body
+  and the record last parsed from it
+- Entries validated within the TTL are served without a request; older ones are revalidated with
+  If-None-Match / If-Modified-Since, and a 304 (or a 200 with the same body hash) reuses the stored record
+- Total size (compressed bodies plus stored records) is bounded: least recently used entries are evicted once
+  it exceeds max_bytes
+- Bodies are written under a name that includes their hash, so the index never points at a body it did not describe
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from typing import Dict, Optional
+
+INDEX_FILE = "index.db"
+
+CachedResponse = namedtuple("CachedResponse", ["url", "etag", "last_modified", "content_hash", "validated_at",
+                                               "record"])
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-indexed, size-bounded LRU cache of listing responses and their parsed records."""
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 ** 3, ttl: float = 6 * 3600, commit_every: int = 100):
+        """
+        - max_bytes: bound on the compressed bodies plus the records kept in the index
+        - ttl: seconds after a (re)validation during which an entry is served without any request
+        - commit_every: index changes per transaction
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.commit_every = commit_every
+        self.hits = self.revalidated = self.unchanged = self.evicted = 0
+        os.makedirs(root, exist_ok=True)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT NOT NULL, size INTEGER NOT NULL,"
+            " validated_at REAL NOT NULL, last_used REAL NOT NULL, record TEXT, record_size INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Caches created before records counted towards the size bound
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "record_size" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN record_size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE responses SET record_size = COALESCE(LENGTH(record), 0)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size + record_size), 0) FROM responses").fetchone()[0]
+
+    def _body_path(self, url: str, digest: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], f"{key}-{digest[:16]}.z")
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """The cached entry for a URL (marking it recently used), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, etag, last_modified, content_hash, validated_at, record FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._staged()
+        *fields, record = row
+        return CachedResponse(*fields, json.loads(record) if record else None)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.validated_at < self.ttl
+
+    def fresh_record(self, url: str) -> Optional[Dict]:
+        """The stored record if the URL was validated within the TTL, so it needs no request at all."""
+        entry = self.lookup(url)
+        if entry is None or entry.record is None or not self.is_fresh(entry):
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry.record
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CachedResponse]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def body(self, entry: CachedResponse) -> Optional[bytes]:
+        try:
+            with open(self._body_path(entry.url, entry.content_hash), "rb") as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+
+    def store(self, url: str, content: bytes, headers) -> str:
+        """Cache a 200 response and return its body hash. A changed body drops the stored record."""
+        digest = content_hash(content)
+        path = self._body_path(url, digest)
+        compressed = zlib.compress(content, 6)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, size, record_size FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None or row[0] != digest:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(compressed)
+            self._conn.execute(
+                "INSERT INTO responses (url, etag, last_modified, content_hash, size, validated_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified,"
+                " size = excluded.size, validated_at = excluded.validated_at, last_used = excluded.last_used,"
+                " record = CASE WHEN responses.content_hash = excluded.content_hash THEN responses.record END,"
+                " record_size = CASE WHEN responses.content_hash = excluded.content_hash"
+                " THEN responses.record_size ELSE 0 END,"
+                " content_hash = excluded.content_hash",
+                (url, headers.get("ETag"), headers.get("Last-Modified"), digest, len(compressed), now, now),
+            )
+            self._total_bytes += len(compressed) - (row[1] if row else 0)
+            if row is not None:
+                if row[0] != digest:
+                    self._total_bytes -= row[2]
+                    self._remove_body(url, row[0])
+                else:
+                    self.unchanged += 1
+            self._staged()
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return digest
+
+    def mark_revalidated(self, url: str, headers):
+        """Record a 304: the entry is fresh again, with any validators the server sent along."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET validated_at = ?, etag = COALESCE(?, etag),"
+                " last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), headers.get("ETag"), headers.get("Last-Modified"), url),
+            )
+            self.revalidated += 1
+            self._staged()
+
+    def store_record(self, url: str, record: Dict):
+        """Attach the record parsed from the URL's current cached body."""
+        encoded = json.dumps(record)
+        with self._lock:
+            row = self._conn.execute("SELECT record_size FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute("UPDATE responses SET record = ?, record_size = ? WHERE url = ?",
+                               (encoded, len(encoded), url))
+            self._total_bytes += len(encoded) - row[0]
+            self._staged()
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def forget(self, url: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, size + record_size FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._total_bytes -= row[1]
+                self._remove_body(url, row[0])
+                self._staged()
+
+    def _remove_body(self, url: str, digest: str):
+        try:
+            os.remove(self._body_path(url, digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Drop least recently used entries until bodies and records fit in 90% of the budget
+        target = self.max_bytes * 0.9
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT url, content_hash, size + record_size FROM responses ORDER BY last_used LIMIT 500"
+            ).fetchall()
+            if not rows:
+                break
+            for url, digest, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._remove_body(url, digest)
+                self._total_bytes -= size
+                self.evicted += 1
+                if self._total_bytes <= target:
+                    break
+        self._conn.commit()
+        self._pending = 0
+
+    def _staged(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+        logging.info(f"Response cache: {self.hits} fresh hits, {self.revalidated} revalidated (304), "
+                     f"{self.unchanged} unchanged bodies, {self.evicted} evicted")
@@ -0,0 +1,125 @@
+"""
+Run manifest for checkpoint/resume of long FSBO crawls.
+
+- Each run records its full listing URL list up front, in crawl order
+- Completed URLs are marked as they finish and committed at periodic checkpoints
+- A resumed run picks up the latest unfinished run and iterates only the URLs not yet marked done
+"""
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+
+class RunManifest:
+    """SQLite-backed record of each crawl's URL list and progress."""
+
+    def __init__(self, path: str, checkpoint_every: int = 1000, checkpoint_interval: float = 60.0):
+        """
+        - checkpoint_every / checkpoint_interval: mark_done() reports a checkpoint as due after this many
+          completions or seconds, whichever comes first
+        """
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id INTEGER PRIMARY KEY, started_at REAL NOT NULL, finished_at REAL, status TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS run_urls ("
+            " run_id INTEGER NOT NULL, seq INTEGER NOT NULL, url TEXT NOT NULL, outcome TEXT,"
+            " PRIMARY KEY (run_id, seq))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS run_urls_url ON run_urls (run_id, url)")
+        self._conn.commit()
+
+    def start_run(self, urls: Iterable[str]) -> int:
+        """Abandon any unfinished run, record a new run with its URL list, and return its id."""
+        with self._lock:
+            self._conn.execute("UPDATE runs SET status = 'abandoned' WHERE status = 'running'")
+            run_id = self._conn.execute(
+                "INSERT INTO runs (started_at, status) VALUES (?, 'running')", (time.time(),)
+            ).lastrowid
+            batch = []
+            for seq, url in enumerate(urls):
+                batch.append((run_id, seq, url))
+                if len(batch) >= 1000:
+                    self._conn.executemany("INSERT INTO run_urls (run_id, seq, url) VALUES (?, ?, ?)", batch)
+                    batch = []
+            if batch:
+                self._conn.executemany("INSERT INTO run_urls (run_id, seq, url) VALUES (?, ?, ?)", batch)
+            self._conn.commit()
+        logging.info(f"Started run {run_id} in manifest {self.path}")
+        return run_id
+
+    def unfinished_run(self) -> Optional[int]:
+        """Id of the most recent run that never finished, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE status = 'running' ORDER BY run_id DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def started_at(self, run_id: int) -> float:
+        with self._lock:
+            return self._conn.execute("SELECT started_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+    def count_pending(self, run_id: int) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM run_urls WHERE run_id = ? AND outcome IS NULL", (run_id,)
+            ).fetchone()[0]
+
+    def iter_pending(self, run_id: int, batch_size: int = 1000) -> Iterator[str]:
+        """Yield the run's URLs not yet marked done, in their original order (keyset-paginated)."""
+        last_seq = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, url FROM run_urls WHERE run_id = ? AND seq > ? AND outcome IS NULL"
+                    " ORDER BY seq LIMIT ?",
+                    (run_id, last_seq, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_seq = rows[-1][0]
+            yield from (url for _, url in rows)
+
+    def mark_done(self, run_id: int, url: str, outcome: str) -> bool:
+        """
+        Stage a URL's final outcome for this run. Returns True when a checkpoint is due: the caller should make
+        its outputs durable and then call commit(), so the manifest never claims rows that were not written.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE run_urls SET outcome = ? WHERE run_id = ? AND url = ?", (outcome, run_id, url))
+            self._since_checkpoint += 1
+            return (self._since_checkpoint >= self.checkpoint_every
+                    or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval)
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._since_checkpoint = 0
+            self._last_checkpoint = time.monotonic()
+
+    def finish_run(self, run_id: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = 'complete', finished_at = ? WHERE run_id = ?", (time.time(), run_id)
+            )
+            self._conn.commit()
+        logging.info(f"Run {run_id} complete")
+
+    def close(self):
+        """Close without committing; anything staged since the last commit() is redone on resume."""
+        with self._lock:
+            self._conn.rollback()
+            self._conn.close()
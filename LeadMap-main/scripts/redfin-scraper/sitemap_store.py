@@ -0,0 +1,100 @@
+"""
+Persistent sitemap crawl state for incremental FSBO runs.
+
+- Keeps ETag / Last-Modified validators per sitemap so unchanged sitemaps come back as 304
+- Keeps the child list of each sitemapindex so a 304 on the index still reaches its children
+- Keeps the <lastmod> last seen for every listing URL so only new or changed listings are returned
+- All changes are staged in one SQLite transaction and only land when the run calls commit()
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class SitemapStateStore:
+    """SQLite-backed store of sitemap validators and per-listing lastmod values."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Sitemaps are parsed on worker threads; every access goes through self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sitemaps ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, children TEXT, fetched_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS listings ("
+            " url TEXT PRIMARY KEY, lastmod TEXT, seen_at REAL)"
+        )
+        self._conn.commit()
+
+    def conditional_headers(self, sitemap_url: str) -> Dict[str, str]:
+        """Return If-None-Match / If-Modified-Since headers for a sitemap fetched on a previous run."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM sitemaps WHERE url = ?", (sitemap_url,)
+            ).fetchone()
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def sitemap_children(self, sitemap_url: str) -> List[str]:
+        """Return the child sitemaps recorded for a sitemapindex (empty for a urlset)."""
+        with self._lock:
+            row = self._conn.execute("SELECT children FROM sitemaps WHERE url = ?", (sitemap_url,)).fetchone()
+        if not row or not row[0]:
+            return []
+        return json.loads(row[0])
+
+    def record_sitemap(self, sitemap_url: str, etag: Optional[str], last_modified: Optional[str],
+                       children: Optional[List[str]] = None):
+        """Stage the validators of a fully parsed sitemap."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sitemaps (url, etag, last_modified, children, fetched_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified,"
+                " children = excluded.children, fetched_at = excluded.fetched_at",
+                (sitemap_url, etag, last_modified, json.dumps(children) if children else None, time.time()),
+            )
+
+    def listing_changed(self, url: str, lastmod: Optional[str]) -> bool:
+        """
+        Return True if a listing URL is new or its <lastmod> differs from the last run, staging the new value.
+        A known URL without a <lastmod> is treated as unchanged.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT lastmod FROM listings WHERE url = ?", (url,)).fetchone()
+            if row is not None and (not lastmod or row[0] == lastmod):
+                return False
+            self._conn.execute(
+                "INSERT INTO listings (url, lastmod, seen_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET lastmod = excluded.lastmod, seen_at = excluded.seen_at",
+                (url, lastmod, time.time()),
+            )
+            return True
+
+    def commit(self):
+        """Persist everything staged during this run."""
+        with self._lock:
+            self._conn.commit()
+        logging.info(f"Committed sitemap state to {self.path}")
+
+    def rollback(self):
+        """Discard everything staged during this run so the next run sees these sitemaps as changed."""
+        with self._lock:
+            self._conn.rollback()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,6 @@
 from supabase import create_client, Client
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import logging
 from datetime import datetime
 import json
@@ -267,4 +267,41 @@ def save_lead_to_supabase(lead_data: Dict[str, Any]) -> bool:
         import traceback
         logger.error(f"A critical exception occurred in save_lead_to_supabase for {lead_data.get('property_url')}: {e}")
         logger.error(traceback.format_exc())
-        return False
\ No newline at end of file
+        return False
+
+
+def touch_listings(property_urls: List[str]) -> int:
+    """
+    Bump last_scraped_at on listings that were re-scraped without any change, instead of upserting the
+    whole row again. Returns the number of URLs sent.
+    """
+    if not supabase:
+        logger.error("Supabase client is not initialized. Cannot touch listings.")
+        return 0
+    if not property_urls:
+        return 0
+
+    try:
+        supabase.table('listings').update(
+            {'last_scraped_at': datetime.utcnow().isoformat()}
+        ).in_('property_url', property_urls).execute()
+        return len(property_urls)
+    except Exception as e:
+        logger.error(f"Failed to touch {len(property_urls)} unchanged listings in Supabase: {e}")
+        return 0
+
+
+def save_listing_history(rows: List[Dict[str, Any]]) -> bool:
+    """Insert one batch of listing field transitions (see listing_history.py) into 'listing_history'."""
+    if not supabase:
+        logger.error("Supabase client is not initialized. Cannot save listing history.")
+        return False
+    if not rows:
+        return True
+
+    try:
+        supabase.table('listing_history').insert(rows).execute()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save {len(rows)} listing history rows to Supabase: {e}")
+        return False
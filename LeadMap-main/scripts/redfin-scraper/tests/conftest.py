@@ -0,0 +1,12 @@
+"""
+Shared setup for the scraper tests.
+
+- Puts the scraper directory on sys.path so the modules import the way the scripts run them
+- Configures logging before FSBO is imported, so its basicConfig(filename=LOG_PATH) is a no-op here
+"""
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+logging.basicConfig(level=logging.INFO)
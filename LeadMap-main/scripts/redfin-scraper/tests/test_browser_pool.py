@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from browser_pool import BLANK_URL, BrowserContextPool
+
+
+class Frame:
+    def __init__(self):
+        self.url = BLANK_URL
+
+
+class Page:
+    def __init__(self):
+        self.main_frame = Frame()
+        self.handlers = []
+        self.visited = []
+
+    def on(self, event, handler):
+        assert event == "framenavigated"
+        self.handlers.append(handler)
+
+    async def goto(self, url, wait_until=None):
+        self.visited.append(url)
+        self.main_frame.url = url
+        for handler in self.handlers:
+            handler(self.main_frame)
+
+
+class Context:
+    def __init__(self, options):
+        self.options = options
+        self.cookies = ["session"]
+        self.closed = False
+        self.pages = []
+
+    async def new_page(self):
+        page = Page()
+        self.pages.append(page)
+        return page
+
+    async def clear_cookies(self):
+        self.cookies = []
+
+    async def close(self):
+        self.closed = True
+
+
+class Browser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self, **options):
+        context = Context(options)
+        self.contexts.append(context)
+        return context
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_slots_are_reused_and_reset_between_leads():
+    async def scenario():
+        browser = Browser()
+        pool = await BrowserContextPool(browser, 2, {"locale": "en-US"}).start()
+        assert len(browser.contexts) == 2 and browser.contexts[0].options == {"locale": "en-US"}
+        slot = await pool.acquire()
+        await slot.page.goto("https://example.com/lead")
+        await pool.release(slot)
+        assert slot.page.main_frame.url == BLANK_URL
+        assert slot.context.cookies == []
+        assert slot.navigations == 1
+        await pool.acquire()
+        assert await pool.acquire() is slot
+        assert len(browser.contexts) == 2 and pool.recycled == 0
+        await pool.close()
+
+    run(scenario())
+
+
+def test_slot_is_recycled_after_max_navigations():
+    async def scenario():
+        browser = Browser()
+        pool = await BrowserContextPool(browser, 1, max_navigations=2).start()
+        slot = await pool.acquire()
+        await slot.page.goto("https://example.com/1")
+        await pool.release(slot)
+        assert await pool.acquire() is slot
+        await slot.page.goto("https://example.com/2")
+        await pool.release(slot)
+        fresh = await pool.acquire()
+        assert fresh is not slot and slot.context.closed
+        assert fresh.navigations == 0 and pool.recycled == 1 and pool.contexts_created == 2
+        await pool.close()
+
+    run(scenario())
+
+
+def test_broken_slot_is_replaced():
+    async def scenario():
+        pool = await BrowserContextPool(Browser(), 1).start()
+        slot = await pool.acquire()
+        slot.broken = True
+        await pool.release(slot)
+        assert await pool.acquire() is not slot and pool.recycled == 1
+        await pool.close()
+
+    run(scenario())
+
+
+@pytest.mark.parametrize("clear_cookies", [True, False])
+def test_cookie_clearing_is_optional(clear_cookies):
+    async def scenario():
+        pool = await BrowserContextPool(Browser(), 1, clear_cookies=clear_cookies).start()
+        slot = await pool.acquire()
+        await pool.release(slot)
+        assert slot.context.cookies == ([] if clear_cookies else ["session"])
+        await pool.close()
+
+    run(scenario())
+
+
+def test_warm_up_does_not_count_as_a_navigation():
+    async def scenario():
+        setups = []
+
+        async def setup(context):
+            setups.append(context)
+
+        browser = Browser()
+        pool = await BrowserContextPool(browser, 2, warm_url="https://example.com/", setup=setup).start(prefill=False)
+        assert browser.contexts == []
+        slot = await pool.acquire()
+        assert setups == browser.contexts == [slot.context]
+        assert slot.page.visited == ["https://example.com/", BLANK_URL]
+        assert slot.navigations == 0
+        await pool.close()
+
+    run(scenario())
+
+
+def test_on_demand_pool_never_exceeds_its_size():
+    async def scenario():
+        browser = Browser()
+        pool = await BrowserContextPool(browser, 2).start(prefill=False)
+        first, second = await pool.acquire(), await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done() and len(browser.contexts) == 2
+        await pool.release(first)
+        assert await waiter is first
+        await pool.release(second)
+        await pool.close()
+
+    run(scenario())
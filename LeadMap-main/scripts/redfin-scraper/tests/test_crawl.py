@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import FSBO
+from crawl_control import FetchResult
+from response_cache import ResponseCache
+
+PAGE = b"<html><body><div data-rf-test-id='abp-beds'>3 Beds</div></body></html>"
+URLS = [f"https://www.redfin.com/FL/Miami/{i}-Main-St-33101/home/{i}" for i in range(5)]
+
+
+class FakeFetcher:
+    """AsyncFetcher stand-in that serves PAGE for every URL and records the threads cache work ran on."""
+
+    def __init__(self, **kwargs):
+        self.fetched = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def fetch(self, url, headers=None):
+        self.fetched.append(url)
+        return FetchResult(url, 200, PAGE, {}, 0.01, None)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"), ttl=0)
+    yield cache
+    cache.close()
+
+
+def run_async_crawl(urls, cache=None, archive=None):
+    results = {}
+    with ThreadPoolExecutor(max_workers=2) as parser:
+        dead = asyncio.run(FSBO.crawl_listings_async(urls, [], parser, results.__setitem__, archive, cache))
+    return results, dead
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(FSBO, "FETCH_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(FSBO, "FETCH_RETRY_MAX_DELAY", 0.02)
+
+
+def failing_revalidation(monkeypatch, failures):
+    """Make revalidate_listing raise for a URL as many times as `failures` lists it."""
+    original = FSBO.revalidate_listing
+    failures = list(failures)
+
+    def revalidate(cache, url, result, entry):
+        if url in failures:
+            failures.remove(url)
+            raise OSError("database is locked")
+        return original(cache, url, result, entry)
+
+    monkeypatch.setattr(FSBO, "revalidate_listing", revalidate)
+
+
+def test_async_crawl_retries_and_dead_letters_a_failing_listing(monkeypatch, cache, fast_retries):
+    monkeypatch.setattr(FSBO, "AsyncFetcher", FakeFetcher)
+    failing_revalidation(monkeypatch, [URLS[1]] + [URLS[2]] * FSBO.MAX_FETCH_ATTEMPTS)
+    results, dead = run_async_crawl(URLS, cache)
+    assert sorted(results) == sorted(URLS)
+    assert results[URLS[2]] is None and [letter["url"] for letter in dead] == [URLS[2]]
+    assert "database is locked" in dead[0]["error"]
+    assert all(results[url]["beds"] == "3 Beds" for url in URLS if url != URLS[2])
+
+
+def test_threaded_crawl_retries_and_dead_letters_a_failing_listing(monkeypatch, cache, fast_retries):
+    failing_revalidation(monkeypatch, [URLS[1]] + [URLS[2]] * FSBO.MAX_FETCH_ATTEMPTS)
+    results = {}
+    with ThreadPoolExecutor(max_workers=2) as parser:
+        dead = FSBO.crawl_listings_threaded(URLS, SlowSession(0), parser, results.__setitem__, cache=cache)
+    assert sorted(results) == sorted(URLS)
+    assert results[URLS[2]] is None and [letter["url"] for letter in dead] == [URLS[2]]
+    assert results[URLS[1]]["beds"] == "3 Beds"
+
+
+def test_async_crawl_keeps_cache_work_off_the_loop(monkeypatch, cache):
+    monkeypatch.setattr(FSBO, "AsyncFetcher", FakeFetcher)
+    threads = set()
+    lookup = cache.lookup
+
+    def tracking_lookup(url):
+        threads.add(threading.get_ident())
+        return lookup(url)
+
+    monkeypatch.setattr(cache, "lookup", tracking_lookup)
+    results, _ = run_async_crawl(URLS[:2], cache)
+    assert len(results) == 2
+    assert threads and threading.get_ident() not in threads
+
+
+def test_parse_job_round_trips_through_a_process_pool():
+    FSBO.EXTRACTION_ENGINE.drain_stats()
+    with ProcessPoolExecutor(max_workers=1) as parser:
+        job = parser.submit(FSBO.parse_listing_job, URLS[0], PAGE, "2025-01-01").result()
+    # Nothing was extracted in this process; the worker's timings come back with the record
+    assert FSBO.EXTRACTION_ENGINE.drain_stats() == {}
+    data = FSBO.collect_parsed(job)
+    assert data["beds"] == "3 Beds" and data["scrape_date"] == "2025-01-01"
+    assert "beds" in FSBO.EXTRACTION_ENGINE.drain_stats()
+
+
+class SlowSession:
+    """requests.Session stand-in that tracks how many fetches are open at once."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.open = self.most_open = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.open += 1
+            self.most_open = max(self.most_open, self.open)
+        time.sleep(self.delay)
+        with self._lock:
+            self.open -= 1
+        return type("Response", (), {"status_code": 200, "content": PAGE, "headers": {}})()
+
+
+class CountingParser:
+    """Executor wrapper that tracks how many pages are submitted but not yet parsed."""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.queued = self.most_queued = 0
+        self._lock = threading.Lock()
+
+    def submit(self, *args):
+        with self._lock:
+            self.queued += 1
+            self.most_queued = max(self.most_queued, self.queued)
+        future = self.executor.submit(*args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self.queued -= 1
+
+
+def test_threaded_crawl_bounds_fetches_and_parses_in_flight(monkeypatch):
+    monkeypatch.setattr(FSBO, "SCRAPE_WORKERS", 2)
+    monkeypatch.setattr(FSBO, "MAX_SCRAPE_WORKERS", 2)
+    monkeypatch.setattr(FSBO, "PARSE_QUEUE_SIZE", 1)
+    urls = [f"https://www.redfin.com/FL/Miami/{i}-Main-St-33101/home/{i}" for i in range(12)]
+    pulled = []
+
+    def due_urls():
+        for url in urls:
+            pulled.append(url)
+            yield url
+
+    results, pulled_at_first_result = {}, []
+
+    def on_result(url, data):
+        if not results:
+            pulled_at_first_result.append(len(pulled))
+        results[url] = data
+
+    session = SlowSession()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        parser = CountingParser(executor)
+        FSBO.crawl_listings_threaded(due_urls(), session, parser, on_result)
+    assert sorted(results) == sorted(urls) and all(data["beds"] == "3 Beds" for data in results.values())
+    assert session.most_open <= 2
+    assert parser.most_queued == 1
+    # URLs are pulled as the window frees up, not all up front
+    assert pulled_at_first_result[0] <= 4
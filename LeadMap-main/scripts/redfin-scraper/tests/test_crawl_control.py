@@ -0,0 +1,77 @@
+import pytest
+
+import crawl_control
+from crawl_control import DEAD, FAILED, OK, REQUEUED, AimdController, CrawlScheduler
+
+
+def test_aimd_grows_once_per_window_and_halves_on_congestion():
+    controller = AimdController(initial=4, maximum=8, latency_target=1.0, cooldown=0)
+    for _ in range(3):
+        controller.on_success(0.1)
+    assert controller.window == 4
+    for _ in range(2):
+        controller.on_success(0.1)
+    assert controller.window == 5
+    controller.on_success(2.0)
+    assert controller.window == 2
+    for _ in range(100):
+        controller.on_success(0.1)
+    assert controller.window == 8
+
+
+def test_aimd_cooldown_and_floor():
+    controller = AimdController(initial=16, minimum=3, cooldown=60)
+    controller.on_congestion("429")
+    controller.on_congestion("429")
+    assert controller.window == 8 and controller.decreases == 1
+    controller = AimdController(initial=4, minimum=3, cooldown=0)
+    controller.on_congestion("429")
+    controller.on_congestion("429")
+    assert controller.window == 3
+
+
+def test_throttle_and_retry_classification():
+    assert crawl_control.is_throttled(429) and crawl_control.is_throttled(503)
+    assert not crawl_control.is_throttled(404)
+    assert crawl_control.is_throttled(None, TimeoutError())
+    assert crawl_control.is_retryable(None, ConnectionError())
+    assert not crawl_control.is_retryable(404)
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(crawl_control.random, "uniform", lambda low, high: high)
+
+
+def test_scheduler_requeues_then_dead_letters(no_jitter):
+    scheduler = CrawlScheduler(["a", "b"], AimdController(initial=2, cooldown=0), base_delay=0, max_attempts=3)
+    assert scheduler.next_url() == "a"
+    assert scheduler.observe("a", 503, 0.1) == REQUEUED
+    assert scheduler.next_url() == "a"
+    assert scheduler.observe("a", None, 0.1, ConnectionError("reset")) == REQUEUED
+    assert scheduler.next_url() == "a"
+    assert scheduler.observe("a", 429, 0.1) == DEAD
+    assert [(d["url"], d["attempts"], d["status"]) for d in scheduler.dead_letters] == [("a", 3, 429)]
+    assert scheduler.next_url() == "b"
+    assert scheduler.observe("b", 404, 0.1) == FAILED
+    assert scheduler.next_url() is None
+    assert scheduler.finished(in_flight=0)
+
+
+def test_scheduler_success_resets_attempts(no_jitter):
+    scheduler = CrawlScheduler(["a"], AimdController(cooldown=0), base_delay=0, max_attempts=2)
+    scheduler.next_url()
+    assert scheduler.observe("a", 500, 0.1) == REQUEUED
+    assert scheduler.next_url() == "a"
+    assert scheduler.observe("a", 200, 0.1) == OK
+    assert scheduler.observe("a", 500, 0.1) == REQUEUED
+
+
+def test_retries_wait_for_their_backoff(no_jitter):
+    scheduler = CrawlScheduler(["a"], AimdController(), base_delay=30, max_delay=45)
+    assert scheduler.backoff(1) == 30 and scheduler.backoff(3) == 45
+    scheduler.next_url()
+    scheduler.observe("a", 503, 0.1)
+    assert scheduler.next_url() is None
+    assert not scheduler.finished(in_flight=0)
+    assert 29 < scheduler.wait_timeout() <= 30
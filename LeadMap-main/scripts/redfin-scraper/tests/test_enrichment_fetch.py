@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("supabase")
+import Enrichment  # noqa: E402
+from crawl_control import FetchResult  # noqa: E402
+from page_readiness import WaitTimer  # noqa: E402
+
+SEARCH_URL = "https://www.truepeoplesearch.com/resultaddress?streetaddress=1+Main+St&citystatezip=Miami%2C+FL"
+RESULT_PAGE = ('<html><body><div class="card card-body shadow-form"><div><div>Estimated Value <b>$300,000</b>'
+               "</div></div></div>" + "x" * 500 + "</body></html>")
+
+
+class Response:
+    def __init__(self, url, status=200):
+        self.url = url
+        self.status = status
+
+
+class Page:
+    """Playwright page stand-in: navigations succeed at once and the result card is already in the DOM."""
+
+    def __init__(self, html=RESULT_PAGE):
+        self.html = html
+        self.navigations = []
+
+    async def goto(self, url, timeout=None, wait_until=None):
+        self.navigations.append((url, wait_until))
+        return Response(url)
+
+    async def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        return True
+
+    async def wait_for_load_state(self, state, timeout=None):
+        await asyncio.sleep(1)
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def content(self):
+        return self.html
+
+
+def test_browser_navigation_leaves_the_wait_to_the_readiness_check(monkeypatch):
+    monkeypatch.setattr(Enrichment, "USE_AWS_ROTATION", False)
+    page, timer = Page(), WaitTimer()
+    html = asyncio.run(Enrichment.load_in_browser(page, SEARCH_URL, "p1", timer))
+    assert html == RESULT_PAGE
+    assert page.navigations == [(SEARCH_URL, "domcontentloaded")]
+    assert timer.outcomes == {"content": 1}
+
+
+class Fetcher:
+    """AsyncFetcher stand-in returning one canned result."""
+
+    def __init__(self, status=200, body=RESULT_PAGE, error=None):
+        self.result = FetchResult(SEARCH_URL, status, body.encode(), {}, 0.01, error)
+        self.fetched = []
+
+    async def fetch(self, url, headers=None):
+        self.fetched.append(url)
+        return self.result._replace(url=url)
+
+
+@pytest.mark.parametrize("fetcher", [
+    Fetcher(body="<html><head><title>Just a moment...</title></head><body>Checking your browser</body></html>"),
+    Fetcher(body=""),
+    Fetcher(status=403),
+    Fetcher(status=None, body="", error=TimeoutError("deadline")),
+], ids=["challenge", "empty", "forbidden", "timeout"])
+def test_static_fetch_defers_to_the_browser(fetcher):
+    assert asyncio.run(Enrichment.fetch_static_page(fetcher, SEARCH_URL)) is None
+
+
+def test_static_fetch_accepts_a_result_page():
+    assert asyncio.run(Enrichment.fetch_static_page(Fetcher(), SEARCH_URL)) == RESULT_PAGE
+
+
+class Slot:
+    def __init__(self):
+        self.page = Page()
+        self.broken = False
+
+
+class Pool:
+    def __init__(self):
+        self.acquired = []
+        self.released = []
+
+    async def acquire(self):
+        slot = Slot()
+        self.acquired.append(slot)
+        return slot
+
+    async def release(self, slot):
+        self.released.append(slot)
+
+
+LEAD = {"property_url": "p1", "address": "1 Main St", "city": "Miami", "state": "FL", "zip_code": "33101"}
+
+
+def enrich(fetcher):
+    pool, stats = Pool(), Enrichment.new_enrichment_stats()
+    asyncio.run(Enrichment.enrich_lead_task(dict(LEAD), pool, asyncio.Semaphore(1), stats, fetcher=fetcher))
+    return pool, stats
+
+
+def test_lead_uses_the_static_page_without_a_browser():
+    fetcher = Fetcher()
+    pool, stats = enrich(fetcher)
+    assert len(fetcher.fetched) == 1 and pool.acquired == []
+    assert (stats["via_http"], stats["via_browser"]) == (1, 0)
+
+
+def test_blocked_static_page_falls_back_to_the_browser(monkeypatch):
+    monkeypatch.setattr(Enrichment, "USE_AWS_ROTATION", False)
+    fetcher = Fetcher(body="<html><body>Access denied</body></html>")
+    pool, stats = enrich(fetcher)
+    assert len(fetcher.fetched) == 1
+    assert len(pool.acquired) == 1 and pool.released == pool.acquired
+    assert pool.acquired[0].page.navigations == [(fetcher.fetched[0], "domcontentloaded")]
+    assert (stats["via_http"], stats["via_browser"]) == (0, 1)
@@ -0,0 +1,37 @@
+import csv
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("supabase")
+import Enrichment  # noqa: E402
+from page_archive import PageArchive  # noqa: E402
+
+PAGE = ('<html><body><div class="card card-body shadow-form"><div><div>Estimated Value <b>$300,000</b>'
+        "</div></div></div></body></html>").encode()
+
+
+def test_reextraction_covers_every_archived_lead(tmp_path, monkeypatch):
+    archive = PageArchive(str(tmp_path / "archive"))
+    for i in range(40):
+        lead = {"property_url": f"p{i}", "address": f"{i} Main St", "city": "Miami", "state": "FL"}
+        archive.put(f"https://www.truepeoplesearch.com/{i}", PAGE, meta={"lead": lead})
+    archive.put("https://www.truepeoplesearch.com/no-lead", PAGE)
+    archive.close()
+    output = tmp_path / "reenriched.csv"
+    monkeypatch.setattr(Enrichment, "PAGE_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(Enrichment, "REEXTRACTED_CSV_PATH", str(output))
+    monkeypatch.setattr(Enrichment, "REEXTRACT_CHUNKSIZE", 4)
+    totals = []
+
+    def progress(iterable, total=None, desc=None):
+        totals.append(total)
+        return iterable
+
+    monkeypatch.setattr(Enrichment, "tqdm", progress)
+    Enrichment.reextract_enrichment()
+    with open(output, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    assert totals == [40]
+    assert sorted(row["property_url"] for row in rows) == sorted(f"p{i}" for i in range(40))
+    assert all(row["estimated_value"] for row in rows)
@@ -0,0 +1,111 @@
+"""
+Extraction engine behaviour, and parity with the BeautifulSoup cascades it replaced.
+
+fixtures/baseline_fields.json holds the non-empty fields the old cascade produced for each fixture page
+(scrape_date left out). The engine must produce the same fields, apart from INTENDED_DIFFERENCES, which
+mirror the list above FSBO.FIELD_RULES.
+"""
+import json
+import os
+
+import pytest
+
+import FSBO
+from extraction import Css, ExtractionEngine, Field, Json, Ref, Regex, Source, XPath, deep_get
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# fixture -> {field: value the engine produces instead of the baseline's}
+INTENDED_DIFFERENCES = {
+    # The old cascade never extracted status
+    "listing_fl.html": {"status": "Active"},
+    # h1.streetAddress is empty; the old cascade stopped there, the engine falls through to the JSON street
+    "listing_tx.html": {"street": "9 Elm Rd", "status": "Pending"},
+}
+
+
+class Page:
+    def __init__(self, html, url="https://www.redfin.com/FL/Miami/1-Main-St-33101/home/1", state=None):
+        self.url = url
+        self.text = html
+        self.tree = FSBO.lxml_html.fromstring(html)
+        self.state = state or {}
+
+    def json(self, blob):
+        return self.state
+
+
+def load_baseline():
+    with open(os.path.join(FIXTURES, "baseline_fields.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("fixture", sorted(load_baseline()))
+def test_engine_matches_baseline_fields(fixture):
+    expected = load_baseline()[fixture]
+    with open(os.path.join(FIXTURES, fixture), "rb") as f:
+        content = f.read()
+    data = FSBO.parse_redfin_listing(expected["url"], content, scrape_date="2025-01-01")
+    produced = {k: v for k, v in data.items() if v not in ("", None) and k != "scrape_date"}
+    assert produced == {**expected["fields"], **INTENDED_DIFFERENCES.get(fixture, {})}
+
+
+def test_first_accepted_source_wins():
+    page = Page('<div class="a"> </div><div class="b">B</div><div class="c">C</div>')
+    field = Field("x", Css("div.a"), Css("div.b"), Css("div.c"))
+    assert field.extract(page, {}) == "B"
+
+
+def test_every_normalize_and_accept():
+    page = Page("<h1>Welcome</h1><h1>Unit 5</h1><h1>12 Oak</h1>")
+    digits = Field("x", Css("h1", every=True, transform=FSBO.text_with_digit))
+    assert digits.extract(page, {}) == "Unit 5"
+    upper = Field("x", Css("h1", every=True), normalize=str.upper, accept=lambda v: v.startswith("12"))
+    assert upper.extract(page, {}) == "12 OAK"
+
+
+def test_attr_collect_xpath_regex_json_and_ref():
+    page = Page('<img class="p" data-src="1.jpg"><img class="p" src="2.jpg"><p id="n"> 42 </p>',
+                state={"a": {"b": "deep"}})
+    data = {}
+    engine = ExtractionEngine([
+        Field("photos", Css("img.p", attr=("data-src", "src"), collect=True)),
+        Field("first", Ref("photos", 0)),
+        Field("n", XPath('//p[@id="n"]')),
+        Field("state", Regex(r"redfin\.com/([A-Z]{2})/", target="url")),
+        Field("deep", Json(["missing"], ["a", "b"])),
+    ])
+    engine.extract(page, data)
+    assert data == {"photos": ["1.jpg", "2.jpg"], "first": "1.jpg", "n": "42", "state": "FL", "deep": "deep"}
+
+
+def test_missing_required_fields_are_reported_and_timed():
+    missing = []
+    engine = ExtractionEngine([Field("x", Css("span.none"), required=True), Field("y", Css("span.none"))],
+                              on_missing=lambda field, url: missing.append(field))
+    data = engine.extract(Page("<p>nothing</p>"))
+    assert data == {} and missing == ["x"]
+    drained = engine.drain_stats()
+    assert drained["x"][:2] == [1, 0]
+    assert engine.drain_stats() == {}
+    engine.merge_stats(drained)
+    assert [row[:3] for row in engine.stats() if row[0] == "x"] == [("x", 1, 0)]
+
+
+def test_failing_source_falls_through():
+    def boom(value):
+        raise ValueError("bad")
+    field = Field("x", Css("p", transform=boom), Css("p"))
+    assert field.extract(Page("<p>ok</p>"), {}) == "ok"
+
+
+def test_source_is_abstract():
+    with pytest.raises(TypeError):
+        Source()
+
+
+def test_deep_get():
+    assert deep_get({"a": {"b": {"c": 1}}}, ["a", "b", "c"]) == 1
+    assert deep_get({"a": {"b": 1}}, ["a", "b", "c"]) is None
+    assert deep_get({"a": 1}, []) == {"a": 1}
+    assert deep_get(None, ["a"]) is None
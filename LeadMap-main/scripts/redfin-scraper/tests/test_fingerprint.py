@@ -0,0 +1,39 @@
+import FSBO
+
+
+class ListWriter:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, record):
+        self.rows.append(dict(record))
+
+
+class FailingWriter:
+    def write(self, record):
+        raise OSError("disk full")
+
+
+def record(**fields):
+    data = {field: None for field in FSBO.FIELDS}
+    data.update(property_url="https://www.redfin.com/FL/Miami/x/home/1", street="1 Main St", list_price="500000",
+                scrape_date="2026-01-01")
+    data.update(fields)
+    return data
+
+
+def test_fingerprint_ignores_volatile_fields():
+    assert FSBO.record_fingerprint(record()) == FSBO.record_fingerprint(record(scrape_date="2026-02-01"))
+    assert FSBO.record_fingerprint(record()) != FSBO.record_fingerprint(record(list_price="450000"))
+
+
+def test_save_record_reports_success():
+    writer = ListWriter()
+    assert FSBO.save_record(record(), [writer]) is True
+    assert writer.rows[0]["street"] == "1 Main St"
+
+
+def test_save_record_fails_if_any_writer_rejects_the_row():
+    writer = ListWriter()
+    assert FSBO.save_record(record(), [writer, FailingWriter()]) is False
+    assert len(writer.rows) == 1
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from frontier import HOUR, UrlFrontier
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    frontier = UrlFrontier(str(tmp_path / "frontier.db"), recrawl_interval_hours=24, retry_interval_hours=1,
+                           max_retry_interval_hours=4, commit_every=1)
+    yield frontier
+    frontier.close()
+
+
+def test_added_urls_are_due_in_order(frontier):
+    frontier.add(["https://x/FL/b", "https://x/FL/a"])
+    now = time.time() + 1
+    assert frontier.count_due(now) == 2
+    assert list(frontier.iter_due(now, batch_size=1)) == ["https://x/FL/a", "https://x/FL/b"]
+
+
+def test_success_rests_for_recrawl_interval(frontier):
+    frontier.add(["u"])
+    frontier.record("u", "ok", success=True)
+    now = time.time()
+    assert frontier.count_due(now) == 0
+    assert frontier.count_due(now + 23 * HOUR) == 0
+    assert frontier.count_due(now + 25 * HOUR) == 1
+
+
+def test_failures_back_off_exponentially_up_to_cap(frontier):
+    frontier.add(["u"])
+    for failures, hours in [(1, 1), (2, 2), (3, 4), (4, 4)]:
+        frontier.record("u", "failed", success=False)
+        now = time.time()
+        assert frontier.count_due(now + hours * HOUR - 60) == 0, failures
+        assert frontier.count_due(now + hours * HOUR + 60) == 1, failures
+    frontier.record("u", "ok", success=True)
+    frontier.record("u", "failed", success=False)
+    assert frontier.count_due(time.time() + HOUR + 60) == 1
+
+
+def test_rediscovery_makes_url_due_again(frontier):
+    frontier.add(["u"])
+    frontier.record("u", "ok", success=True)
+    frontier.add(["u"])
+    assert frontier.count_due(time.time() + 1) == 1
+
+
+def test_due_cutoff_is_fixed_when_iteration_starts(frontier):
+    frontier.add([f"u{i}" for i in range(5)])
+    now = time.time() + 1
+    seen = []
+    for url in frontier.iter_due(now, batch_size=2):
+        seen.append(url)
+        frontier.record(url, "failed", success=False)
+    assert seen == [f"u{i}" for i in range(5)]
+
+
+def test_state_survives_reopen(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    frontier = UrlFrontier(path)
+    frontier.add(["u"])
+    frontier.record("u", "ok", success=True, fingerprint="abc")
+    frontier.close()
+    reopened = UrlFrontier(path)
+    assert reopened.fingerprint("u")[0] == "abc"
+    assert reopened.count_due() == 0
+    reopened.close()
@@ -0,0 +1,175 @@
+import itertools
+
+import pytest
+
+import FSBO
+from gateway_registry import STAGE_NAME, GatewayRegistry, api_name_for
+
+SITE = "https://www.redfin.com"
+REGIONS = ["us-east-1", "us-west-2"]
+
+
+class AwsError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeAws:
+    """In-memory API Gateway control plane: {(region, api_id): {"name", "stages"}}."""
+
+    def __init__(self, disabled=()):
+        self.apis = {}
+        self.created = []
+        self.disabled = set(disabled)
+        self._ids = itertools.count()
+
+    def client(self, region):
+        if region in self.disabled:
+            return DisabledClient()
+        return FakeClient(self, region)
+
+
+class DisabledClient:
+    def __getattr__(self, name):
+        def call(**kwargs):
+            raise AwsError("UnrecognizedClientException")
+        return call
+
+
+class FakeClient:
+    def __init__(self, aws, region):
+        self.aws = aws
+        self.region = region
+
+    def _api(self, api_id):
+        try:
+            return self.aws.apis[(self.region, api_id)]
+        except KeyError:
+            raise AwsError("NotFoundException")
+
+    def get_rest_api(self, restApiId):
+        return self._api(restApiId)
+
+    def get_stage(self, restApiId, stageName):
+        if stageName not in self._api(restApiId)["stages"]:
+            raise AwsError("NotFoundException")
+
+    def get_rest_apis(self, limit, position=None):
+        return {"items": [{"id": api_id, "name": api["name"]}
+                          for (region, api_id), api in self.aws.apis.items() if region == self.region]}
+
+    def create_rest_api(self, name, endpointConfiguration):
+        api_id = f"api{next(self.aws._ids)}"
+        self.aws.apis[(self.region, api_id)] = {"name": name, "stages": set()}
+        self.aws.created.append((self.region, api_id))
+        return {"id": api_id}
+
+    def get_resources(self, restApiId):
+        return {"items": [{"id": "root"}]}
+
+    def create_resource(self, **kwargs):
+        return {"id": "proxy"}
+
+    def put_method(self, **kwargs):
+        pass
+
+    def put_integration(self, **kwargs):
+        pass
+
+    def create_deployment(self, restApiId, stageName):
+        self._api(restApiId)["stages"].add(stageName)
+
+    def delete_rest_api(self, restApiId):
+        self._api(restApiId)
+        del self.aws.apis[(self.region, restApiId)]
+
+
+@pytest.fixture
+def aws():
+    return FakeAws()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "gateways.db")
+
+
+def open_registry(db, aws, regions=REGIONS):
+    return GatewayRegistry(db, SITE, regions, client_factory=aws.client)
+
+
+def test_live_gateways_are_reused_across_runs(db, aws):
+    registry = open_registry(db, aws)
+    first = registry.ensure()
+    registry.close()
+    assert len(first) == 2 and len(aws.created) == 2
+    assert all(api["stages"] == {STAGE_NAME} for api in aws.apis.values())
+
+    registry = open_registry(db, aws)
+    assert registry.ensure() == first
+    assert len(aws.created) == 2
+    registry.close()
+
+
+def test_stale_entries_are_replaced_or_pruned(db, aws):
+    registry = open_registry(db, aws)
+    registry.ensure()
+    gone = registry.registered()["us-west-2"]
+    del aws.apis[("us-west-2", gone)]
+
+    endpoints = registry.ensure()
+    assert len(aws.created) == 3
+    assert registry.registered()["us-west-2"] != gone
+    assert len(endpoints) == 2
+    registry.close()
+
+    aws.disabled.add("us-west-2")
+    registry = open_registry(db, aws)
+    assert [e.split(".")[2] for e in registry.ensure()] == ["us-east-1"]
+    assert set(registry.registered()) == {"us-east-1"}
+    registry.close()
+
+
+def test_lost_registry_adopts_existing_apis(db, aws, tmp_path):
+    registry = open_registry(db, aws)
+    endpoints = registry.ensure()
+    registry.close()
+
+    # A crash that lost the registry file: the APIs in AWS are found by name instead of created again
+    registry = open_registry(str(tmp_path / "fresh.db"), aws)
+    assert registry.ensure() == endpoints
+    assert len(aws.created) == 2
+    registry.close()
+
+
+def test_half_created_api_is_not_adopted(db, aws):
+    client = aws.client("us-east-1")
+    broken = client.create_rest_api(name=api_name_for(SITE), endpointConfiguration={})["id"]
+    registry = open_registry(db, aws, ["us-east-1"])
+    registry.ensure()
+    assert registry.registered()["us-east-1"] != broken
+    registry.close()
+
+
+def test_teardown_deletes_every_api_for_the_site(db, aws):
+    other = aws.client("us-east-1").create_rest_api(name="something else", endpointConfiguration={})["id"]
+    registry = open_registry(db, aws)
+    registry.ensure()
+    leftover = aws.client("us-west-2").create_rest_api(name=api_name_for(SITE), endpointConfiguration={})["id"]
+
+    deleted = registry.teardown()
+    assert len(deleted) == 3 and leftover in deleted
+    assert list(aws.apis) == [("us-east-1", other)]
+    assert registry.registered() == {} and registry.endpoints() == []
+    registry.close()
+
+
+def test_fsbo_teardown_gateways(db, aws, monkeypatch, capsys):
+    monkeypatch.setattr(FSBO, "open_gateway_registry", lambda: open_registry(db, aws))
+    registry = open_registry(db, aws)
+    registry.ensure()
+    registry.close()
+    FSBO.teardown_gateways()
+    assert aws.apis == {}
+    assert "Deleted 2 API Gateway endpoints" in capsys.readouterr().out
@@ -0,0 +1,92 @@
+import datetime
+
+from listing_history import ListingHistory, price_drops, read_history
+
+URL = "https://www.redfin.com/FL/Miami/1-Main-St-33101/home/1"
+
+
+def observed(day):
+    return datetime.datetime(2026, 3, day, 12).timestamp()
+
+
+def listing(price, status="Active", url=URL):
+    return {"property_url": url, "state": "FL", "list_price": price, "status": status}
+
+
+def test_only_transitions_are_recorded(tmp_path):
+    history = ListingHistory(str(tmp_path))
+    assert len(history.observe(listing("500000"), observed(1))) == 2
+    assert history.observe(listing("500000"), observed(2)) == []
+    # A field missing from one scrape is not a transition
+    assert history.observe(listing("", status=None), observed(3)) == []
+    rows = history.observe(listing("450000", "Pending"), observed(4))
+    assert [(row["field"], row["old_value"], row["new_value"]) for row in rows] == [
+        ("list_price", "500000", "450000"), ("status", "Active", "Pending")]
+    assert rows[0]["old_number"] == 500000.0 and rows[1]["old_number"] is None
+    history.close()
+
+    prices = read_history(str(tmp_path), since=datetime.date(2026, 3, 2), field="list_price")
+    assert list(prices["new_value"]) == ["450000"]
+
+
+def test_state_survives_reopening(tmp_path):
+    history = ListingHistory(str(tmp_path))
+    history.observe(listing("500000"), observed(1))
+    history.close()
+    reopened = ListingHistory(str(tmp_path))
+    assert reopened.observe(listing("500000"), observed(2)) == []
+    reopened.close()
+
+
+def test_price_drops_biggest_first(tmp_path):
+    other = URL.replace("home/1", "home/2")
+    history = ListingHistory(str(tmp_path))
+    for url, before, after in [(URL, "500000", "480000"), (other, "300000", "250000"), (URL + "3", "100", "200")]:
+        history.observe(listing(before, url=url), observed(1))
+        history.observe(listing(after, url=url), observed(5))
+    history.close()
+
+    drops = price_drops(str(tmp_path), days=7, today=datetime.date(2026, 3, 6))
+    assert list(drops["property_url"]) == [other, URL]
+    assert list(drops["drop"]) == [50000.0, 20000.0]
+    assert price_drops(str(tmp_path), days=7, today=datetime.date(2026, 4, 30)).empty
+
+
+def test_price_drops_without_history(tmp_path):
+    missing = price_drops(str(tmp_path / "missing"))
+    assert missing.empty and "drop" in missing.columns
+    ListingHistory(str(tmp_path)).close()
+    assert price_drops(str(tmp_path)).empty
+
+
+def test_rejected_sink_batch_is_retried(tmp_path):
+    sent, accept = [], [False]
+
+    def sink(rows):
+        if not accept[0]:
+            return False
+        sent.extend(rows)
+        return True
+
+    history = ListingHistory(str(tmp_path), fields=("list_price",), sink=sink, sink_batch_size=1)
+    history.observe(listing("500000"), observed(1))
+    history.observe(listing("500000", url=URL + "2"), observed(1))
+    history.checkpoint()
+    assert sent == []
+    accept[0] = True
+    history.close()
+    assert [row["property_url"] for row in sent] == [URL, URL + "2"]
+    assert sent[0]["change_date"] == "2026-03-01"
+
+
+def test_unsent_transitions_are_capped(tmp_path, caplog):
+    history = ListingHistory(str(tmp_path), fields=("list_price",), sink=lambda rows: False, max_unsent=3)
+    for i in range(5):
+        history.observe(listing("500000", url=f"{URL}{i}"), observed(1))
+    assert [row["property_url"] for row in history._unsent] == [f"{URL}{i}" for i in (2, 3, 4)]
+    history.checkpoint()
+    assert "Dropped 2 listing history transitions" in caplog.text
+    assert history.sink_dropped == 0
+    history.close()
+    # Dropped from the sink queue only; the Parquet history still has every transition
+    assert len(read_history(str(tmp_path))) == 5
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import FSBO
+
+PAGE = """<html><head><script>window.__INITIAL_STATE__ = {"a": 1};</script></head>
+<body><h1 class="streetAddress">12 Café Row</h1><div data-rf-test-id="abp-beds">3 Beds</div></body></html>"""
+
+
+def test_page_is_parsed_once_and_decoded_as_utf8(monkeypatch):
+    parses = []
+    original = FSBO.lxml_html.fromstring
+    monkeypatch.setattr(FSBO.lxml_html, "fromstring", lambda text: parses.append(text) or original(text))
+    page = FSBO.ListingPage("https://www.redfin.com/FL/Miami/x/home/1", PAGE.encode("utf-8"))
+    assert len(parses) == 1
+    assert page.tree.xpath("string(//h1)") == "12 Café Row"
+    assert page.tree.xpath("string(//div)") == "3 Beds"
+
+
+def test_state_is_scanned_lazily_and_once(monkeypatch):
+    scans = []
+    original = FSBO.extract_state_blobs
+    monkeypatch.setattr(FSBO, "extract_state_blobs", lambda text, url="": scans.append(url) or original(text, url))
+    page = FSBO.ListingPage("u", PAGE.encode("utf-8"))
+    assert scans == []
+    assert page.json("initial") == {"a": 1}
+    assert page.json("state") == {"a": 1}
+    assert scans == ["u"]
+
+
+def test_missing_state_blobs():
+    page = FSBO.ListingPage("u", b"<html><body><p>x</p></body></html>")
+    assert page.json("initial") == {}
+    assert page.json("state") == {}
+
+
+def test_html_parser_backend_extracts_the_same_fields(monkeypatch):
+    url = "https://www.redfin.com/FL/Miami/123-Main-St-33101/home/1"
+    with open(os.path.join(os.path.dirname(__file__), "fixtures", "listing_fl.html"), "rb") as f:
+        content = f.read()
+    expected = FSBO.parse_redfin_listing(url, content, scrape_date="2025-01-01")
+    monkeypatch.setattr(FSBO, "HTML_PARSER", "html.parser")
+    assert FSBO.ListingPage(url, content).tree.xpath("string(//div[@class='remarks'])") == "Nice house here"
+    assert FSBO.parse_redfin_listing(url, content, scrape_date="2025-01-01") == expected
+
+
+def test_pages_lxml_rejects_fall_back_to_html_parser():
+    page = FSBO.ListingPage("u", b"")
+    assert page.tree.tag == "html"
+    with pytest.raises(ValueError):
+        FSBO.ListingPage("u", PAGE.encode("utf-8"), parser="html5")
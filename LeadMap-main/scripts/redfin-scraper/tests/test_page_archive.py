@@ -0,0 +1,101 @@
+import csv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import FSBO
+from page_archive import PageArchive
+from response_cache import ResponseCache
+
+URL = "https://www.redfin.com/FL/Miami/1-Main-St-33101/home/1"
+OTHER = "https://www.redfin.com/TX/Austin/9-Elm-Rd-73301/home/2"
+
+
+def page(beds):
+    return f"<html><body><div data-rf-test-id='abp-beds'>{beds} Beds</div></body></html>".encode()
+
+
+def test_pages_round_trip_across_segments_and_reopening(tmp_path):
+    archive = PageArchive(str(tmp_path), segment_bytes=1)
+    archive.put(URL, page(2), fetched_at=100)
+    archive.put(URL, page(3), fetched_at=200)
+    archive.put(OTHER, page(4), fetched_at=150)
+    archive.close()
+
+    reopened = PageArchive(str(tmp_path))
+    assert reopened.contains(URL) and not reopened.contains(URL + "9")
+    assert reopened.count() == 2
+    assert reopened.get(URL) == page(3)
+    assert [(entry.url, entry.fetched_at) for entry in reopened.iter_latest()] == [(URL, 200), (OTHER, 150)]
+    assert [entry.url for entry in reopened.iter_latest(since=160)] == [URL]
+    reopened.close()
+
+
+def test_count_can_require_a_meta_key(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    archive.put(URL, page(2), fetched_at=100, meta={"lead": {"property_url": "p1"}})
+    archive.put(OTHER, page(3), fetched_at=100, meta={"lead": {"property_url": "p2"}})
+    # Only the latest fetch of a URL counts
+    archive.put(OTHER, page(4), fetched_at=200)
+    archive.put(URL + "9", page(5), meta={"source": "crawl"})
+    assert archive.count() == 3
+    assert archive.count(meta_key="lead") == 1
+    assert sum(1 for entry in archive.iter_latest() if entry.meta and "lead" in entry.meta) == 1
+    archive.close()
+
+
+def test_concurrent_puts_are_readable(tmp_path):
+    archive = PageArchive(str(tmp_path))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: archive.put(f"{URL}{i}", page(i) * 50), range(200)))
+    assert all(archive.get(f"{URL}{i}") == page(i) * 50 for i in range(200))
+    archive.close()
+
+
+def test_reextract_reads_the_archive_back(tmp_path, monkeypatch):
+    archive = PageArchive(str(tmp_path / "archive"))
+    archive.put(URL, page(3), fetched_at=time.mktime((2026, 3, 1, 12, 0, 0, 0, 0, -1)))
+    archive.close()
+    output = tmp_path / "reextracted.csv"
+    monkeypatch.setattr(FSBO, "PAGE_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(FSBO, "REEXTRACT_CSV_PATH", str(output))
+    monkeypatch.setattr(FSBO, "OUTPUT_FORMATS", {"csv"})
+    monkeypatch.setattr(FSBO, "PARSE_WORKERS", 1)
+
+    FSBO.reextract_listings()
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["property_url"], row["beds"], row["scrape_date"]) for row in rows] == [(URL, "3 Beds", "2026-03-01")]
+
+
+class Session:
+    """Serves a 200 with an ETag, then 304s."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.calls += 1
+        status = 304 if headers else 200
+        return type("Response", (), {"status_code": status, "content": page(3) if status == 200 else b"",
+                                     "headers": {"ETag": '"v1"'}})()
+
+
+def test_pages_served_from_the_cache_are_archived_once(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"), ttl=0)
+    session = Session()
+    with ThreadPoolExecutor(max_workers=1) as parser:
+        # Cached before archiving was turned on
+        FSBO.crawl_listings_threaded([URL], session, parser, lambda url, data: None, cache=cache)
+        archive = PageArchive(str(tmp_path / "archive"))
+        results = {}
+        FSBO.crawl_listings_threaded([URL], session, parser, results.__setitem__, archive, cache)
+        FSBO.crawl_listings_threaded([URL], session, parser, results.__setitem__, archive, cache)
+    assert results[URL]["beds"] == "3 Beds" and cache.revalidated == 2
+    assert archive.get(URL) == page(3)
+    # Archived on the first cached hit only
+    assert archive._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 1
+    archive.close()
+    cache.close()
@@ -0,0 +1,82 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import pyarrow.dataset as ds  # noqa: E402
+
+from parquet_store import PENDING_DIR, PartitionedParquetWriter, partitioning, read_listings  # noqa: E402
+
+FIELDS = ["property_url", "state", "scrape_date", "list_price", "beds"]
+TYPES = {"scrape_date": "date", "list_price": "float", "beds": "int"}
+
+
+def row(i, state="FL"):
+    return {"property_url": f"u{i}", "state": state, "scrape_date": "2025-10-29",
+            "list_price": f"${i},000", "beds": f"{i % 5} Beds"}
+
+
+def dataset_files(root):
+    return sorted(glob.glob(os.path.join(root, "state=*", "scrape_date=*", "*.parquet")))
+
+
+def read_listings_now(root, writer):
+    """Read the dataset mid-run (the schema file is only written on close)."""
+    return ds.dataset(root, format="parquet", schema=writer.schema,
+                      partitioning=partitioning(writer.schema, writer.partition_cols)).to_table().to_pylist()
+
+
+def test_typed_partitioned_round_trip(tmp_path):
+    root = str(tmp_path)
+    with PartitionedParquetWriter(root, FIELDS, TYPES) as writer:
+        writer.write_many([row(1), row(2, "TX")])
+    df = read_listings(root).sort_values("property_url", ignore_index=True)
+    assert list(df["list_price"]) == [1000.0, 2000.0]
+    assert list(df["beds"]) == [1, 2]
+    assert list(df["state"]) == ["FL", "TX"]
+    strings = read_listings(root, columns=["property_url", "beds"], as_strings=True)
+    assert sorted(strings["beds"]) == ["1", "2"]
+
+
+def test_checkpoints_do_not_cut_small_files(tmp_path):
+    root = str(tmp_path)
+    writer = PartitionedParquetWriter(root, FIELDS, TYPES, rows_per_file=10)
+    for i in range(25):
+        writer.write(row(i))
+        if i % 3 == 0:
+            writer.checkpoint()
+    assert len(dataset_files(root)) == 2
+    assert len(read_listings_now(root, writer)) == 20
+    writer.close()
+    assert len(dataset_files(root)) == 3
+    assert sorted(read_listings(root)["property_url"]) == sorted(f"u{i}" for i in range(25))
+    assert not os.listdir(os.path.join(root, PENDING_DIR))
+
+
+def test_checkpointed_rows_survive_a_crash(tmp_path):
+    root = str(tmp_path)
+    crashed = PartitionedParquetWriter(root, FIELDS, TYPES)
+    crashed.write_many([row(1), row(2, "TX")])
+    crashed.checkpoint()
+    crashed.write(row(3))  # never checkpointed: lost with the process, and never marked done
+    assert dataset_files(root) == []
+
+    with PartitionedParquetWriter(root, FIELDS, TYPES) as writer:
+        writer.write(row(4))
+    assert sorted(read_listings(root)["property_url"]) == ["u1", "u2", "u4"]
+    assert not os.listdir(os.path.join(root, PENDING_DIR))
+
+
+def test_recovery_does_not_duplicate_a_written_file(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    crashed = PartitionedParquetWriter(root, FIELDS, TYPES)
+    crashed.write(row(1))
+    crashed.checkpoint()
+    # Crash after the partition's file is in place but before its spills are deleted
+    monkeypatch.setattr(os, "remove", lambda path: None)
+    crashed.flush()
+    monkeypatch.undo()
+    PartitionedParquetWriter(root, FIELDS, TYPES).close()
+    assert list(read_listings(root)["property_url"]) == ["u1"]
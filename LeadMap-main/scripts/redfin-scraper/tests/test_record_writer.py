@@ -0,0 +1,50 @@
+import csv
+import logging
+import time
+
+from record_writer import BufferedRecordWriter
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_rows_and_header_with_append(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with BufferedRecordWriter(path, ["a", "b"]) as writer:
+        writer.write({"a": "1"})
+    with BufferedRecordWriter(path, ["a", "b"], mode="a") as writer:
+        writer.write_many([{"a": "2", "b": "x"}])
+    assert read_rows(path) == [{"a": "1", "b": ""}, {"a": "2", "b": "x"}]
+
+
+def test_no_rows_leaves_existing_file(tmp_path):
+    path = tmp_path / "out.csv"
+    path.write_text("keep\n")
+    BufferedRecordWriter(str(path), ["a"]).close()
+    assert path.read_text() == "keep\n"
+
+
+def test_slow_tail_is_flushed_by_the_timer(tmp_path):
+    path = str(tmp_path / "out.csv")
+    writer = BufferedRecordWriter(path, ["a"], flush_rows=1000, flush_interval=0.05, checkpoint_rows=0)
+    try:
+        writer.write({"a": "1"})
+        deadline = time.monotonic() + 5
+        while not read_rows(path) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert read_rows(path) == [{"a": "1"}]
+    finally:
+        writer.close()
+    assert writer._timer is None
+
+
+def test_unknown_columns_are_logged_once(tmp_path, caplog):
+    path = str(tmp_path / "out.csv")
+    with caplog.at_level(logging.WARNING):
+        with BufferedRecordWriter(path, ["a"]) as writer:
+            writer.write_many([{"a": "1", "extra": "x"}, {"a": "2", "extra": "y"}])
+    assert [r.message for r in caplog.records if "extra" in r.message] == [
+        f"Column 'extra' is not in the header of {path}; its values are not written"]
+    assert read_rows(path) == [{"a": "1"}, {"a": "2"}]
@@ -0,0 +1,51 @@
+import asyncio
+
+from request_blocking import ResourceBlocker
+
+
+class Frame:
+    def __init__(self, parent=None):
+        self.parent_frame = parent
+
+
+class Request:
+    def __init__(self, url, resource_type, navigation=False, main_frame=True):
+        self.url = url
+        self.resource_type = resource_type
+        self.navigation = navigation
+        self.frame = Frame(None if main_frame else Frame())
+
+    def is_navigation_request(self):
+        return self.navigation
+
+
+class Route:
+    def __init__(self, request):
+        self.request = request
+        self.result = None
+
+    async def continue_(self):
+        self.result = "continue"
+
+    async def abort(self, error_code):
+        self.result = "abort"
+
+
+def route(blocker, *args, **kwargs):
+    r = Route(Request(*args, **kwargs))
+    asyncio.run(blocker.handle(r))
+    return r.result
+
+
+def test_blocks_by_type_and_host_and_counts_page_loads():
+    blocker = ResourceBlocker()
+    assert route(blocker, "https://www.truepeoplesearch.com/x", "document", navigation=True) == "continue"
+    assert route(blocker, "https://www.truepeoplesearch.com/x", "document", navigation=True) == "continue"
+    assert route(blocker, "https://www.truepeoplesearch.com/i.png", "image") == "abort"
+    assert route(blocker, "https://stats.g.doubleclick.net/a.js", "script") == "abort"
+    assert route(blocker, "https://challenges.cloudflare.com/c.png", "image") == "continue"
+    assert route(blocker, "https://ads.doubleclick.net/frame", "document", navigation=True, main_frame=False) == "abort"
+    assert route(blocker, "https://www.truepeoplesearch.com/app.js", "script") == "continue"
+    assert blocker.pages == 2
+    assert blocker.blocked_by_type == {"image": 1, "script": 1, "document": 1}
+    assert blocker.blocked_by_host == {"stats.g.doubleclick.net": 1, "ads.doubleclick.net": 1}
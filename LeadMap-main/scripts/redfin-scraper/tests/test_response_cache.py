@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+import FSBO
+from crawl_control import FetchResult
+from response_cache import ResponseCache
+
+URL = "https://www.redfin.com/FL/Miami/1-Main-St-33101/home/1"
+PAGE = b"<html><body><div data-rf-test-id='abp-beds'>3 Beds</div></body></html>"
+
+
+class Session:
+    """Replays canned (status, body, headers) responses and records the headers of each request."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        status, body, response_headers = self.responses.pop(0)
+        return type("Response", (), {"status_code": status, "content": body, "headers": response_headers})()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"), ttl=0)
+    yield cache
+    cache.close()
+
+
+def test_304_reuses_cached_body_and_record(cache):
+    session = Session((200, PAGE, {"ETag": '"v1"'}), (304, b"", {}))
+    first = FSBO.scrape_redfin_listing(URL, session, cache)
+    assert first["beds"] == "3 Beds"
+    result, record = FSBO.fetch_listing_cached(URL, session, cache)
+    assert session.requests[1] == {"If-None-Match": '"v1"'}
+    assert result.status == 200 and result.content == PAGE
+    assert record == {**first, "scrape_date": record["scrape_date"]}
+    assert cache.revalidated == 1
+
+
+def test_304_with_lost_body_refetches_unconditionally(cache):
+    session = Session((200, PAGE, {"ETag": '"v1"'}), (304, b"", {}), (200, PAGE, {"ETag": '"v2"'}))
+    FSBO.scrape_redfin_listing(URL, session, cache)
+    entry = cache.lookup(URL)
+    os.remove(cache._body_path(URL, entry.content_hash))
+
+    data = FSBO.scrape_redfin_listing(URL, session, cache)
+    assert data["beds"] == "3 Beds"
+    assert session.requests[1] == {"If-None-Match": '"v1"'}
+    assert session.requests[2] == {}
+    assert cache.lookup(URL).etag == '"v2"'
+
+
+def test_changed_body_drops_the_record(cache):
+    cache.store(URL, PAGE, {})
+    cache.store_record(URL, {"beds": "3 Beds"})
+    cache.store(URL, PAGE + b" ", {})
+    assert cache.lookup(URL).record is None
+
+
+def test_size_bound_counts_records(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+    cache.store(URL, PAGE, {})
+    body_only = cache._total_bytes
+    record = {"text": "x" * 5000}
+    cache.store_record(URL, record)
+    assert cache._total_bytes == body_only + len(json.dumps(record))
+    cache.close()
+
+    reopened = ResponseCache(str(tmp_path / "cache"), max_bytes=body_only + 100)
+    assert reopened._total_bytes == body_only + len(json.dumps(record))
+    reopened.store("https://www.redfin.com/FL/x/home/2", PAGE, {})
+    assert reopened.lookup(URL) is None and reopened.evicted == 1
+    reopened.forget("https://www.redfin.com/FL/x/home/2")
+    assert reopened._total_bytes == 0
+    reopened.close()
+
+
+def test_revalidate_without_cache_entry_passes_304_through(cache):
+    result = FetchResult(URL, 304, b"", {}, 0.1, None)
+    assert FSBO.revalidate_listing(cache, URL, result, None) == (result, None)
@@ -0,0 +1,32 @@
+from run_manifest import RunManifest
+
+
+def test_resume_skips_committed_urls_only(tmp_path):
+    path = str(tmp_path / "manifest.db")
+    manifest = RunManifest(path, checkpoint_every=2, checkpoint_interval=3600)
+    run_id = manifest.start_run(["a", "b", "c", "d"])
+    assert manifest.mark_done(run_id, "a", "scraped") is False
+    assert manifest.mark_done(run_id, "b", "failed") is True
+    manifest.commit()
+    manifest.mark_done(run_id, "c", "scraped")  # staged but never committed: the crash loses it
+    manifest.close()
+
+    resumed = RunManifest(path)
+    assert resumed.unfinished_run() == run_id
+    assert resumed.count_pending(run_id) == 2
+    assert list(resumed.iter_pending(run_id, batch_size=1)) == ["c", "d"]
+    for url in ("c", "d"):
+        resumed.mark_done(run_id, url, "scraped")
+    resumed.commit()
+    resumed.finish_run(run_id)
+    assert resumed.unfinished_run() is None
+    resumed.close()
+
+
+def test_new_run_abandons_the_unfinished_one(tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.db"))
+    first = manifest.start_run(["a"])
+    second = manifest.start_run(["b", "c"])
+    assert manifest.unfinished_run() == second != first
+    assert list(manifest.iter_pending(second)) == ["b", "c"]
+    manifest.close()
@@ -0,0 +1,150 @@
+import gzip
+import io
+
+import pytest
+
+import FSBO
+from sitemap_store import SitemapStateStore
+
+INDEX = "https://www.redfin.com/sitemap_index.xml"
+CHILD = "https://www.redfin.com/sitemap_com_listings_FL.xml.gz"
+
+
+def urlset(count, state="FL", lastmod="2026-03-01"):
+    entries = "".join(f"<url><loc>https://www.redfin.com/{state}/Miami/{i}-Main-St-33101/home/{i}</loc>"
+                      f"<lastmod>{lastmod}</lastmod></url>" for i in range(count))
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>').encode()
+
+
+def sitemapindex(*children):
+    entries = "".join(f"<sitemap><loc>{child}</loc></sitemap>" for child in children)
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>').encode()
+
+
+class Raw(io.BytesIO):
+    """Stand-in for urllib3's raw response stream."""
+    decode_content = False
+
+
+class Response:
+    def __init__(self, status, body, headers):
+        self.status_code = status
+        self.raw = Raw(body)
+        self.headers = headers
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError(f"HTTP {self.status_code}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Session:
+    """Serves canned streamed responses per URL and records the headers of each request."""
+
+    def __init__(self, responses):
+        self.responses = {url: list(queue) for url, queue in responses.items()}
+        self.requests = []
+        self.last = None
+
+    def get(self, url, timeout=None, stream=False, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        status, body, response_headers = self.responses[url].pop(0)
+        self.last = Response(status, body, response_headers)
+        return self.last
+
+
+def test_plain_urlset():
+    session = Session({CHILD: [(200, urlset(3), {})]})
+    entries = list(FSBO.iter_sitemap_entries(CHILD, session))
+    assert [kind for kind, _, _ in entries] == ["url"] * 3
+    assert entries[0][1:] == ("https://www.redfin.com/FL/Miami/0-Main-St-33101/home/0", "2026-03-01")
+
+
+def test_gzipped_urlset_is_detected_by_magic_bytes():
+    session = Session({CHILD: [(200, gzip.compress(urlset(3)), {"Content-Type": "application/x-gzip"})]})
+    children, listings = FSBO.read_sitemap(CHILD, session)
+    assert children == [] and len(listings) == 3
+
+
+def test_sitemap_index_yields_children():
+    other = "https://www.redfin.com/sitemap_com_listings_TX.xml.gz"
+    session = Session({INDEX: [(200, sitemapindex(CHILD, other), {})]})
+    assert list(FSBO.iter_sitemap_entries(INDEX, session)) == [("sitemap", CHILD, None), ("sitemap", other, None)]
+
+
+def test_entries_are_yielded_before_the_body_is_read():
+    body = urlset(20000)
+    session = Session({CHILD: [(200, body, {})]})
+    entries = FSBO.iter_sitemap_entries(CHILD, session)
+    next(entries)
+    assert session.last.raw.tell() < len(body) // 4
+    assert sum(1 for _ in entries) == 19999
+
+
+def test_truncated_gzip_keeps_what_was_parsed():
+    body = gzip.compress(urlset(2000))
+    session = Session({CHILD: [(200, body[:len(body) // 2], {})]})
+    with pytest.raises(EOFError):
+        list(FSBO.iter_sitemap_entries(CHILD, session))
+
+    session = Session({CHILD: [(200, body[:len(body) // 2], {})]})
+    children, listings = FSBO.read_sitemap(CHILD, session)
+    assert children == [] and 0 < len(listings) < 2000
+
+
+def test_malformed_gzip_is_logged_not_raised():
+    session = Session({CHILD: [(200, b"\x1f\x8bnot really gzip", {})]})
+    assert FSBO.read_sitemap(CHILD, session) == ([], set())
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SitemapStateStore(str(tmp_path / "sitemaps.db"))
+    yield store
+    store.close()
+
+
+def crawl(session, store):
+    urls = FSBO.fetch_listing_urls_from_sitemap(INDEX, session, store, max_workers=2)
+    store.commit()
+    return urls
+
+
+def test_unchanged_sitemaps_are_skipped(store):
+    session = Session({
+        INDEX: [(200, sitemapindex(CHILD), {"ETag": '"i1"'}), (304, b"", {})],
+        CHILD: [(200, urlset(3), {"Last-Modified": "Sun, 01 Mar 2026 00:00:00 GMT"}), (304, b"", {})],
+    })
+    assert len(crawl(session, store)) == 3
+    assert crawl(session, store) == set()
+    # The index's 304 still reaches its recorded child, and both requests were conditional
+    assert session.requests[2:] == [(INDEX, {"If-None-Match": '"i1"'}),
+                                    (CHILD, {"If-Modified-Since": "Sun, 01 Mar 2026 00:00:00 GMT"})]
+
+
+def test_changed_sitemap_is_rewalked_for_changed_listings(store):
+    changed = urlset(3).replace(b"<lastmod>2026-03-01</lastmod></url></urlset>",
+                                b"<lastmod>2026-03-05</lastmod></url></urlset>")
+    session = Session({
+        INDEX: [(200, sitemapindex(CHILD), {"ETag": '"i1"'}), (200, sitemapindex(CHILD), {"ETag": '"i2"'})],
+        CHILD: [(200, urlset(3), {"ETag": '"c1"'}), (200, changed, {"ETag": '"c2"'})],
+    })
+    crawl(session, store)
+    # Same <lastmod> is skipped; only the listing whose <lastmod> moved comes back
+    assert crawl(session, store) == {"https://www.redfin.com/FL/Miami/2-Main-St-33101/home/2"}
+    assert store.conditional_headers(CHILD) == {"If-None-Match": '"c2"'}
+
+
+def test_partly_parsed_sitemap_keeps_old_validators(store):
+    body = gzip.compress(urlset(2000))
+    session = Session({CHILD: [(200, body, {"ETag": '"c1"'}), (200, body[:len(body) // 2], {"ETag": '"c2"'})]})
+    FSBO.read_sitemap(CHILD, session, store)
+    FSBO.read_sitemap(CHILD, session, store)
+    assert store.conditional_headers(CHILD) == {"If-None-Match": '"c1"'}
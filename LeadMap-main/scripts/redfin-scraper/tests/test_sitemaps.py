@@ -0,0 +1,41 @@
+import FSBO
+
+
+def test_sitemap_state_reads_state_suffix():
+    assert FSBO.sitemap_state("https://www.redfin.com/sitemap_com_listings_FL.xml.gz") == "FL"
+    assert FSBO.sitemap_state("https://www.redfin.com/newest_listings_TX.xml") == "TX"
+    assert FSBO.sitemap_state("https://www.redfin.com/sitemap_com_listings_CA_3.xml.gz") == "CA"
+    assert FSBO.sitemap_state("https://www.redfin.com/sitemaps/OR/listings.xml") == "OR"
+
+
+def test_sitemap_state_ignores_common_words():
+    for url in [
+        "https://www.redfin.com/newest_listings.xml",
+        "https://www.redfin.com/sitemap_com_homes_for_sale_in.xml",
+        "https://www.redfin.com/sitemap_listings_or_rentals.xml.gz",
+        "https://www.redfin.com/sitemaps/id/listings_me.xml",
+        "https://www.redfin.com/sitemap_co_de_hi_ok_la.xml",
+        "https://www.redfin.com/sitemap_com_listings_XX.xml",
+        "https://www.redfin.com/",
+    ]:
+        assert FSBO.sitemap_state(url) is None, url
+
+
+def test_unrecognised_children_are_fetched(monkeypatch):
+    children = [
+        "https://www.redfin.com/sitemap_com_listings_CA.xml",
+        "https://www.redfin.com/sitemap_com_listings_FL.xml",
+        "https://www.redfin.com/sitemap_com_listings_in.xml",
+    ]
+    fetched = []
+
+    def fake_read(url, session, state_store=None):
+        fetched.append(url)
+        if url == "root":
+            return children, set()
+        return [], {url + "/listing"}
+
+    monkeypatch.setattr(FSBO, "read_sitemap", fake_read)
+    urls = FSBO.fetch_listing_urls_from_sitemap("root", session=None, max_workers=2)
+    assert sorted(fetched) == sorted(["root", children[1], children[2]])
+    assert urls == {children[1] + "/listing", children[2] + "/listing"}
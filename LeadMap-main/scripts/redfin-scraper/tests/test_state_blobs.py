@@ -0,0 +1,30 @@
+import FSBO
+
+
+def test_each_marker_decoded_once_in_document_order():
+    html = (
+        '<script>window.__PRELOADED_STATE__ = {"p": "</script>{tricky}"};</script>'
+        '<script>window.__INITIAL_STATE__={"i": [1, 2]}; window.__INITIAL_STATE__ = {"i": "second"};</script>'
+        '<script type="application/ld+json"> {"@type": "House"}</script>'
+        '<script type="application/ld+json">[{"@type": "Offer"}]</script>'
+    )
+    blobs = FSBO.extract_state_blobs(html)
+    assert list(blobs) == ["window.__PRELOADED_STATE__", "window.__INITIAL_STATE__", FSBO.LD_JSON]
+    assert blobs["window.__PRELOADED_STATE__"] == {"p": "</script>{tricky}"}
+    assert blobs["window.__INITIAL_STATE__"] == {"i": [1, 2]}
+    assert blobs[FSBO.LD_JSON] == [{"@type": "House"}, [{"@type": "Offer"}]]
+
+
+def test_undecodable_blob_is_skipped():
+    html = ('<script>window.__APOLLO_STATE__ = {"broken": ;</script>'
+            '<script>window.__REDUX_STATE__ = {"ok": true};</script>'
+            '<script>window.__INITIAL_STATE__ = "not an object";</script>')
+    assert FSBO.extract_state_blobs(html) == {"window.__REDUX_STATE__": {"ok": True}}
+
+
+def test_state_blob_prefers_state_over_ld_json():
+    page = FSBO.ListingPage("u", b'<script type="application/ld+json">{"ld": 1}</script>'
+                                 b'<script>_PRELOADED_STATE_ = {"s": 1}</script>')
+    assert page.json("state") == {"s": 1}
+    page = FSBO.ListingPage("u", b'<script type="application/ld+json">{"ld": 1}</script>')
+    assert page.json("state") == {"ld": 1}
@@ -0,0 +1,25 @@
+-- Migration: Create listing_history
+-- Purpose: Keep every list_price / status transition the Redfin scraper observes,
+--          since upserts into listings overwrite the previous values.
+--          Rows are append-only; the scraper inserts them in batches.
+
+CREATE TABLE IF NOT EXISTS listing_history (
+  id BIGSERIAL PRIMARY KEY,
+  property_url TEXT NOT NULL,
+  state TEXT,
+  field TEXT NOT NULL,                -- 'list_price' or 'status'
+  old_value TEXT,                     -- NULL for the first observation of a listing
+  new_value TEXT NOT NULL,
+  old_number NUMERIC,                 -- numeric form of old_value / new_value for price fields
+  new_number NUMERIC,
+  changed_at TIMESTAMPTZ NOT NULL,
+  change_date DATE NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- "Price dropped in the last N days" reads one field over a date range
+CREATE INDEX IF NOT EXISTS idx_listing_history_field_date ON listing_history(field, change_date);
+CREATE INDEX IF NOT EXISTS idx_listing_history_url ON listing_history(property_url, changed_at);
+
+COMMENT ON TABLE listing_history IS
+  'Append-only field transitions (price, status) per listing, written by the Redfin FSBO scraper.';